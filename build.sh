@@ -12,4 +12,18 @@ python manage.py collectstatic --no-input
 
 
 # Apply any outstanding database migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+
+# Create the table of the shared cache (CACHES in settings/prod.py)
+python manage.py createcachetable
+
+
+# Fill the home page leaderboards; they are only written by changes
+# and by this command, never when the page is read
+python manage.py rebuild_leaderboards
+
+
+# Embed the published articles for semantic search; until this file
+# exists the search form only offers keyword search
+python manage.py rebuild_semantic_index
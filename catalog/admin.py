@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from django.db.models import Avg
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
 
+from catalog.aggregates import SubqueryCount
 from catalog.models import (
     KnowledgeBase,
     Article,
@@ -9,7 +11,9 @@ from catalog.models import (
     Category,
     Rating,
     Employee,
+    DuplicateArticle,
 )
+from catalog.signals import update_articles
 
 
 @admin.register(Employee)
@@ -78,6 +82,7 @@ class ArticleAdmin(admin.ModelAdmin):
         "created_at",
         "views_count",
         "average_rating",
+        "duplicates_count",
     )
     list_filter = (
         "is_published",
@@ -99,7 +104,8 @@ class ArticleAdmin(admin.ModelAdmin):
         "average_rating",
         "comments_count",
         "updated_at",
-        "reading_time"
+        "reading_time",
+        "possible_duplicates",
     )
 
     fieldsets = (
@@ -115,24 +121,67 @@ class ArticleAdmin(admin.ModelAdmin):
         }),
         ("statistics", {
             "fields": ("views_count", "comments_count", "average_rating"),
-        })
+        }),
+        ("duplicates", {
+            "fields": ("possible_duplicates",),
+        }),
     )
     actions = ["publish_articles", "unpublish_articles"]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            duplicates_total=SubqueryCount(
+                DuplicateArticle.objects.all(), "article"
+            ),
+        )
+
     def average_rating(self, obj):
-        return round(obj.ratings.aggregate(avg=Avg("rating"))["avg"] or 0, 1)
+        return round(obj.rating_average, 1)
     average_rating.short_description = "Avg rating"
+    average_rating.admin_order_field = "rating_average"
 
     def rating_count(self, obj):
         """Rating count of articles."""
-        return obj.ratings.count()
+        return obj.rating_count
     rating_count.short_description = "Rating count"
+    rating_count.admin_order_field = "rating_count"
 
     def comments_count(self, obj):
         """Number of comments in this article."""
         return obj.comments.count()
     comments_count.short_description = "Comments count"
 
+    def duplicates_count(self, obj):
+        """Number of likely near-duplicates."""
+        return obj.duplicates_total
+    duplicates_count.short_description = "Duplicates"
+    duplicates_count.admin_order_field = "duplicates_total"
+
+    def possible_duplicates(self, obj):
+        """Links to likely near-duplicates with their similarity."""
+
+        if obj.pk is None:
+            return "-"
+        links = obj.duplicate_links.select_related("duplicate")
+        if not links:
+            return "-"
+        return format_html_join(
+            format_html("<br>"),
+            '<a href="{}">{}</a> ({}%)',
+            (
+                (
+                    reverse(
+                        "admin:catalog_article_change",
+                        args=[link.duplicate_id],
+                    ),
+                    link.duplicate.title,
+                    round(link.similarity * 100),
+                )
+                for link in links
+            ),
+        )
+    possible_duplicates.short_description = "Possible duplicates"
+
     def get_short_content(self, obj):
         """Get shortened content for list display."""
 
@@ -144,7 +193,7 @@ class ArticleAdmin(admin.ModelAdmin):
     def publish_articles(self, request, queryset):
         """Publish selected articles."""
 
-        updated = queryset.update(is_published=True)
+        updated = update_articles(queryset, is_published=True)
         self.message_user(
             request,
             f"{updated} articles were published."
@@ -154,7 +203,7 @@ class ArticleAdmin(admin.ModelAdmin):
     def unpublish_articles(self, request, queryset):
         """Unpublish selected articles."""
 
-        updated = queryset.update(is_published=False)
+        updated = update_articles(queryset, is_published=False)
         self.message_user(
             request,
             f"{updated} articles were unpublished."
@@ -0,0 +1,63 @@
+"""
+Aggregates of related rows as correlated subqueries.
+
+Annotating Count or Avg over a reverse relation joins its rows into
+the outer query and groups them back; two such annotations multiply
+each other's rows (ratings x comments), which is slow and makes the
+counts wrong unless distinct. A subquery aggregate instead runs once
+per outer row over the related rows only, so annotations do not
+interact and the cost grows with the rows shown:
+
+    Article.objects.annotate(
+        comment_count=SubqueryCount(Comment.objects.all(), "article"),
+    )
+
+queryset: the related rows (filter it to count some of them),
+outer: the path from those rows to the outer model,
+field: what to aggregate. Counts and sums are 0 when no row matches,
+averages are None.
+"""
+from django.db.models import (
+    Avg,
+    Count,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+)
+
+
+class SubqueryAggregate(Subquery):
+    """aggregate(field) of the queryset rows related to an outer row."""
+
+    aggregate = None
+    empty = None
+    output = None
+
+    def __init__(self, queryset, outer: str, field="pk", distinct=False,
+                 outer_ref="pk"):
+        rows = queryset.filter(
+            **{outer: OuterRef(outer_ref)}
+        ).order_by().values(outer).annotate(
+            total=self.aggregate(field, distinct=distinct)
+        ).values("total")
+        super().__init__(rows, output_field=self.output)
+        if self.empty is not None:
+            self.template = f"COALESCE({self.template}, {self.empty})"
+
+
+class SubqueryCount(SubqueryAggregate):
+    aggregate = Count
+    empty = 0
+    output = IntegerField()
+
+
+class SubquerySum(SubqueryAggregate):
+    aggregate = Sum
+    empty = 0
+
+
+class SubqueryAvg(SubqueryAggregate):
+    aggregate = Avg
+    output = FloatField()
@@ -12,6 +12,14 @@ from catalog.models import (
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django_select2.forms import ModelSelect2Widget
 
+from catalog.search.facets import (
+    FACETS,
+    RATING_CHOICES,
+    READING_TIME_CHOICES,
+)
+from catalog.search.semantic import get_semantic_index
+from catalog.search.text import tokenize
+
 
 class KnowledgeBaseSearchForm(forms.Form):
     """Search form for a knowledge base (by title)"""
@@ -43,19 +51,84 @@ class CategorySearchForm(forms.Form):
     )
 
 
+SEARCH_MODES = [
+    ("keyword", "Keyword"),
+    ("semantic", "Semantic"),
+]
+
+
 class ArticleSearchForm(forms.Form):
-    """Search form for an article (by title)"""
+    """
+    Full-text search form for an article (by title and content)
+    with facet filters.
+    """
 
     title = forms.CharField(
         max_length=255,
         required=False,
         label="",
         widget=forms.TextInput(attrs={
-            "placeholder": "Search by title",
+            "placeholder": "Search by title or content",
             "class": "form-control",
 
         }),
     )
+    mode = forms.ChoiceField(
+        choices=SEARCH_MODES,
+        required=False,
+        label="",
+        widget=forms.RadioSelect,
+    )
+    knowledge_base = forms.IntegerField(
+        required=False,
+        widget=forms.HiddenInput,
+    )
+    category = forms.IntegerField(
+        required=False,
+        widget=forms.HiddenInput,
+    )
+    author = forms.IntegerField(
+        required=False,
+        widget=forms.HiddenInput,
+    )
+    rating = forms.ChoiceField(
+        choices=[("", "")] + RATING_CHOICES,
+        required=False,
+        widget=forms.HiddenInput,
+    )
+    reading_time = forms.ChoiceField(
+        choices=[("", "")] + READING_TIME_CHOICES,
+        required=False,
+        widget=forms.HiddenInput,
+    )
+
+    def __init__(self, *args, **kwargs):
+        """The semantic mode is only offered once its index is built."""
+
+        super().__init__(*args, **kwargs)
+        self.semantic_available = get_semantic_index().available
+        if not self.semantic_available:
+            self.fields["mode"].widget.choices = SEARCH_MODES[:1]
+
+    def semantic(self) -> bool:
+        """Whether the search asks for an available semantic mode."""
+
+        return (
+            self.semantic_available
+            and self.is_valid()
+            and self.cleaned_data.get("mode") == "semantic"
+        )
+
+    def facet_filters(self) -> dict:
+        """Selected facet values as strings (empty if form invalid)."""
+
+        if not self.is_valid():
+            return {}
+        return {
+            facet: str(self.cleaned_data[facet])
+            for facet in FACETS
+            if self.cleaned_data.get(facet) not in (None, "")
+        }
 
 
 class EmployeeSearchForm(forms.Form):
@@ -72,6 +145,35 @@ class EmployeeSearchForm(forms.Form):
     )
 
 
+class SiteSearchForm(forms.Form):
+    """
+    One search box over knowledge bases, categories,
+    articles and employees.
+    """
+
+    q = forms.CharField(
+        max_length=255,
+        required=False,
+        label="",
+        widget=forms.TextInput(attrs={
+            "placeholder": "Search everything",
+            "class": "form-control",
+        })
+    )
+
+
+class SavedSearchForm(forms.Form):
+    """Subscribe to an article query."""
+
+    query = forms.CharField(max_length=255)
+
+    def clean_query(self):
+        query = self.cleaned_data["query"]
+        if not tokenize(query):
+            raise forms.ValidationError("Enter at least one word.")
+        return query
+
+
 class RatingForm(forms.ModelForm):
     """Rating form for an article (1 to 5)"""
 
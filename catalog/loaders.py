@@ -0,0 +1,128 @@
+"""
+Batched lazy loading of per-row values.
+
+A batched_property is computed like a cached_property, but for every
+instance fetched by the same query at once: reading it on one row of a
+page's object list runs a single query for all of its siblings, so a
+template looping over the list makes one query per property instead
+of one per row. Querysets record the siblings when they are evaluated
+(BatchLoadingQuerySet), by weak reference, so rows do not keep each
+other alive; an instance fetched on its own is its own batch.
+
+Loaded values are also memoized for the current request
+(RequestMemoMiddleware), so the same object met again in another list
+of the page is not loaded twice. An annotation of the same name takes
+precedence and is never loaded.
+"""
+import weakref
+from contextvars import ContextVar
+
+from django.db import models
+from django.db.models.query import ModelIterable
+
+_memo = ContextVar("batched_property_memo", default=None)
+
+
+class Batch:
+    """The instances of one evaluation, held by weak reference."""
+
+    def __init__(self, instances=()):
+        self.refs = [weakref.ref(instance) for instance in instances]
+
+    def __iter__(self):
+        for ref in self.refs:
+            instance = ref()
+            if instance is not None:
+                yield instance
+
+    def __reduce__(self):
+        # Siblings are not pickled with a cached instance.
+        return Batch, ()
+
+
+class BatchLoadingQuerySet(models.QuerySet):
+    """Instances of one evaluation are loaded as one batch."""
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if fetched and issubclass(self._iterable_class, ModelIterable):
+            batch = Batch(self._result_cache)
+            for instance in self._result_cache:
+                instance._batch = batch
+
+
+class BatchedProperty:
+    """See batched_property."""
+
+    def __init__(self, load, default=None):
+        self.load = load
+        self.default = default
+        self.name = load.__name__
+        self.__doc__ = load.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def memo_key(self, instance):
+        return instance._meta.label, self.name, instance.pk
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if self.name not in instance.__dict__:
+            self.load_batch(instance)
+        return instance.__dict__[self.name]
+
+    def load_batch(self, instance) -> None:
+        memo = _memo.get()
+        batch = list(getattr(instance, "_batch", ()))
+        if not any(sibling is instance for sibling in batch):
+            batch = [instance, *batch]
+
+        pending = {}
+        for sibling in batch:
+            if self.name in sibling.__dict__:
+                continue
+            if sibling.pk is None:
+                sibling.__dict__[self.name] = self.default
+            elif memo is not None and self.memo_key(sibling) in memo:
+                sibling.__dict__[self.name] = memo[self.memo_key(sibling)]
+            else:
+                pending.setdefault(sibling.pk, []).append(sibling)
+        if not pending:
+            return
+
+        values = self.load([siblings[0] for siblings in pending.values()])
+        for pk, siblings in pending.items():
+            value = values.get(pk, self.default)
+            for sibling in siblings:
+                sibling.__dict__[self.name] = value
+            if memo is not None:
+                memo[self.memo_key(siblings[0])] = value
+
+
+def batched_property(default=None):
+    """
+    Decorate load(instances) -> {pk: value}; pks it leaves out get
+    default. Unsaved instances read default.
+    """
+
+    def decorator(load):
+        return BatchedProperty(load, default)
+
+    return decorator
+
+
+class RequestMemoMiddleware:
+    """Memoize batched properties for the duration of a request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _memo.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _memo.reset(token)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from catalog.search.related import (
+    DEFAULT_CHUNK_SIZE,
+    rebuild_related_articles,
+)
+
+
+class Command(BaseCommand):
+    help = "Recompute related articles of every published article."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Number of related articles stored per article.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Articles scored and written per batch.",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_related_articles(
+            limit=options["limit"],
+            chunk_size=options["chunk_size"],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored related articles for {total} articles."
+        ))
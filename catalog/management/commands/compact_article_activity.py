@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from catalog.stats.rollups import compact_activity
+
+
+class Command(BaseCommand):
+    help = (
+        "Compact aged hourly article activity into days and aged "
+        "daily activity into months. Run it periodically, e.g. daily."
+    )
+
+    def handle(self, *args, **options):
+        merged = compact_activity()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {merged['hour']} hourly and {merged['day']} "
+            "daily activity rows."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from catalog.stats.counters import consolidate_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold sharded counters into their model columns, e.g. article "
+        "views into Article.views_count. Run it periodically."
+    )
+
+    def handle(self, *args, **options):
+        for name, updated in consolidate_counters().items():
+            self.stdout.write(self.style.SUCCESS(
+                f"Consolidated {name} of {updated} objects."
+            ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from catalog.search.duplicates import rebuild_duplicates
+
+
+class Command(BaseCommand):
+    help = "Recompute MinHash signatures and near-duplicate articles."
+
+    def handle(self, *args, **options):
+        total = rebuild_duplicates()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {total} articles for duplicates."
+        ))
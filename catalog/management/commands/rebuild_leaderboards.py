@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from catalog.stats.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = "Rebuild every site-wide and knowledge base leaderboard."
+
+    def handle(self, *args, **options):
+        total = rebuild_leaderboards()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {total} leaderboards."
+        ))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.search import get_search_backend
+from catalog.search.sharding import DEFAULT_SHARD_SIZE, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the article search index from scratch. "
+        "The old index keeps serving searches until the new one "
+        "is swapped in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Processes indexing shards (default: CPU count).",
+        )
+        parser.add_argument(
+            "--shard-size",
+            type=int,
+            default=DEFAULT_SHARD_SIZE,
+            help="Articles per shard, split by id range.",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        started = time.monotonic()
+        indexed = 0
+
+        def progress(done, shards, articles, seconds):
+            nonlocal indexed
+            indexed += articles
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Shard {done}/{shards}: {articles} articles "
+                f"in {seconds:.1f}s, {indexed} total, "
+                f"{indexed / max(elapsed, 1e-6):.0f} articles/s"
+            )
+
+        total = rebuild_index(
+            backend,
+            workers=options["workers"],
+            shard_size=options["shard_size"],
+            progress=progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} articles with {type(backend).__name__}."
+        ))
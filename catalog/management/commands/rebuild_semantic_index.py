@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from catalog.search.semantic import rebuild_semantic_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Embed every published article into the semantic search index. "
+        "Run once to enable semantic search; later changes are "
+        "applied incrementally."
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild_semantic_index()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Embedded {total} articles."
+        ))
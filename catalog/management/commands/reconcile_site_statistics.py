@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from catalog.stats.site import reconcile_site_statistics, site_statistics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialized site statistics from the full "
+        "aggregates and report totals that had drifted."
+    )
+
+    def handle(self, *args, **options):
+        stored = site_statistics()
+        totals = reconcile_site_statistics()
+
+        for field, value in totals.items():
+            if stored[field] != value:
+                self.stdout.write(self.style.WARNING(
+                    f"{field}: {stored[field]} -> {value}"
+                ))
+        self.stdout.write(self.style.SUCCESS(
+            "Site statistics reconciled."
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from catalog.stats.authors import recount_authors
+from catalog.stats.ratings import recount_ratings
+from catalog.stats.totals import recount_catalog_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the stored article, author, comment and category "
+        "totals of every category and knowledge base, the stored "
+        "rating totals of every article and the author totals of "
+        "every employee."
+    )
+
+    def handle(self, *args, **options):
+        recount_catalog_totals()
+        recount_ratings()
+        recount_authors()
+        self.stdout.write(self.style.SUCCESS(
+            "Catalog totals recounted."
+        ))
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_article_fts "
+    "USING fts5(title, content)",
+    "INSERT INTO catalog_article_fts (rowid, title, content) "
+    "SELECT id, title, content FROM catalog_article",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS catalog_article_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE TABLE IF NOT EXISTS catalog_article_search ("
+    "article_id bigint PRIMARY KEY "
+    "REFERENCES catalog_article (id) ON DELETE CASCADE "
+    "DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS catalog_article_search_document_gin "
+    "ON catalog_article_search USING GIN (document)",
+    "INSERT INTO catalog_article_search (article_id, document) "
+    "SELECT id, "
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', content), 'B') "
+    "FROM catalog_article",
+]
+POSTGRES_BACKWARD = [
+    "DROP TABLE IF EXISTS catalog_article_search",
+]
+
+
+def run_for_vendor(sqlite_statements, postgres_statements):
+    def run(apps, schema_editor):
+        statements = {
+            "sqlite": sqlite_statements,
+            "postgresql": postgres_statements,
+        }.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0005_alter_category_created_by"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(SQLITE_FORWARD, POSTGRES_FORWARD),
+            run_for_vendor(SQLITE_BACKWARD, POSTGRES_BACKWARD),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+TRIGRAM_INDEXES = [
+    ("catalog_knowledgebase", "title"),
+    ("catalog_category", "topic"),
+    ("catalog_employee", "first_name"),
+    ("catalog_employee", "last_name"),
+]
+
+POSTGRES_FORWARD = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm "
+    f"ON {table} USING GIN ({column} gin_trgm_ops)"
+    for table, column in TRIGRAM_INDEXES
+]
+POSTGRES_BACKWARD = [
+    f"DROP INDEX IF EXISTS {table}_{column}_trgm"
+    for table, column in TRIGRAM_INDEXES
+]
+
+
+def run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0006_article_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgres(POSTGRES_FORWARD),
+            run_on_postgres(POSTGRES_BACKWARD),
+        ),
+    ]
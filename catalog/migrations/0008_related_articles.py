@@ -0,0 +1,57 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0007_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedArticle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("rank", models.PositiveSmallIntegerField()),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_links",
+                        to="catalog.article",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="linked_from",
+                        to="catalog.article",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "related article",
+                "verbose_name_plural": "related articles",
+                "ordering": ["article", "rank"],
+                "indexes": [
+                    models.Index(
+                        fields=["article", "rank"],
+                        name="related_article_rank_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0008_related_articles"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleSignature",
+            fields=[
+                (
+                    "article",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="signature",
+                        serialize=False,
+                        to="catalog.article",
+                    ),
+                ),
+                ("minhash", models.BinaryField()),
+            ],
+            options={
+                "verbose_name": "article signature",
+                "verbose_name_plural": "article signatures",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArticleBand",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("band", models.PositiveSmallIntegerField()),
+                ("bucket", models.BigIntegerField()),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bands",
+                        to="catalog.article",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "article band",
+                "verbose_name_plural": "article bands",
+                "indexes": [
+                    models.Index(
+                        fields=["band", "bucket"],
+                        name="article_band_bucket_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DuplicateArticle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("similarity", models.FloatField()),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="duplicate_links",
+                        to="catalog.article",
+                    ),
+                ),
+                (
+                    "duplicate",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="duplicated_by",
+                        to="catalog.article",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "duplicate article",
+                "verbose_name_plural": "duplicate articles",
+                "ordering": ["article", "-similarity"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("article", "duplicate"),
+                        name="unique_duplicate_per_article",
+                    )
+                ],
+            },
+        ),
+    ]
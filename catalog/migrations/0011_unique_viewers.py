@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0010_saved_searches"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleViewers",
+            fields=[
+                (
+                    "article",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="viewers",
+                        serialize=False,
+                        to="catalog.article",
+                    ),
+                ),
+                ("registers", models.BinaryField()),
+                ("estimate", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "article viewers",
+                "verbose_name_plural": "article viewers",
+            },
+        ),
+        migrations.CreateModel(
+            name="CategoryViewers",
+            fields=[
+                (
+                    "category",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="viewers",
+                        serialize=False,
+                        to="catalog.category",
+                    ),
+                ),
+                ("registers", models.BinaryField()),
+                ("estimate", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "category viewers",
+                "verbose_name_plural": "category viewers",
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0011_unique_viewers"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[
+                            ("hour", "Hour"),
+                            ("day", "Day"),
+                            ("month", "Month"),
+                        ],
+                        max_length=5,
+                    ),
+                ),
+                ("start", models.DateTimeField()),
+                ("views", models.PositiveIntegerField(default=0)),
+                ("ratings", models.PositiveIntegerField(default=0)),
+                ("comments", models.PositiveIntegerField(default=0)),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="activity",
+                        to="catalog.article",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "article activity",
+                "verbose_name_plural": "article activity",
+                "ordering": ["start"],
+                "indexes": [
+                    models.Index(
+                        fields=["period", "start"],
+                        name="activity_period_start_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("article", "period", "start"),
+                        name="unique_activity_per_article_period",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0012_article_activity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleTrend",
+            fields=[
+                (
+                    "article",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trend",
+                        serialize=False,
+                        to="catalog.article",
+                    ),
+                ),
+                ("is_published", models.BooleanField(default=False)),
+                ("score", models.FloatField(null=True)),
+                (
+                    "knowledge_base",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="article_trends",
+                        to="catalog.knowledgebase",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "article trend",
+                "verbose_name_plural": "article trends",
+                "indexes": [
+                    models.Index(
+                        fields=["is_published", "-score"],
+                        name="trend_score_idx",
+                    ),
+                    models.Index(
+                        fields=["knowledge_base", "is_published", "-score"],
+                        name="trend_kb_score_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
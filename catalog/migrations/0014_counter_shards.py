@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0013_article_trends"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CounterShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50)),
+                ("object_id", models.BigIntegerField()),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "counter shard",
+                "verbose_name_plural": "counter shards",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("name", "object_id", "shard"),
+                        name="unique_counter_shard",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0014_counter_shards"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total_knowledge_bases",
+                    models.PositiveIntegerField(default=0),
+                ),
+                ("total_categories", models.PositiveIntegerField(default=0)),
+                ("total_articles", models.PositiveIntegerField(default=0)),
+                ("total_comments", models.PositiveIntegerField(default=0)),
+                ("total_authors", models.PositiveIntegerField(default=0)),
+                ("total_employees", models.PositiveIntegerField(default=0)),
+                ("reconciled_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "site statistics",
+                "verbose_name_plural": "site statistics",
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0015_site_statistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("board", models.CharField(max_length=20)),
+                ("object_id", models.BigIntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "knowledge_base",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard_entries",
+                        to="catalog.knowledgebase",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "leaderboard entry",
+                "verbose_name_plural": "leaderboard entries",
+                "indexes": [
+                    models.Index(
+                        fields=[
+                            "board",
+                            "knowledge_base",
+                            "-score",
+                            "object_id",
+                        ],
+                        name="leaderboard_rank_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def total(rows, outer, aggregate):
+    """Aggregate over the rows whose outer is the updated row, or 0."""
+
+    return Coalesce(Subquery(
+        rows.filter(**{outer: OuterRef("pk")}).order_by().values(
+            outer
+        ).annotate(total=aggregate).values("total")
+    ), 0)
+
+
+def count_totals(apps, schema_editor):
+    Article = apps.get_model("catalog", "Article")
+    Category = apps.get_model("catalog", "Category")
+    Comment = apps.get_model("catalog", "Comment")
+    KnowledgeBase = apps.get_model("catalog", "KnowledgeBase")
+
+    articles = Article.objects.filter(is_published=True)
+    comments = Comment.objects.filter(article__is_published=True)
+    Category.objects.update(
+        published_articles_count=total(articles, "category", Count("pk")),
+        authors_count=total(
+            articles, "category", Count("author", distinct=True)
+        ),
+        comments_count=total(comments, "article__category", Count("pk")),
+    )
+    KnowledgeBase.objects.update(
+        categories_count=total(
+            Category.objects.all(), "knowledge_base", Count("pk")
+        ),
+        published_articles_count=total(
+            articles, "category__knowledge_base", Count("pk")
+        ),
+        authors_count=total(
+            articles,
+            "category__knowledge_base",
+            Count("author", distinct=True),
+        ),
+        comments_count=total(
+            comments, "article__category__knowledge_base", Count("pk")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0016_leaderboards"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="authors_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="published_articles_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="knowledgebase",
+            name="authors_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="knowledgebase",
+            name="categories_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="knowledgebase",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="knowledgebase",
+            name="published_articles_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_totals, migrations.RunPython.noop),
+    ]
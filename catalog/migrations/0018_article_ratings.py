@@ -0,0 +1,101 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:20
+
+from django.db import migrations, models
+from django.db.models import (
+    Count,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def total(rows, outer, aggregate):
+    """Aggregate over the rows whose outer is the updated row, or 0."""
+
+    return Coalesce(Subquery(
+        rows.filter(**{outer: OuterRef("pk")}).order_by().values(
+            outer
+        ).annotate(total=aggregate).values("total")
+    ), 0)
+
+
+def count_ratings(apps, schema_editor):
+    Article = apps.get_model("catalog", "Article")
+    Rating = apps.get_model("catalog", "Rating")
+
+    ratings = Rating.objects.all()
+    Article.objects.update(
+        rating_sum=total(ratings, "article", Sum("rating")),
+        rating_count=total(ratings, "article", Count("pk")),
+        **{
+            f"rating_{value}_count": total(
+                ratings.filter(rating=value), "article", Count("pk")
+            )
+            for value in range(1, 6)
+        },
+    )
+    Article.objects.update(rating_average=Coalesce(
+        Cast(F("rating_sum"), FloatField()) / NullIf(F("rating_count"), 0),
+        Value(0.0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0017_catalog_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="rating_1_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="rating_2_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="rating_3_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="rating_4_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="rating_5_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="rating_average",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["-rating_average"], name="article_rating_idx"
+            ),
+        ),
+        migrations.RunPython(count_ratings, migrations.RunPython.noop),
+    ]
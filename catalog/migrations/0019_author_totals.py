@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:24
+
+import catalog.models
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def total(rows, outer, aggregate):
+    """Aggregate over the rows whose outer is the updated row, or 0."""
+
+    return Coalesce(Subquery(
+        rows.filter(**{outer: OuterRef("pk")}).order_by().values(
+            outer
+        ).annotate(total=aggregate).values("total")
+    ), 0)
+
+
+def count_author_totals(apps, schema_editor):
+    Article = apps.get_model("catalog", "Article")
+    Employee = apps.get_model("catalog", "Employee")
+
+    articles = Article.objects.filter(is_published=True)
+    Employee.objects.update(
+        published_articles_total=total(articles, "author", Count("pk")),
+        published_rating_sum=total(articles, "author", Sum("rating_sum")),
+        published_rating_count=total(
+            articles, "author", Sum("rating_count")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0018_article_ratings"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="employee",
+            managers=[
+                ("objects", catalog.models.EmployeeManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="employee",
+            name="published_articles_total",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="employee",
+            name="published_rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="employee",
+            name="published_rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            count_author_totals, migrations.RunPython.noop
+        ),
+    ]
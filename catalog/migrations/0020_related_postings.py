@@ -0,0 +1,70 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0019_author_totals"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "term",
+                    models.CharField(blank=True, max_length=64, unique=True),
+                ),
+                ("idf", models.FloatField()),
+            ],
+            options={
+                "verbose_name": "related term",
+                "verbose_name_plural": "related terms",
+            },
+        ),
+        migrations.CreateModel(
+            name="RelatedPosting",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                ("weight", models.FloatField()),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_postings",
+                        to="catalog.article",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "related posting",
+                "verbose_name_plural": "related postings",
+                "indexes": [
+                    models.Index(
+                        fields=["term"], name="related_posting_term_idx"
+                    )
+                ],
+            },
+        ),
+    ]
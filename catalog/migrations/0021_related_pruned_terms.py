@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0020_related_postings"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="relatedposting",
+            name="related_posting_term_idx",
+        ),
+        migrations.AddField(
+            model_name="relatedterm",
+            name="pruned",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="relatedposting",
+            index=models.Index(
+                fields=["term", "-weight"], name="related_posting_term_idx"
+            ),
+        ),
+    ]
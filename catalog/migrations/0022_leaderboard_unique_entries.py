@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:51
+
+from django.db import migrations, models
+
+
+def drop_duplicate_entries(apps, schema_editor):
+    LeaderboardEntry = apps.get_model("catalog", "LeaderboardEntry")
+    seen = set()
+    duplicates = []
+    for pk, *key in LeaderboardEntry.objects.order_by(
+        "-score", "pk"
+    ).values_list("pk", "board", "knowledge_base_id", "object_id"):
+        if tuple(key) in seen:
+            duplicates.append(pk)
+        seen.add(tuple(key))
+    LeaderboardEntry.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0021_related_pruned_terms"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            drop_duplicate_entries, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="leaderboardentry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("knowledge_base__isnull", False)),
+                fields=("board", "knowledge_base", "object_id"),
+                name="unique_leaderboard_entry",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="leaderboardentry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("knowledge_base__isnull", True)),
+                fields=("board", "object_id"),
+                name="unique_site_leaderboard_entry",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0022_leaderboard_unique_entries"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RepeatViewFilter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("window", models.FloatField()),
+                ("capacity", models.PositiveIntegerField()),
+                ("error_rate", models.FloatField()),
+                ("started", models.FloatField()),
+                ("current", models.BinaryField()),
+                ("current_count", models.PositiveIntegerField(default=0)),
+                ("previous", models.BinaryField()),
+            ],
+            options={
+                "verbose_name": "repeat view filter",
+                "verbose_name_plural": "repeat view filters",
+            },
+        ),
+    ]
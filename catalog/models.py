@@ -1,9 +1,49 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
-from django.db.models import Avg
+from django.db.models import Count, F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
 
+from catalog.loaders import BatchLoadingQuerySet, batched_property
 
-class KnowledgeBase(models.Model):
+
+class StoredTotalsMixin:
+    """
+    Saving an existing row leaves its stored totals alone, so a stale
+    instance cannot overwrite counts kept in place by catalog/stats.
+    Loaded values are remembered to detect changes on save; saved
+    values become the new loaded values.
+    """
+
+    stored_totals = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_value(self, field_name, default=None):
+        """Value of a field as it was loaded from the database."""
+
+        return getattr(self, "_loaded_values", {}).get(field_name, default)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.stored_totals
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+
+
+class KnowledgeBase(StoredTotalsMixin, models.Model):
     """
     A model for organizing thematic knowledge bases.
     Each knowledge base can contain categories and articles.
@@ -31,6 +71,26 @@ class KnowledgeBase(models.Model):
         verbose_name="created_by",
     )
 
+    # Maintained by catalog/stats/totals.py
+    categories_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    published_articles_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    authors_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    stored_totals = (
+        "categories_count",
+        "published_articles_count",
+        "authors_count",
+        "comments_count",
+    )
+
     class Meta:
         ordering = ["title"]
 
@@ -38,7 +98,7 @@ class KnowledgeBase(models.Model):
         return self.title
 
 
-class Category(models.Model):
+class Category(StoredTotalsMixin, models.Model):
     """
     A model for categories of articles within a knowledge base.
     Each category belongs to a specific KnowledgeBase.
@@ -58,6 +118,22 @@ class Category(models.Model):
         verbose_name="created_by",
     )
 
+    # Maintained by catalog/stats/totals.py
+    published_articles_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    authors_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    stored_totals = (
+        "published_articles_count",
+        "authors_count",
+        "comments_count",
+    )
+
     class Meta:
         ordering = ["topic"]
         verbose_name = "category"
@@ -73,7 +149,33 @@ class Category(models.Model):
         return f"{self.topic}"
 
 
-class Employee(AbstractUser):
+class EmployeeQuerySet(models.QuerySet):
+    def authors(self):
+        """Employees with at least one published article."""
+
+        return self.filter(published_articles_total__gt=0)
+
+    def with_author_stats(self):
+        """
+        Annotate author_average, the author rating as a column to sort
+        or filter on; the stored totals come with every row.
+        """
+
+        return self.annotate(author_average=Coalesce(
+            Round(
+                Cast(F("published_rating_sum"), FloatField())
+                / NullIf(F("published_rating_count"), 0),
+                1,
+            ),
+            Value(0.0),
+        ))
+
+
+class EmployeeManager(UserManager.from_queryset(EmployeeQuerySet)):
+    """UserManager with the author statistics of EmployeeQuerySet."""
+
+
+class Employee(StoredTotalsMixin, AbstractUser):
     """
     Employee model that inherits from AbstractUser.
     Extends the standard user model with additional fields.
@@ -96,6 +198,24 @@ class Employee(AbstractUser):
         verbose_name="level",
     )
 
+    # Maintained by catalog/stats/authors.py
+    published_articles_total = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    published_rating_sum = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    published_rating_count = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    stored_totals = (
+        "published_articles_total",
+        "published_rating_sum",
+        "published_rating_count",
+    )
+
+    objects = EmployeeManager()
+
     class Meta:
         ordering = ["username"]
         verbose_name = "employee"
@@ -116,24 +236,20 @@ class Employee(AbstractUser):
     def published_articles_count(self):
         """Number of articles published."""
 
-        return self.articles.filter(is_published=True).count()
+        return self.published_articles_total
 
     @property
     def author_rating(self):
-        """Rating of an author."""
+        """Average of the ratings of the author's published articles."""
 
-        aggregation_result = self.articles.filter(
-            is_published=True,
-            ratings__isnull=False,
-        ).aggregate(
-            avg_rating=Avg("ratings__rating"),
+        if not self.published_rating_count:
+            return 0
+        return round(
+            self.published_rating_sum / self.published_rating_count, 1
         )
-        average_rating_value = aggregation_result["avg_rating"]
 
-        return round(average_rating_value, 1) if average_rating_value else 0
 
-
-class Article(models.Model):
+class Article(StoredTotalsMixin, models.Model):
     """
     Model for articles in the knowledge base.
     Each article belongs to a specific category and knowledge base.
@@ -162,14 +278,75 @@ class Article(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     reading_time = models.PositiveIntegerField(default=0)
 
+    # Maintained by catalog/stats/ratings.py
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    stored_totals = (
+        "views_count",
+        "rating_sum",
+        "rating_count",
+        "rating_average",
+        "rating_1_count",
+        "rating_2_count",
+        "rating_3_count",
+        "rating_4_count",
+        "rating_5_count",
+    )
+
+    objects = BatchLoadingQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "article"
         verbose_name_plural = "articles"
+        indexes = [
+            models.Index(
+                fields=["-rating_average"], name="article_rating_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @batched_property(default=0)
+    def comment_count(articles):
+        """Number of comments."""
+
+        return dict(
+            Comment.objects.filter(article__in=articles).order_by().values(
+                "article"
+            ).annotate(total=Count("pk")).values_list("article", "total")
+        )
+
+    @batched_property(default=0)
+    def views_total(articles):
+        """Views, with those not consolidated into views_count yet."""
+
+        from catalog.stats.counters import article_views
+
+        pending = article_views.pending_counts(
+            [article.pk for article in articles]
+        )
+        return {
+            article.pk: article.views_count + pending.get(article.pk, 0)
+            for article in articles
+        }
+
+    @property
+    def rating_histogram(self):
+        """Number of ratings of each value, 1 to 5."""
+
+        return {
+            value: getattr(self, f"rating_{value}_count")
+            for value in range(1, 6)
+        }
+
     def save(self, *args, **kwargs):
         """Auto-calculate reading time based on content length."""
 
@@ -252,3 +429,487 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"{self.commentator.full_name} - {self.article.title}"
+
+
+class RelatedArticle(models.Model):
+    """
+    Precomputed neighbour of a published article, by content
+    similarity. Rows of an article are ordered by rank.
+    """
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="related_links",
+    )
+
+    related = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="linked_from",
+    )
+
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ["article", "rank"]
+        verbose_name = "related article"
+        verbose_name_plural = "related articles"
+        indexes = [
+            models.Index(
+                fields=["article", "rank"],
+                name="related_article_rank_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} -> {self.related_id}"
+
+
+class RelatedTerm(models.Model):
+    """
+    Inverse document frequency of a term over the published articles
+    of the last full related articles rebuild. The empty term holds
+    the weight of terms that rebuild did not see. Pruned terms are
+    too common to score similarity and have no postings.
+    """
+
+    term = models.CharField(max_length=64, unique=True, blank=True)
+    idf = models.FloatField()
+    pruned = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "related term"
+        verbose_name_plural = "related terms"
+
+    def __str__(self):
+        return self.term
+
+
+class RelatedPosting(models.Model):
+    """Weight of a term in the TF-IDF vector of a published article."""
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="related_postings",
+    )
+
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()
+
+    class Meta:
+        verbose_name = "related posting"
+        verbose_name_plural = "related postings"
+        indexes = [
+            models.Index(
+                fields=["term", "-weight"], name="related_posting_term_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.article_id}: {self.term}"
+
+
+class ArticleSignature(models.Model):
+    """MinHash signature of an article, packed unsigned 32-bit ints."""
+
+    article = models.OneToOneField(
+        Article,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="signature",
+    )
+
+    minhash = models.BinaryField()
+
+    class Meta:
+        verbose_name = "article signature"
+        verbose_name_plural = "article signatures"
+
+    def __str__(self):
+        return f"{self.article_id}"
+
+
+class ArticleBand(models.Model):
+    """LSH bucket of one band of an article's MinHash signature."""
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="bands",
+    )
+
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "article band"
+        verbose_name_plural = "article bands"
+        indexes = [
+            models.Index(
+                fields=["band", "bucket"],
+                name="article_band_bucket_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.article_id}: {self.band}/{self.bucket}"
+
+
+class DuplicateArticle(models.Model):
+    """
+    Likely near-duplicate of an article, with estimated Jaccard
+    similarity. Stored in both directions.
+    """
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="duplicate_links",
+    )
+
+    duplicate = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="duplicated_by",
+    )
+
+    similarity = models.FloatField()
+
+    class Meta:
+        ordering = ["article", "-similarity"]
+        verbose_name = "duplicate article"
+        verbose_name_plural = "duplicate articles"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["article", "duplicate"],
+                name="unique_duplicate_per_article"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} ~ {self.duplicate_id}"
+
+
+class SavedSearch(models.Model):
+    """
+    Article query an employee subscribed to.
+    The anchor is the query's longest term (cut to the prefix
+    length used by search); a published article is only checked
+    against subscriptions whose anchor it contains.
+    """
+
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name="saved_searches",
+    )
+
+    query = models.CharField(max_length=255)
+    anchor = models.CharField(max_length=32, db_index=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "saved search"
+        verbose_name_plural = "saved searches"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["employee", "query"],
+                name="unique_saved_search_per_employee"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.employee.full_name} - {self.query}"
+
+    def save(self, *args, **kwargs):
+        """Normalize the query and derive its anchor."""
+
+        from catalog.search.cache import normalize_query
+        from catalog.search.percolator import query_anchor
+
+        self.query = normalize_query(self.query)
+        self.anchor = query_anchor(self.query)
+        super().save(*args, **kwargs)
+
+
+class SavedSearchMatch(models.Model):
+    """Article published after a saved search matched it."""
+
+    saved_search = models.ForeignKey(
+        SavedSearch,
+        on_delete=models.CASCADE,
+        related_name="matches",
+    )
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="saved_search_matches",
+    )
+
+    seen = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "saved search match"
+        verbose_name_plural = "saved search matches"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["saved_search", "article"],
+                name="unique_match_per_saved_search"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.saved_search.query} - {self.article.title}"
+
+
+class ArticleViewers(models.Model):
+    """HyperLogLog sketch of the employees who viewed an article."""
+
+    article = models.OneToOneField(
+        Article,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="viewers",
+    )
+
+    registers = models.BinaryField()
+    estimate = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "article viewers"
+        verbose_name_plural = "article viewers"
+
+    def __str__(self):
+        return f"{self.article_id}: {self.estimate}"
+
+
+class CategoryViewers(models.Model):
+    """HyperLogLog sketch of the employees who viewed a category."""
+
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="viewers",
+    )
+
+    registers = models.BinaryField()
+    estimate = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "category viewers"
+        verbose_name_plural = "category viewers"
+
+    def __str__(self):
+        return f"{self.category_id}: {self.estimate}"
+
+
+class ArticleActivity(models.Model):
+    """
+    Views, ratings and comments of an article in one hour, day or
+    month starting at start.
+    """
+
+    HOUR = "hour"
+    DAY = "day"
+    MONTH = "month"
+    PERIOD_CHOICES = [
+        (HOUR, "Hour"),
+        (DAY, "Day"),
+        (MONTH, "Month"),
+    ]
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="activity",
+    )
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    ratings = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["start"]
+        verbose_name = "article activity"
+        verbose_name_plural = "article activity"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["article", "period", "start"],
+                name="unique_activity_per_article_period"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["period", "start"],
+                name="activity_period_start_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} {self.period} {self.start}"
+
+
+class ArticleTrend(models.Model):
+    """
+    Time-decayed activity score of an article, kept in log space
+    (see catalog/stats/trending.py). The knowledge base and publish
+    state are copied here so the top trending articles, overall or
+    per knowledge base, are read from one index.
+    """
+
+    article = models.OneToOneField(
+        Article,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trend",
+    )
+
+    knowledge_base = models.ForeignKey(
+        KnowledgeBase,
+        on_delete=models.CASCADE,
+        related_name="article_trends",
+    )
+
+    is_published = models.BooleanField(default=False)
+    score = models.FloatField(null=True)
+
+    class Meta:
+        verbose_name = "article trend"
+        verbose_name_plural = "article trends"
+        indexes = [
+            models.Index(
+                fields=["is_published", "-score"],
+                name="trend_score_idx",
+            ),
+            models.Index(
+                fields=["knowledge_base", "is_published", "-score"],
+                name="trend_kb_score_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id}: {self.score}"
+
+
+class CounterShard(models.Model):
+    """
+    One of the rows a sharded counter of an object is split over
+    (see catalog/stats/counters.py).
+    """
+
+    name = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    shard = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "counter shard"
+        verbose_name_plural = "counter shards"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "object_id", "shard"],
+                name="unique_counter_shard"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name}:{self.object_id}:{self.shard} = {self.count}"
+
+
+class RepeatViewFilter(models.Model):
+    """
+    The shared rotating Bloom filter of recent views, in a single row
+    locked by each view buffer flush (see catalog/stats/bloom.py).
+    """
+
+    window = models.FloatField()
+    capacity = models.PositiveIntegerField()
+    error_rate = models.FloatField()
+    started = models.FloatField()
+    current = models.BinaryField()
+    current_count = models.PositiveIntegerField(default=0)
+    previous = models.BinaryField()
+
+    class Meta:
+        verbose_name = "repeat view filter"
+        verbose_name_plural = "repeat view filters"
+
+    def __str__(self):
+        return f"Repeat view filter ({self.current_count} views)"
+
+
+class SiteStatistics(models.Model):
+    """
+    Site-wide totals in a single row, kept current by signals
+    (see catalog/stats/site.py).
+    """
+
+    total_knowledge_bases = models.PositiveIntegerField(default=0)
+    total_categories = models.PositiveIntegerField(default=0)
+    total_articles = models.PositiveIntegerField(default=0)
+    total_comments = models.PositiveIntegerField(default=0)
+    total_authors = models.PositiveIntegerField(default=0)
+    total_employees = models.PositiveIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "site statistics"
+        verbose_name_plural = "site statistics"
+
+    def __str__(self):
+        return "Site statistics"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    One of the top objects of a leaderboard, site-wide (no knowledge
+    base) or within a knowledge base (see catalog/stats/leaderboards.py).
+    """
+
+    board = models.CharField(max_length=20)
+    knowledge_base = models.ForeignKey(
+        KnowledgeBase,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="leaderboard_entries",
+    )
+    object_id = models.BigIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = "leaderboard entry"
+        verbose_name_plural = "leaderboard entries"
+        indexes = [
+            models.Index(
+                fields=["board", "knowledge_base", "-score", "object_id"],
+                name="leaderboard_rank_idx",
+            )
+        ]
+        # Site-wide entries have no knowledge base, and NULLs are
+        # distinct in a unique index, so they get their own.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["board", "knowledge_base", "object_id"],
+                condition=models.Q(knowledge_base__isnull=False),
+                name="unique_leaderboard_entry",
+            ),
+            models.UniqueConstraint(
+                fields=["board", "object_id"],
+                condition=models.Q(knowledge_base__isnull=True),
+                name="unique_site_leaderboard_entry",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.board}: {self.object_id} ({self.score})"
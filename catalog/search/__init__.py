@@ -0,0 +1,3 @@
+from catalog.search.backends import get_search_backend, order_by_ids
+
+__all__ = ["get_search_backend", "order_by_ids"]
@@ -0,0 +1,268 @@
+"""
+Search-as-you-type suggestions served from memory.
+
+Every suggestion is stored under its normalized full label and
+under each word of the label in one sorted array. Every prefix of
+those keys up to TOP_DEPTH characters keeps its TOP_LIMIT heaviest
+suggestions per kind, so a short prefix is one dict lookup however
+many keys share it. Longer prefixes match few keys and are a bisect
+plus a forward scan.
+
+Workers build the index when the WSGI application is loaded (see
+knowledge_hub/wsgi.py), not in their first request. Articles weigh
+their consolidated views: view counts are written with UPDATE, not
+save(), so consolidate_counters refreshes the weights of the
+articles it changed.
+"""
+import heapq
+import logging
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import DatabaseError
+from django.urls import reverse
+
+from catalog.search.memory import InProcessIndex
+from catalog.search.text import normalize, tokenize
+
+DEFAULT_LIMIT = 5
+TOP_LIMIT = 20
+TOP_DEPTH = 10
+
+logger = logging.getLogger(__name__)
+
+
+def employee_label(first_name, last_name, username) -> str:
+    if first_name and last_name:
+        return f"{first_name} {last_name}"
+    return username
+
+
+SOURCES = {
+    "articles": {
+        "model": "catalog.Article",
+        "fields": ("title", "views_count"),
+        "filter": {"is_published": True},
+        "label": lambda title, views_count: title,
+        "weight": lambda title, views_count: views_count,
+        "url": "catalog:article-detail",
+    },
+    "knowledge_bases": {
+        "model": "catalog.KnowledgeBase",
+        "fields": ("title",),
+        "filter": {},
+        "label": lambda title: title,
+        "weight": lambda title: 0,
+        "url": "catalog:knowledge-base-detail",
+    },
+    "categories": {
+        "model": "catalog.Category",
+        "fields": ("topic",),
+        "filter": {},
+        "label": lambda topic: topic,
+        "weight": lambda topic: 0,
+        "url": "catalog:category-detail",
+    },
+    "employees": {
+        "model": "catalog.Employee",
+        "fields": ("first_name", "last_name", "username"),
+        "filter": {},
+        "label": employee_label,
+        "weight": lambda first_name, last_name, username: 0,
+        "url": "catalog:employee-detail",
+    },
+}
+KINDS_BY_MODEL = {source["model"]: kind for kind, source in SOURCES.items()}
+
+
+def suggestion_keys(label: str) -> list[str]:
+    """The full normalized label and every word of it."""
+
+    keys = [normalize(label)]
+    keys.extend(tokenize(label))
+    return [key for key in dict.fromkeys(keys) if key]
+
+
+def key_prefixes(keys) -> set[str]:
+    """Prefixes of keys that keep a precomputed top list."""
+
+    return {
+        key[:length]
+        for key in keys
+        for length in range(1, min(len(key), TOP_DEPTH) + 1)
+    }
+
+
+class PrefixIndex(InProcessIndex):
+    """
+    Sorted array of (key, kind, pk) for every suggestion, and the
+    heaviest pks of each (prefix, kind) in top.
+    """
+
+    generation_key = "autocomplete"
+
+    def reset(self) -> None:
+        self.keys = []
+        self.items = {}
+        self.top = {}
+
+    def build(self) -> None:
+        for kind, source in SOURCES.items():
+            rows = apps.get_model(source["model"]).objects.filter(
+                **source["filter"]
+            ).values_list("pk", *source["fields"]).iterator()
+            for pk, *values in rows:
+                self._add(kind, pk, values, incremental=False)
+        self.keys.sort()
+
+        candidates = defaultdict(set)
+        for (kind, pk), (_, _, keys) in self.items.items():
+            for prefix in key_prefixes(keys):
+                candidates[prefix, kind].add(pk)
+        self.top = {
+            (prefix, kind): self.heaviest(kind, pks)
+            for (prefix, kind), pks in candidates.items()
+        }
+
+    def rank(self, kind, pk):
+        label, weight, _ = self.items[kind, pk]
+        return -weight, label.lower(), pk
+
+    def heaviest(self, kind, pks) -> list:
+        return heapq.nsmallest(
+            TOP_LIMIT, pks, key=lambda pk: self.rank(kind, pk)
+        )
+
+    def scan(self, prefix: str) -> dict:
+        """pks per kind of every key starting with prefix."""
+
+        candidates = defaultdict(set)
+        position = bisect_left(self.keys, (prefix,))
+        while position < len(self.keys):
+            key, kind, pk = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            candidates[kind].add(pk)
+            position += 1
+        return candidates
+
+    def _add(self, kind, pk, values, incremental=True) -> None:
+        source = SOURCES[kind]
+        label = source["label"](*values)
+        keys = suggestion_keys(label)
+        self.items[kind, pk] = (label, source["weight"](*values), keys)
+        for key in keys:
+            if incremental:
+                insort(self.keys, (key, kind, pk))
+            else:
+                self.keys.append((key, kind, pk))
+        if not incremental:
+            return
+
+        for prefix in key_prefixes(keys):
+            top = self.top.setdefault((prefix, kind), [])
+            top.append(pk)
+            top.sort(key=lambda other: self.rank(kind, other))
+            del top[TOP_LIMIT:]
+
+    def _remove(self, kind, pk) -> None:
+        item = self.items.get((kind, pk))
+        if item is None:
+            return
+        for key in item[2]:
+            position = bisect_left(self.keys, (key, kind, pk))
+            if (
+                position < len(self.keys)
+                and self.keys[position] == (key, kind, pk)
+            ):
+                del self.keys[position]
+
+        # A full list may have left out the next heaviest suggestion.
+        for prefix in key_prefixes(item[2]):
+            top = self.top.get((prefix, kind), [])
+            if pk not in top:
+                continue
+            if len(top) < TOP_LIMIT:
+                top.remove(pk)
+            else:
+                pks = self.scan(prefix)[kind]
+                pks.discard(pk)
+                top[:] = self.heaviest(kind, pks)
+            if not top:
+                del self.top[prefix, kind]
+        del self.items[kind, pk]
+
+    def apply(self, change) -> None:
+        for kind, pk, values in change:
+            self._remove(kind, pk)
+            if values is not None:
+                self._add(kind, pk, values)
+
+    def update(self, instance) -> None:
+        kind = KINDS_BY_MODEL[instance._meta.label]
+        source = SOURCES[kind]
+        values = None
+        if all(
+            getattr(instance, field) == value
+            for field, value in source["filter"].items()
+        ):
+            values = [getattr(instance, field) for field in source["fields"]]
+        self.publish([(kind, instance.pk, values)])
+
+    def refresh(self, model, pks) -> None:
+        """Reload rows changed without save(), as one change."""
+
+        kind = KINDS_BY_MODEL[model._meta.label]
+        source = SOURCES[kind]
+        rows = {
+            pk: values for pk, *values in model.objects.filter(
+                pk__in=pks, **source["filter"]
+            ).values_list("pk", *source["fields"])
+        }
+        self.publish([(kind, pk, rows.get(pk)) for pk in pks])
+
+    def remove(self, model, pk) -> None:
+        self.publish([(KINDS_BY_MODEL[model._meta.label], pk, None)])
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_LIMIT) -> dict:
+        """Top suggestions per kind for a prefix, heaviest first."""
+
+        self.ensure_fresh()
+        suggestions = {kind: [] for kind in SOURCES}
+        prefix = normalize(prefix)
+        if not prefix:
+            return suggestions
+
+        limit = min(limit, TOP_LIMIT)
+        if len(prefix) > TOP_DEPTH:
+            candidates = self.scan(prefix)
+        for kind in SOURCES:
+            if len(prefix) > TOP_DEPTH:
+                ranked = self.heaviest(kind, candidates[kind])
+            else:
+                ranked = self.top.get((prefix, kind), [])
+            suggestions[kind] = [
+                {
+                    "id": pk,
+                    "label": self.items[kind, pk][0],
+                    "url": reverse(SOURCES[kind]["url"], args=[pk]),
+                }
+                for pk in ranked[:limit]
+            ]
+        return suggestions
+
+
+prefix_index = PrefixIndex()
+
+
+def warm_up() -> None:
+    """
+    Build the index ahead of the first request; if the database is
+    not ready (e.g. before migrate), the first lookup builds it.
+    """
+
+    try:
+        prefix_index.ensure_fresh()
+    except DatabaseError:
+        logger.warning("Suggestions will be indexed on first use.")
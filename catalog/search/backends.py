@@ -0,0 +1,350 @@
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from catalog.search.text import tokenize
+
+DEFAULT_SEARCH_BACKEND = "catalog.search.backends.SimpleSearchBackend"
+DEFAULT_SEARCH_RESULTS_LIMIT = 1000
+
+_backends = {}
+
+
+def get_search_backend():
+    """Return the article search backend configured in settings."""
+
+    path = getattr(settings, "SEARCH_BACKEND", DEFAULT_SEARCH_BACKEND)
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+@receiver(setting_changed)
+def reset_search_backends(setting, **kwargs):
+    if setting.startswith("SEARCH_"):
+        _backends.clear()
+
+
+def order_by_ids(queryset, ids: list[int]):
+    """Restrict queryset to ids and keep the order of the list."""
+
+    if not ids:
+        return queryset.none()
+
+    return queryset.filter(pk__in=ids).order_by(
+        Case(
+            *[When(pk=pk, then=Value(position))
+              for position, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+    )
+
+
+class BaseSearchBackend:
+    """
+    Interface of an article search backend.
+    Backends keep their own index in sync through
+    index_article/remove_article and return ranked article ids.
+    """
+
+    @property
+    def limit(self) -> int:
+        return getattr(
+            settings,
+            "SEARCH_RESULTS_LIMIT",
+            DEFAULT_SEARCH_RESULTS_LIMIT
+        )
+
+    def index_article(self, article) -> None:
+        raise NotImplementedError
+
+    def remove_article(self, article_id: int) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int | None = None) -> list[int]:
+        """Return ids of matching articles, best match first."""
+
+        raise NotImplementedError
+
+    def rebuild(self, articles) -> int:
+        """Drop the index and index every article again."""
+
+        self.clear()
+        total = 0
+        for article in articles:
+            self.index_article(article)
+            total += 1
+        return total
+
+    def filter_queryset(self, queryset, query: str):
+        """Narrow an Article queryset to ranked search results."""
+
+        return order_by_ids(queryset, self.search(query))
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Fallback backend without an index.
+    Used on databases that have no full-text search support.
+    """
+
+    def index_article(self, article) -> None:
+        pass
+
+    def remove_article(self, article_id: int) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def search(self, query: str, limit: int | None = None) -> list[int]:
+        from catalog.models import Article
+
+        return list(
+            self.filter_queryset(Article.objects.all(), query)
+            .values_list("pk", flat=True)[:limit or self.limit]
+        )
+
+    def filter_queryset(self, queryset, query: str):
+        condition = Q()
+        for token in tokenize(query):
+            condition &= (
+                Q(title__icontains=token) | Q(content__icontains=token)
+            )
+        return queryset.filter(condition).order_by("-created_at")
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 backend.
+    Articles are stored in the catalog_article_fts virtual table
+    (rowid = article id) and ranked with bm25(), title weighted higher.
+    """
+
+    table = "catalog_article_fts"
+    title_weight = 10.0
+    content_weight = 1.0
+
+    def index_article(self, article) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [article.pk],
+            )
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content) "
+                f"VALUES (%s, %s, %s)",
+                [article.pk, article.title, article.content],
+            )
+
+    def remove_article(self, article_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [article_id],
+            )
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """Quote every token and prefix-match it (implicit AND)."""
+
+        return " ".join(f'"{token}"*' for token in tokenize(query))
+
+    def search(self, query: str, limit: int | None = None) -> list[int]:
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} "
+                f"WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}, %s, %s) "
+                f"LIMIT %s",
+                [
+                    expression,
+                    self.title_weight,
+                    self.content_weight,
+                    limit or self.limit,
+                ],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL backend.
+    Keeps a weighted tsvector per article in catalog_article_search
+    (GIN indexed) and ranks matches with ts_rank_cd().
+    """
+
+    table = "catalog_article_search"
+    config = "english"
+
+    @property
+    def upsert(self) -> str:
+        return (
+            f"INSERT INTO {self.table} (article_id, document) "
+            f"VALUES (%s, "
+            f"setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+            f"setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+            f"ON CONFLICT (article_id) "
+            f"DO UPDATE SET document = EXCLUDED.document"
+        )
+
+    def upsert_params(self, article) -> list:
+        return [
+            article.pk,
+            self.config,
+            article.title,
+            self.config,
+            article.content,
+        ]
+
+    def index_article(self, article) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(self.upsert, self.upsert_params(article))
+
+    def remove_article(self, article_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE article_id = %s",
+                [article_id],
+            )
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    @property
+    def shadow_table(self) -> str:
+        return f"{self.table}_rebuild"
+
+    def start_rebuild(self) -> int:
+        """
+        Create an empty shadow table to rebuild the index into.
+        Returns the oldest transaction still running, whose writes
+        to the live table the shards may not see.
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.shadow_table}")
+            cursor.execute(
+                f"CREATE TABLE {self.shadow_table} ("
+                f"article_id bigint PRIMARY KEY, "
+                f"document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                "SELECT txid_snapshot_xmin(txid_current_snapshot())"
+            )
+            return cursor.fetchone()[0]
+
+    def rebuild_shard(self, first: int, last: int) -> int:
+        """
+        Index the articles first <= id < last into the shadow table.
+        One statement in autocommit: it reads the articles without
+        locking them and writes no row of the live table.
+        """
+
+        from catalog.models import Article
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.shadow_table} (article_id, document) "
+                f"SELECT id, "
+                f"setweight(to_tsvector(%s::regconfig, title), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, content), 'B') "
+                f"FROM {Article._meta.db_table} "
+                f"WHERE id >= %s AND id < %s",
+                [self.config, self.config, first, last],
+            )
+            return cursor.rowcount
+
+    def finish_rebuild(self, started: int) -> None:
+        """
+        Swap the shadow table in. Rows the live table received since
+        transaction started come from saves during the rebuild and are
+        copied over; rows of articles deleted meanwhile are dropped.
+        The live table takes no writes between the lock and the
+        commit, and searches only block for the rename. The foreign
+        key is validated after the commit, without blocking either.
+        """
+
+        from catalog.models import Article
+
+        shadow = self.shadow_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX {shadow}_document_gin "
+                f"ON {shadow} USING GIN (document)"
+            )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {self.table} IN EXCLUSIVE MODE")
+            cursor.execute(
+                f"INSERT INTO {shadow} (article_id, document) "
+                f"SELECT article_id, document FROM {self.table} "
+                f"WHERE age(xmin) <= txid_current() - %s "
+                f"ON CONFLICT (article_id) "
+                f"DO UPDATE SET document = EXCLUDED.document",
+                [started],
+            )
+            cursor.execute(
+                f"DELETE FROM {shadow} WHERE NOT EXISTS ("
+                f"SELECT 1 FROM {Article._meta.db_table} "
+                f"WHERE id = {shadow}.article_id)"
+            )
+            cursor.execute(f"DROP TABLE {self.table}")
+            cursor.execute(f"ALTER TABLE {shadow} RENAME TO {self.table}")
+            cursor.execute(
+                f"ALTER TABLE {self.table} "
+                f"RENAME CONSTRAINT {shadow}_pkey TO {self.table}_pkey"
+            )
+            cursor.execute(
+                f"ALTER INDEX {shadow}_document_gin "
+                f"RENAME TO {self.table}_document_gin"
+            )
+            cursor.execute(
+                f"ALTER TABLE {self.table} "
+                f"ADD CONSTRAINT {self.table}_article_id_fkey "
+                f"FOREIGN KEY (article_id) "
+                f"REFERENCES {Article._meta.db_table} (id) "
+                f"ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED "
+                f"NOT VALID"
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {self.table} "
+                f"VALIDATE CONSTRAINT {self.table}_article_id_fkey"
+            )
+
+    @staticmethod
+    def tsquery(query: str) -> str:
+        """Prefix-match every token (AND)."""
+
+        return " & ".join(f"{token}:*" for token in tokenize(query))
+
+    def search(self, query: str, limit: int | None = None) -> list[int]:
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT article_id FROM {self.table}, "
+                f"to_tsquery(%s::regconfig, %s) query "
+                f"WHERE document @@ query "
+                f"ORDER BY ts_rank_cd(document, query) DESC "
+                f"LIMIT %s",
+                [self.config, tsquery, limit or self.limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,151 @@
+"""
+Cache of article search results.
+
+Entries hold the ranked ids and facet counts of a normalized query +
+filters, so every page of a search is sliced from one entry and its
+total is the length of the same list.
+
+Each entry key embeds the current versions of the query's terms.
+Backends match terms by prefix, so a term is named by its first
+PREFIX_LENGTH characters; shorter query terms by their first letter.
+Names are hashed into VERSION_BUCKETS buckets and a bucket is what is
+versioned, so one change writes at most VERSION_BUCKETS + 2 keys,
+whatever the length of the article. An article's saves, publishes
+and deletes bump the buckets of its terms (before and after the
+change) in one set_many, after commit, which makes the entries that
+could have matched it unreachable; an entry whose terms only share a
+bucket with the article's is expired too. Queries without terms
+depend on NO_TERMS, bumped when articles are added, removed or
+change a listed field. Semantic searches can match any article and
+depend on ALL_ARTICLES, bumped by every change. Ratings do not bump
+versions: rating filters and counts may lag by SEARCH_CACHE_TIMEOUT.
+
+Versions are stored without expiry and only reach other workers
+through a shared cache (the database cache in production, see
+CACHES in settings/prod.py). A version the cache has evicted is
+replaced by a new one, so entries keyed under it cannot come back.
+"""
+import hashlib
+import json
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from catalog.search.text import tokenize
+
+PREFIX_LENGTH = 4
+VERSION_BUCKETS = 64
+ALL_ARTICLES = "*"
+NO_TERMS = "-"
+DEFAULT_TIMEOUT = 600
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace, punctuation and word order do not matter."""
+
+    return " ".join(sorted(set(tokenize(query or ""))))
+
+
+def version_key(term: str) -> str:
+    return f"search:version:{term}"
+
+
+def bucket(term: str) -> str:
+    digest = hashlib.blake2b(term.encode(), digest_size=4).digest()
+    return str(int.from_bytes(digest, "little") % VERSION_BUCKETS)
+
+
+def query_term(token: str) -> str:
+    """Name of the term a query token is matched by."""
+
+    if len(token) < PREFIX_LENGTH:
+        return token[:1]
+    return token[:PREFIX_LENGTH]
+
+
+def query_terms(normalized_query: str) -> set[str]:
+    """Versions a query depends on."""
+
+    terms = {bucket(query_term(token)) for token in normalized_query.split()}
+    return terms or {NO_TERMS}
+
+
+def article_terms(*texts) -> set[str]:
+    """Versions of every query with terms that can match the texts."""
+
+    terms = set()
+    for text in texts:
+        for token in tokenize(text or ""):
+            terms.add(bucket(token[:1]))
+            terms.add(bucket(token[:PREFIX_LENGTH]))
+    return terms
+
+
+def current_versions(terms: list[str]) -> dict:
+    keys = [version_key(term) for term in terms]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def result_key(normalized_query: str, filters: dict, terms=None) -> str:
+    terms = sorted(terms or query_terms(normalized_query))
+    versions = current_versions(terms)
+    payload = json.dumps([
+        normalized_query,
+        sorted(filters.items()),
+        [versions.get(version_key(term)) for term in terms],
+    ])
+    return "search:result:" + hashlib.md5(payload.encode()).hexdigest()
+
+
+def cached_search(query: str, filters: dict, compute, terms=None):
+    """
+    Return compute() for a search, cached by normalized query,
+    filters and term versions. compute returns the ranked ids and
+    facet counts. terms replaces the query's terms for searches that
+    can match articles without sharing a word with the query.
+    """
+
+    key = result_key(normalize_query(query), filters, terms)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(
+            key,
+            result,
+            getattr(settings, "SEARCH_CACHE_TIMEOUT", DEFAULT_TIMEOUT),
+        )
+    return result
+
+
+def bump_terms(terms: set[str]) -> None:
+    cache.set_many(
+        {version_key(term): uuid4().hex for term in terms | {ALL_ARTICLES}},
+        None,
+    )
+
+
+def invalidate_terms(terms: set[str]) -> None:
+    """
+    Bump after commit: a result computed by another request before
+    the commit is cached under the old versions.
+    """
+
+    transaction.on_commit(lambda: bump_terms(terms))
+
+
+def invalidate_articles(articles) -> None:
+    """Invalidate cached searches that may contain these articles."""
+
+    terms = set()
+    for title, content in articles.values_list("title", "content"):
+        terms |= article_terms(title, content)
+    if terms:
+        invalidate_terms(terms | {NO_TERMS})
@@ -0,0 +1,210 @@
+"""
+Near-duplicate article detection.
+
+Content is cut into word shingles and summarized by a MinHash
+signature: for each of NUM_PERMUTATIONS hash functions, the smallest
+hash of any shingle. The share of equal positions in two signatures
+estimates the Jaccard similarity of their shingle sets.
+
+Signatures are split into BANDS bands of ROWS values. Articles with
+an identical band share a bucket in the indexed ArticleBand table,
+so candidates come from one indexed lookup instead of a comparison
+with every article; only candidates are then scored.
+"""
+import hashlib
+import sys
+from array import array
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from catalog.models import (
+    Article,
+    ArticleBand,
+    ArticleSignature,
+    DuplicateArticle,
+)
+from catalog.search.text import tokenize
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+DEFAULT_DUPLICATE_THRESHOLD = 0.7
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def stable_hash(value: str, size: int = 4) -> int:
+    """Hash that is the same in every process (unlike hash())."""
+
+    digest = hashlib.blake2b(value.encode(), digest_size=size).digest()
+    return int.from_bytes(digest, "little")
+
+
+PERMUTATIONS = [
+    (
+        stable_hash(f"minhash:a:{number}", 8) % (MERSENNE_PRIME - 1) + 1,
+        stable_hash(f"minhash:b:{number}", 8) % MERSENNE_PRIME,
+    )
+    for number in range(NUM_PERMUTATIONS)
+]
+
+
+def duplicate_threshold() -> float:
+    return getattr(
+        settings,
+        "DUPLICATE_SIMILARITY_THRESHOLD",
+        DEFAULT_DUPLICATE_THRESHOLD,
+    )
+
+
+def shingles(text: str) -> set[str]:
+    """Overlapping runs of SHINGLE_SIZE words."""
+
+    tokens = tokenize(text or "")
+    if len(tokens) <= SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {
+        " ".join(tokens[position:position + SHINGLE_SIZE])
+        for position in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(text: str) -> array | None:
+    """MinHash signature of a text, None if it has no words."""
+
+    hashes = [stable_hash(shingle) for shingle in shingles(text)]
+    if not hashes:
+        return None
+
+    signature = array("I", [MAX_HASH] * NUM_PERMUTATIONS)
+    for position, (a, b) in enumerate(PERMUTATIONS):
+        signature[position] = min(
+            ((a * value + b) % MERSENNE_PRIME) & MAX_HASH
+            for value in hashes
+        )
+    return signature
+
+
+def pack(signature: array) -> bytes:
+    """Fixed-width little-endian bytes (4 per value)."""
+
+    if sys.byteorder == "big":
+        signature = array("I", signature)
+        signature.byteswap()
+    return signature.tobytes()
+
+
+def unpack(data: bytes) -> array:
+    signature = array("I")
+    signature.frombytes(bytes(data))
+    if sys.byteorder == "big":
+        signature.byteswap()
+    return signature
+
+
+def band_buckets(signature: array) -> list[int]:
+    """Signed 64-bit bucket of every band."""
+
+    data = pack(signature)
+    width = ROWS * signature.itemsize
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                data[band * width:(band + 1) * width], digest_size=8
+            ).digest(),
+            "little",
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(first: array, second: array) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+
+    equal = sum(1 for left, right in zip(first, second) if left == right)
+    return equal / NUM_PERMUTATIONS
+
+
+def find_duplicates(signature, exclude=None) -> list[tuple[int, float]]:
+    """
+    (article id, similarity) of likely duplicates, most similar first.
+    """
+
+    if signature is None:
+        return []
+
+    condition = Q()
+    for band, bucket in enumerate(band_buckets(signature)):
+        condition |= Q(band=band, bucket=bucket)
+    candidates = ArticleBand.objects.filter(condition)
+    if exclude is not None:
+        candidates = candidates.exclude(article_id=exclude)
+
+    threshold = duplicate_threshold()
+    duplicates = []
+    for article_id, data in ArticleSignature.objects.filter(
+        article_id__in=candidates.values("article_id"),
+    ).values_list("article_id", "minhash"):
+        score = similarity(signature, unpack(data))
+        if score >= threshold:
+            duplicates.append((article_id, score))
+    duplicates.sort(key=lambda item: (-item[1], item[0]))
+    return duplicates
+
+
+def update_duplicates(article) -> list[tuple[int, float]]:
+    """Store the signature and bands of an article and flag duplicates."""
+
+    signature = minhash(article.content)
+    with transaction.atomic():
+        ArticleBand.objects.filter(article_id=article.pk).delete()
+        DuplicateArticle.objects.filter(
+            Q(article_id=article.pk) | Q(duplicate_id=article.pk)
+        ).delete()
+        if signature is None:
+            ArticleSignature.objects.filter(article_id=article.pk).delete()
+            return []
+
+        duplicates = find_duplicates(signature, exclude=article.pk)
+        ArticleSignature.objects.update_or_create(
+            article_id=article.pk,
+            defaults={"minhash": pack(signature)},
+        )
+        ArticleBand.objects.bulk_create(
+            ArticleBand(article_id=article.pk, band=band, bucket=bucket)
+            for band, bucket in enumerate(band_buckets(signature))
+        )
+        DuplicateArticle.objects.bulk_create(
+            DuplicateArticle(
+                article_id=left,
+                duplicate_id=right,
+                similarity=score,
+            )
+            for duplicate_id, score in duplicates
+            for left, right in (
+                (article.pk, duplicate_id),
+                (duplicate_id, article.pk),
+            )
+        )
+    return duplicates
+
+
+def rebuild_duplicates() -> int:
+    """Recompute signatures and duplicates of every article."""
+
+    with transaction.atomic():
+        DuplicateArticle.objects.all().delete()
+        ArticleBand.objects.all().delete()
+        ArticleSignature.objects.all().delete()
+        total = 0
+        for article in Article.objects.only("pk", "content").order_by(
+            "pk"
+        ).iterator(chunk_size=2000):
+            update_duplicates(article)
+            total += 1
+    return total
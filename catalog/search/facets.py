@@ -0,0 +1,146 @@
+"""
+Faceted article search.
+
+Each facet is counted by its own GROUP BY query over the matching
+articles (ratings and reading times are bucketed in SQL), filtered
+by the other facets only, so a selected value does not hide its
+alternatives; a query returns one row per value of its facet. The
+counts are cached with the ranked ids of a search (see cache.py).
+"""
+from collections import Counter
+
+from django.db.models import CharField, Count, Case, F, Value, When
+
+from catalog.models import Category, Employee, KnowledgeBase
+
+FACETS = ("knowledge_base", "category", "author", "rating", "reading_time")
+FACET_TITLES = {
+    "knowledge_base": "Knowledge base",
+    "category": "Category",
+    "author": "Author",
+    "rating": "Rating",
+    "reading_time": "Reading time",
+}
+
+RATING_CHOICES = [
+    ("0", "Not rated"),
+    ("1", "1 - 2"),
+    ("2", "2 - 3"),
+    ("3", "3 - 4"),
+    ("4", "4 - 5"),
+    ("5", "5"),
+]
+RATING_LIMITS = (2, 3, 4, 5)
+READING_TIME_LIMITS = (5, 15, 30)
+READING_TIME_CHOICES = [
+    ("0", "Under 5 min"),
+    ("1", "5 - 15 min"),
+    ("2", "15 - 30 min"),
+    ("3", "30+ min"),
+]
+
+
+def buckets(field: str, limits, first: int = 0, *cases) -> Case:
+    """Number of the first limit above field, as a string."""
+
+    return Case(
+        *cases,
+        *[When(**{f"{field}__lt": limit}, then=Value(str(bucket)))
+          for bucket, limit in enumerate(limits, start=first)],
+        default=Value(str(first + len(limits))),
+        output_field=CharField(),
+    )
+
+
+FACET_VALUES = {
+    "knowledge_base": F("category__knowledge_base_id"),
+    "category": F("category_id"),
+    "author": F("author_id"),
+    "rating": buckets(
+        "rating_average",
+        RATING_LIMITS,
+        1,
+        When(rating_count=0, then=Value("0")),
+    ),
+    "reading_time": buckets("reading_time", READING_TIME_LIMITS),
+}
+
+
+def filter_facets(queryset, filters: dict, skip=None):
+    """Articles of queryset that match every filter except skip's."""
+
+    selected = {
+        f"{facet}_facet": filters[facet]
+        for facet in FACETS if filters.get(facet) and facet != skip
+    }
+    if not selected:
+        return queryset
+    return queryset.alias(**{
+        name: FACET_VALUES[name.removesuffix("_facet")]
+        for name in selected
+    }).filter(**selected)
+
+
+def facet_counts(queryset, filters: dict) -> dict:
+    """Map each facet to a Counter of its values, one query per facet."""
+
+    counts = {}
+    for facet in FACETS:
+        rows = filter_facets(queryset, filters, skip=facet).order_by().values(
+            value=FACET_VALUES[facet]
+        ).annotate(total=Count("pk")).values_list("value", "total")
+        counts[facet] = Counter({
+            str(value): total for value, total in rows
+        })
+    return counts
+
+
+def facet_labels(counts: dict) -> dict:
+    """Resolve display labels of the values present in counts."""
+
+    def pks(facet):
+        return [int(value) for value in counts[facet] if value != "None"]
+
+    authors = Employee.objects.filter(pk__in=pks("author")).only(
+        "first_name", "last_name", "username"
+    )
+    return {
+        "knowledge_base": {
+            str(pk): title for pk, title in KnowledgeBase.objects.filter(
+                pk__in=pks("knowledge_base")
+            ).values_list("pk", "title")
+        },
+        "category": {
+            str(pk): topic for pk, topic in Category.objects.filter(
+                pk__in=pks("category")
+            ).values_list("pk", "topic")
+        },
+        "author": {str(author.pk): author.full_name for author in authors},
+        "rating": dict(RATING_CHOICES),
+        "reading_time": dict(READING_TIME_CHOICES),
+    }
+
+
+def facet_display(counts: dict, filters: dict) -> list[dict]:
+    """Facets ready for the template, biggest values first."""
+
+    labels = facet_labels(counts)
+    display = []
+    for facet in FACETS:
+        values = [
+            {
+                "value": value,
+                "label": labels[facet].get(value, value),
+                "count": count,
+                "selected": filters.get(facet) == value,
+            }
+            for value, count in counts[facet].items()
+        ]
+        values.sort(key=lambda item: (-item["count"], str(item["label"])))
+        display.append({
+            "name": facet,
+            "title": FACET_TITLES[facet],
+            "selected": filters.get(facet),
+            "values": values,
+        })
+    return display
@@ -0,0 +1,625 @@
+"""
+Pure-Python BM25 inverted index for article search.
+
+The index lives in SEARCH_INDEX_DIR and has two parts:
+
+* segment.idx - an immutable segment written by a full rebuild.
+  It is memory-mapped, so every gunicorn worker shares the same
+  pages through the OS page cache instead of loading postings
+  into its own heap.
+* delta.log - an append-only log of article updates/deletes made
+  since the segment was written. Each worker replays only the new
+  tail of the log before a query.
+
+Segment layout (native byte order):
+
+    header
+    ids        doc_count x uint64, article ids in ascending order
+    lengths    doc_count x uint32, document lengths in tokens
+    terms      utf-8 bytes of all terms, sorted
+    postings   per term: doc number deltas (uint8/16/32, the
+               narrowest width that fits) followed by uint16 term
+               frequencies
+    term index term_count fixed-size entries for binary search
+"""
+import fcntl
+import heapq
+import json
+import math
+import mmap
+import os
+import shutil
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import accumulate
+from pathlib import Path
+from struct import Struct
+
+from django.conf import settings
+from django.db import transaction
+
+from catalog.search.backends import BaseSearchBackend
+from catalog.search.text import tokenize
+
+MAGIC = b"KHIX"
+VERSION = 1
+HEADER = Struct("=4sIIIQQQQQQ")
+TERM_ENTRY = Struct("=QIQIB")
+WIDTH_CODES = {1: "B", 2: "H", 4: "I"}
+MAX_TF = 0xFFFF
+
+SEGMENT_NAME = "segment.idx"
+DELTA_LOG_NAME = "delta.log"
+LOCK_NAME = "index.lock"
+
+TITLE_BOOST = 3
+# Terms found in more than this share of documents add almost nothing
+# to BM25 (idf < log 2) and are skipped when the query has rarer terms.
+COMMON_TERM_RATIO = 0.5
+STOPWORDS = frozenset(
+    "a an and are as at be but by for if in into is it no not of on or "
+    "such that the their then there these they this to was will with"
+    .split()
+)
+
+
+def analyze(title: str, content: str) -> Counter:
+    """Return term frequencies of an article, title tokens boosted."""
+
+    terms = Counter(
+        token for token in tokenize(content) if token not in STOPWORDS
+    )
+    for token in tokenize(title):
+        if token not in STOPWORDS:
+            terms[token] += TITLE_BOOST
+    return terms
+
+
+def delta_width(deltas: list[int]) -> int:
+    """Narrowest unsigned width (bytes) that holds every delta."""
+
+    largest = max(deltas, default=0)
+    if largest < 1 << 8:
+        return 1
+    if largest < 1 << 16:
+        return 2
+    return 4
+
+
+def write_segment(path, documents) -> int:
+    """
+    Write a segment file from documents sorted by article id.
+    Each document is a (article_id, term_frequencies) pair.
+    The file is written next to path and moved in place atomically.
+    Returns the number of documents written.
+    """
+
+    ids = array("Q")
+    lengths = array("I")
+    postings = defaultdict(lambda: (array("I"), array("H")))
+
+    for doc_number, (article_id, terms) in enumerate(documents):
+        ids.append(article_id)
+        lengths.append(sum(terms.values()))
+        for term, frequency in terms.items():
+            doc_numbers, frequencies = postings[term]
+            doc_numbers.append(doc_number)
+            frequencies.append(min(frequency, MAX_TF))
+
+    return _write_segment_file(
+        path,
+        ids,
+        lengths,
+        (
+            (encoded, *postings[encoded.decode()])
+            for encoded in sorted(term.encode() for term in postings)
+        ),
+    )
+
+
+def merge_segments(path, paths) -> int:
+    """
+    Merge segments of consecutive article id ranges into one.
+    Terms are merged in sorted order, one term at a time; doc
+    numbers of each segment are shifted past the previous ones.
+    """
+
+    segments = [Segment(segment_path) for segment_path in paths]
+    ids = array("Q")
+    lengths = array("I")
+    offsets = []
+    for segment in segments:
+        if ids and segment.doc_count and segment.ids[0] <= ids[-1]:
+            raise ValueError("Segments must cover ascending id ranges.")
+        offsets.append(len(ids))
+        ids.extend(segment.ids)
+        lengths.extend(segment.lengths)
+
+    def stream(segment, offset):
+        for term, entries in segment.terms():
+            yield term.encode(), offset, entries
+
+    def postings():
+        # Equal terms come out in segment order, keeping doc numbers
+        # ascending.
+        merged = heapq.merge(
+            *map(stream, segments, offsets), key=lambda item: item[0]
+        )
+        current, doc_numbers, frequencies = None, None, None
+        for encoded, offset, entries in merged:
+            if encoded != current:
+                if current is not None:
+                    yield current, doc_numbers, frequencies
+                current = encoded
+                doc_numbers, frequencies = array("I"), array("H")
+            for doc_number, frequency in entries:
+                doc_numbers.append(doc_number + offset)
+                frequencies.append(frequency)
+        if current is not None:
+            yield current, doc_numbers, frequencies
+
+    return _write_segment_file(path, ids, lengths, postings())
+
+
+def _write_segment_file(path, ids, lengths, postings) -> int:
+    """
+    Write ids, lengths and (encoded term, doc numbers, frequencies)
+    in sorted term order to a temporary file and move it to path.
+    """
+
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    encoded_terms = []
+
+    with open(tmp_path, "wb") as file:
+        file.write(bytes(HEADER.size))
+
+        ids_offset = file.tell()
+        file.write(ids.tobytes())
+        lengths_offset = file.tell()
+        file.write(lengths.tobytes())
+
+        # Postings go first to a scratch file: the term bytes that
+        # precede them are only known once every term has been seen.
+        postings_file = tempfile.TemporaryFile(dir=path.parent)
+        entries = []
+        term_offset = 0
+        with postings_file:
+            for encoded, doc_numbers, frequencies in postings:
+                deltas = [
+                    doc_number - previous
+                    for previous, doc_number
+                    in zip([0, *doc_numbers], doc_numbers)
+                ]
+                width = delta_width(deltas)
+                entries.append(TERM_ENTRY.pack(
+                    term_offset,
+                    len(encoded),
+                    postings_file.tell(),
+                    len(doc_numbers),
+                    width,
+                ))
+                postings_file.write(
+                    array(WIDTH_CODES[width], deltas).tobytes()
+                )
+                postings_file.write(frequencies.tobytes())
+                encoded_terms.append(encoded)
+                term_offset += len(encoded)
+
+            terms_offset = file.tell()
+            file.write(b"".join(encoded_terms))
+
+            postings_offset = file.tell()
+            postings_file.seek(0)
+            shutil.copyfileobj(postings_file, file)
+
+        term_index_offset = file.tell()
+        file.write(b"".join(entries))
+
+        file.seek(0)
+        file.write(HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(ids),
+            len(encoded_terms),
+            sum(lengths),
+            ids_offset,
+            lengths_offset,
+            terms_offset,
+            postings_offset,
+            term_index_offset,
+        ))
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+    return len(ids)
+
+
+class Segment:
+    """Read-only, memory-mapped view of a segment file."""
+
+    def __init__(self, path):
+        self.doc_count = 0
+        self.term_count = 0
+        self.total_length = 0
+        self.ids = ()
+        self.lengths = ()
+        self.identity = None
+        self._buffer = None
+
+        try:
+            with open(path, "rb") as file:
+                stat = os.fstat(file.fileno())
+                if not stat.st_size:
+                    return
+                self._buffer = memoryview(
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                )
+        except FileNotFoundError:
+            return
+
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        (
+            magic,
+            version,
+            self.doc_count,
+            self.term_count,
+            self.total_length,
+            ids_offset,
+            lengths_offset,
+            self._terms_offset,
+            self._postings_offset,
+            self._term_index_offset,
+        ) = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a search index segment.")
+
+        self.ids = self._buffer[
+            ids_offset:ids_offset + self.doc_count * 8
+        ].cast("Q")
+        self.lengths = self._buffer[
+            lengths_offset:lengths_offset + self.doc_count * 4
+        ].cast("I")
+
+    def _entry(self, index: int):
+        return TERM_ENTRY.unpack_from(
+            self._buffer,
+            self._term_index_offset + index * TERM_ENTRY.size,
+        )
+
+    def _term(self, entry) -> bytes:
+        start = self._terms_offset + entry[0]
+        return bytes(self._buffer[start:start + entry[1]])
+
+    def _lookup(self, term: str):
+        encoded = term.encode()
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(self._entry(middle)) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.term_count:
+            entry = self._entry(low)
+            if self._term(entry) == encoded:
+                return entry
+        return None
+
+    def _decode(self, entry):
+        _, _, offset, doc_frequency, width = entry
+        start = self._postings_offset + offset
+        middle = start + doc_frequency * width
+        deltas = self._buffer[start:middle].cast(WIDTH_CODES[width])
+        frequencies = self._buffer[middle:middle + doc_frequency * 2]
+        return accumulate(deltas), frequencies.cast("H")
+
+    def doc_frequency(self, term: str) -> int:
+        entry = self._lookup(term)
+        return entry[3] if entry else 0
+
+    def postings(self, term: str):
+        """Iterate (doc number, term frequency) pairs of a term."""
+
+        entry = self._lookup(term)
+        if entry is None:
+            return iter(())
+        return zip(*self._decode(entry))
+
+    def terms(self):
+        """Iterate (term, postings) in sorted term order."""
+
+        for index in range(self.term_count):
+            entry = self._entry(index)
+            yield self._term(entry).decode(), zip(*self._decode(entry))
+
+    def doc_number(self, article_id: int) -> int | None:
+        position = bisect_left(self.ids, article_id)
+        if position < self.doc_count and self.ids[position] == article_id:
+            return position
+        return None
+
+
+class DeltaLog:
+    """Append-only JSON lines log of index changes, shared by workers."""
+
+    def __init__(self, directory: Path):
+        self.path = directory / DELTA_LOG_NAME
+        self.lock_path = directory / LOCK_NAME
+
+    def lock(self):
+        return FileLock(self.lock_path)
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock(), open(self.path, "a", encoding="utf-8") as file:
+            file.write(line)
+
+    def size(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def read(self, inode, offset: int):
+        """
+        Return (inode, entries, offset) of the complete entries written
+        after offset. If the log was replaced since inode was seen,
+        it is read from the start and the new inode is returned.
+        """
+
+        try:
+            with open(self.path, "rb") as file:
+                current_inode = os.fstat(file.fileno()).st_ino
+                if current_inode != inode:
+                    offset = 0
+                file.seek(offset)
+                data = file.read()
+        except FileNotFoundError:
+            return None, [], 0
+
+        complete = data.rfind(b"\n") + 1
+        entries = [
+            json.loads(line) for line in data[:complete].splitlines() if line
+        ]
+        return current_inode, entries, offset + complete
+
+    def truncate_before(self, offset: int) -> None:
+        """Keep only the entries written after offset. Caller holds lock."""
+
+        try:
+            with open(self.path, "rb") as file:
+                file.seek(offset)
+                tail = file.read()
+        except FileNotFoundError:
+            tail = b""
+
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(tail)
+        os.replace(tmp_path, self.path)
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared between processes."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+class InvertedIndex:
+    """
+    A segment plus the in-memory replay of the delta log.
+    Articles present in the delta (updated or deleted) mask their
+    segment copy.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.log = DeltaLog(self.directory)
+        self.segment = None
+        self._log_inode = None
+        self._reset_delta()
+
+    @property
+    def segment_path(self) -> Path:
+        return self.directory / SEGMENT_NAME
+
+    def _reset_delta(self):
+        self.masked = set()
+        self.masked_docs = 0
+        self.masked_length = 0
+        self.documents = {}
+        self.postings = defaultdict(dict)
+        self._log_offset = 0
+
+    def _segment_identity(self):
+        try:
+            stat = os.stat(self.segment_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def refresh(self) -> None:
+        """Reopen a swapped segment and replay new delta entries."""
+
+        if (
+            self.segment is None
+            or self.segment.identity != self._segment_identity()
+        ):
+            self.segment = Segment(self.segment_path)
+            self._reset_delta()
+
+        inode, entries, offset = self.log.read(
+            self._log_inode, self._log_offset
+        )
+        if inode != self._log_inode:
+            self._reset_delta()
+            self._log_inode = inode
+        self._log_offset = offset
+        for entry in entries:
+            self._apply(entry)
+
+    def _apply(self, entry: dict) -> None:
+        article_id = entry["id"]
+        self._forget(article_id)
+
+        if article_id not in self.masked:
+            self.masked.add(article_id)
+            doc_number = self.segment.doc_number(article_id)
+            if doc_number is not None:
+                self.masked_docs += 1
+                self.masked_length += self.segment.lengths[doc_number]
+
+        if entry["op"] == "add":
+            terms = entry["terms"]
+            self.documents[article_id] = (sum(terms.values()), list(terms))
+            for term, frequency in terms.items():
+                self.postings[term][article_id] = frequency
+
+    def _forget(self, article_id: int) -> None:
+        _, terms = self.documents.pop(article_id, (0, ()))
+        for term in terms:
+            del self.postings[term][article_id]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def add(self, article_id: int, terms: Counter) -> None:
+        self.log.append({"op": "add", "id": article_id, "terms": terms})
+
+    def remove(self, article_id: int) -> None:
+        self.log.append({"op": "del", "id": article_id})
+
+    def search(self, query: str, limit: int) -> list[int]:
+        """Return article ids ranked by BM25."""
+
+        self.refresh()
+        segment = self.segment
+        masked = self.masked
+
+        doc_count = (
+            segment.doc_count - self.masked_docs + len(self.documents)
+        )
+        if not doc_count:
+            return []
+
+        average_length = (
+            segment.total_length
+            - self.masked_length
+            + sum(length for length, _ in self.documents.values())
+        ) / doc_count
+        k1, b = self.k1, self.b
+        base_norm = k1 * (1 - b)
+        length_norm = k1 * b / average_length
+        scores = defaultdict(float)
+
+        doc_frequencies = {
+            term: (
+                segment.doc_frequency(term)
+                + len(self.postings.get(term, ()))
+            )
+            for term in tokenize(query)
+            if term not in STOPWORDS
+        }
+        rare_terms = {
+            term: doc_frequency
+            for term, doc_frequency in doc_frequencies.items()
+            if doc_frequency <= doc_count * COMMON_TERM_RATIO
+        }
+        for term, doc_frequency in (rare_terms or doc_frequencies).items():
+            if not doc_frequency:
+                continue
+            delta_postings = self.postings.get(term, {})
+            idf = math.log(
+                1 + (doc_count - doc_frequency + 0.5) / (doc_frequency + 0.5)
+            )
+
+            ids, lengths = segment.ids, segment.lengths
+            for doc_number, frequency in segment.postings(term):
+                article_id = ids[doc_number]
+                if masked and article_id in masked:
+                    continue
+                scores[article_id] += idf * frequency * (k1 + 1) / (
+                    frequency + base_norm + length_norm * lengths[doc_number]
+                )
+
+            for article_id, frequency in delta_postings.items():
+                length, _ = self.documents[article_id]
+                scores[article_id] += idf * frequency * (k1 + 1) / (
+                    frequency + base_norm + length_norm * length
+                )
+
+        return [
+            article_id for article_id, _ in heapq.nlargest(
+                limit, scores.items(), key=lambda item: (item[1], -item[0])
+            )
+        ]
+
+    def rebuild(self, documents) -> int:
+        """Write a new segment from (article id, terms) documents."""
+
+        return self.replace_segment(
+            lambda path: write_segment(path, documents)
+        )
+
+    def replace_segment(self, write) -> int:
+        """
+        Swap in the segment write(path) produces and drop the delta
+        entries it covers. Readers keep the old segment until it is
+        replaced; changes logged while the new one was being built
+        are kept and replayed on top of it.
+        """
+
+        with self.log.lock():
+            start_offset = self.log.size()
+
+        total = write(self.segment_path)
+
+        with self.log.lock():
+            self.log.truncate_before(start_offset)
+        return total
+
+
+class BM25SearchBackend(BaseSearchBackend):
+    """
+    Backend that does not rely on database full-text search.
+    Uses the memory-mapped inverted index in SEARCH_INDEX_DIR.
+    """
+
+    def __init__(self, index_dir=None):
+        self.index = InvertedIndex(index_dir or settings.SEARCH_INDEX_DIR)
+
+    def index_article(self, article) -> None:
+        terms = analyze(article.title, article.content)
+        transaction.on_commit(lambda: self.index.add(article.pk, terms))
+
+    def remove_article(self, article_id: int) -> None:
+        transaction.on_commit(lambda: self.index.remove(article_id))
+
+    def clear(self) -> None:
+        self.index.rebuild([])
+
+    def search(self, query: str, limit: int | None = None) -> list[int]:
+        return self.index.search(query, limit or self.limit)
+
+    def rebuild(self, articles) -> int:
+        return self.index.rebuild(
+            (article.pk, analyze(article.title, article.content))
+            for article in articles
+        )
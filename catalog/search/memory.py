@@ -0,0 +1,103 @@
+from django.core.cache import cache
+
+CHANGE_TIMEOUT = 3600
+CHANGE_BATCH = 32
+MAX_CHANGES = 1000
+
+
+class InProcessIndex:
+    """
+    Base class of indexes held in the memory of each worker.
+    Every change is published to a log in the shared cache, one entry
+    per generation number, and applied by the other workers on their
+    next lookup. A writer claims the next number with cache.add, which
+    no other writer can win. The number under generation_key is the
+    highest one published; a worker that finds a gap before it (log
+    entries expire after CHANGE_TIMEOUT), or is more than MAX_CHANGES
+    behind, rebuilds instead.
+    With a per-process cache (LocMemCache, the default) other workers
+    never see the log: production configures a shared one in
+    settings/prod.py.
+    """
+
+    generation_key = None
+
+    def __init__(self):
+        self.generation = 0
+        self.loaded = False
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+    def build(self) -> None:
+        """Populate the empty index from the database."""
+
+        raise NotImplementedError
+
+    def apply(self, change) -> None:
+        """Apply one published change to the loaded index."""
+
+        raise NotImplementedError
+
+    def change_key(self, number: int) -> str:
+        return f"{self.generation_key}:change:{number}"
+
+    def load(self) -> None:
+        # Changes published during the build are applied again on
+        # the next lookup; applying a change twice does no harm.
+        cache.add(self.generation_key, 0, None)
+        self.generation = cache.get(self.generation_key) or 0
+        self.reset()
+        self.build()
+        self.loaded = True
+
+    def ensure_fresh(self) -> None:
+        """One cache round trip unless more than CHANGE_BATCH changes."""
+
+        if not self.loaded:
+            self.load()
+            return
+
+        window = range(self.generation + 1, self.generation + 1 + CHANGE_BATCH)
+        found = cache.get_many([self.generation_key] + [
+            self.change_key(next_number) for next_number in window
+        ])
+        head = found.get(self.generation_key)
+        if head is None or head - self.generation > MAX_CHANGES:
+            self.load()
+            return
+
+        number = self.generation
+        changes = []
+        while True:
+            for next_number in window:
+                key = self.change_key(next_number)
+                if key not in found:
+                    break
+                changes.append(found[key])
+                number = next_number
+            else:
+                window = range(number + 1, number + 1 + CHANGE_BATCH)
+                found = cache.get_many(
+                    [self.change_key(next_number) for next_number in window]
+                )
+                continue
+            break
+        if number < head:
+            self.load()
+            return
+
+        for change in changes:
+            self.apply(change)
+        self.generation = number
+
+    def publish(self, change) -> None:
+        """Apply a change here and log it for the other workers."""
+
+        if self.loaded:
+            self.apply(change)
+        number = max(cache.get(self.generation_key) or 0, self.generation)
+        number += 1
+        while not cache.add(self.change_key(number), change, CHANGE_TIMEOUT):
+            number += 1
+        cache.set(self.generation_key, number, None)
@@ -0,0 +1,84 @@
+"""
+Saved search matching for newly published articles.
+
+Saved searches form a reverse index: each one is stored under one
+anchor, the prefix of its longest term. A published article looks up
+the subscriptions anchored on any prefix of its own terms, with
+one indexed query, and only those candidates are checked in full.
+Like the search backends, every query term must be a prefix of
+some term of the article.
+"""
+from bisect import bisect_left
+
+from django.db import transaction
+
+from catalog.models import Article, SavedSearch, SavedSearchMatch
+from catalog.search.cache import PREFIX_LENGTH
+from catalog.search.text import tokenize
+
+LOOKUP_BATCH_SIZE = 500
+
+
+def query_anchor(query: str) -> str:
+    """Longest term of a query, cut to the search prefix length."""
+
+    tokens = tokenize(query)
+    if not tokens:
+        return ""
+    return max(tokens, key=len)[:PREFIX_LENGTH]
+
+
+def article_keys(tokens) -> set[str]:
+    """Every anchor an article with these terms can match."""
+
+    return {
+        token[:length]
+        for token in tokens
+        for length in range(1, min(len(token), PREFIX_LENGTH) + 1)
+    }
+
+
+def matches(query: str, sorted_tokens: list[str]) -> bool:
+    """Whether every query term prefixes a term of the article."""
+
+    for term in tokenize(query):
+        position = bisect_left(sorted_tokens, term)
+        if (
+            position == len(sorted_tokens)
+            or not sorted_tokens[position].startswith(term)
+        ):
+            return False
+    return True
+
+
+def percolate(articles) -> int:
+    """Record matches of saved searches for articles. Returns count."""
+
+    found = []
+    for article in articles:
+        tokens = sorted(set(tokenize(f"{article.title} {article.content}")))
+        keys = sorted(article_keys(tokens))
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            candidates = SavedSearch.objects.filter(
+                anchor__in=keys[start:start + LOOKUP_BATCH_SIZE],
+            ).exclude(
+                employee_id=article.author_id,
+            ).values_list("pk", "query")
+            found.extend(
+                SavedSearchMatch(saved_search_id=pk, article_id=article.pk)
+                for pk, query in candidates
+                if matches(query, tokens)
+            )
+    SavedSearchMatch.objects.bulk_create(found, ignore_conflicts=True)
+    return len(found)
+
+
+def percolate_on_commit(article_ids) -> None:
+    """Match articles published in this transaction once it commits."""
+
+    article_ids = list(article_ids)
+    if article_ids:
+        transaction.on_commit(lambda: percolate(
+            Article.objects.filter(pk__in=article_ids, is_published=True)
+            .only("pk", "title", "content", "author_id")
+        ))
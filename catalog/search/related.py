@@ -0,0 +1,315 @@
+"""
+Precomputed "related articles".
+
+Published articles are turned into sparse, L2-normalized TF-IDF
+vectors (dicts of term -> weight). Cosine similarity of normalized
+vectors is their dot product, computed by walking the postings of
+each term, so only articles that share a term are ever scored.
+Terms in more than RELATED_MAX_DF of the articles (and in more
+articles than one postings list holds) say little about similarity
+and are pruned; every other term only walks its
+RELATED_POSTINGS_LIMIT highest weighted postings. An article is
+scored in O(terms * limit), whatever the size of the corpus.
+The top neighbours of every article are written a chunk at a time
+to RelatedArticle and read by the detail page in one query.
+
+The full rebuild also stores the IDF table (RelatedTerm) and every
+vector as postings (RelatedPosting). A saved article is vectorized
+against that table alone and scored through the postings of its own
+terms, so a save never re-reads the corpus. Terms new since the
+rebuild weigh as unseen; build_related_articles refreshes the table.
+It is a maintenance command, run on a schedule (see README.md).
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from catalog.models import (
+    Article,
+    RelatedArticle,
+    RelatedPosting,
+    RelatedTerm,
+)
+from catalog.search.inverted import analyze
+
+DEFAULT_RELATED_LIMIT = 5
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_MAX_DF = 0.5
+DEFAULT_POSTINGS_LIMIT = 100
+IN_BATCH_SIZE = 500
+UNSEEN = ""
+TERM_LENGTH = RelatedTerm._meta.get_field("term").max_length
+
+
+def related_limit() -> int:
+    return getattr(settings, "RELATED_ARTICLES_LIMIT", DEFAULT_RELATED_LIMIT)
+
+
+def max_df() -> float:
+    return getattr(settings, "RELATED_MAX_DF", DEFAULT_MAX_DF)
+
+
+def postings_limit() -> int:
+    return getattr(
+        settings, "RELATED_POSTINGS_LIMIT", DEFAULT_POSTINGS_LIMIT
+    )
+
+
+def batches(items, size: int | None = None):
+    """Lists of at most size items, small enough for an IN clause."""
+
+    size = size or IN_BATCH_SIZE
+    items = sorted(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def article_terms(title: str, content: str) -> dict:
+    """Term frequencies of an article; overlong tokens are dropped."""
+
+    return {
+        term: count for term, count in analyze(title, content).items()
+        if len(term) <= TERM_LENGTH
+    }
+
+
+def ranked(scores, limit: int) -> list[tuple[int, float]]:
+    """Best (pk, score) pairs first, ties to the older article."""
+
+    return heapq.nlargest(limit, scores, key=lambda item: (item[1], -item[0]))
+
+
+class TfidfVectors:
+    """TF-IDF vectors of a corpus with a term -> postings index."""
+
+    def __init__(self, documents):
+        self.counts = dict(documents)
+        frequencies = defaultdict(int)
+        for terms in self.counts.values():
+            for term in terms:
+                frequencies[term] += 1
+
+        total = len(self.counts)
+        limit = postings_limit()
+        self.idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1
+            for term, frequency in frequencies.items()
+        }
+        self.unseen_idf = math.log(1 + total) + 1
+        self.pruned = {
+            term for term, frequency in frequencies.items()
+            if frequency > max(max_df() * total, limit)
+        }
+
+        self.vectors = {
+            pk: self.vectorize(terms) for pk, terms in self.counts.items()
+        }
+        postings = defaultdict(list)
+        for pk, vector in self.vectors.items():
+            for term, weight in vector.items():
+                if term not in self.pruned:
+                    postings[term].append((pk, weight))
+        self.postings = {
+            term: ranked(term_postings, limit)
+            for term, term_postings in postings.items()
+        }
+
+    @classmethod
+    def from_articles(cls, articles) -> "TfidfVectors":
+        return cls(
+            (pk, article_terms(title, content))
+            for pk, title, content in articles.values_list(
+                "pk", "title", "content"
+            ).iterator()
+        )
+
+    def vectorize(self, terms) -> dict:
+        vector = {
+            term: (1 + math.log(count)) * self.idf.get(term, self.unseen_idf)
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if not norm:
+            return {}
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def similarities(self, vector: dict) -> dict:
+        """Cosine similarity of vector to every article sharing a term."""
+
+        scores = defaultdict(float)
+        for term, weight in vector.items():
+            for pk, other_weight in self.postings.get(term, ()):
+                scores[pk] += weight * other_weight
+        return scores
+
+    def vector(self, pk) -> dict:
+        return self.vectors.get(pk, {})
+
+    def neighbours(self, pk, limit: int) -> list[tuple[int, float]]:
+        scores = self.similarities(self.vector(pk))
+        scores.pop(pk, None)
+        return ranked(scores.items(), limit)
+
+
+class StoredVectors(TfidfVectors):
+    """
+    Vectors kept by the last rebuild, read from the database on
+    demand. Only the IDF of the given terms is loaded.
+    """
+
+    def __init__(self, terms=()):
+        self.idf = {}
+        self.pruned = set()
+        for batch in batches({*terms, UNSEEN}):
+            for term, idf, pruned in RelatedTerm.objects.filter(
+                term__in=batch,
+            ).values_list("term", "idf", "pruned"):
+                self.idf[term] = idf
+                if pruned:
+                    self.pruned.add(term)
+        self.unseen_idf = self.idf.pop(UNSEEN, 1.0)
+
+    def vector(self, pk) -> dict:
+        return dict(RelatedPosting.objects.filter(
+            article_id=pk,
+        ).values_list("term", "weight"))
+
+    def similarities(self, vector: dict) -> dict:
+        """Scored through the top postings of every unpruned term."""
+
+        scores = defaultdict(float)
+        for batch in batches(set(vector) - self.pruned):
+            for pk, term, weight in RelatedPosting.objects.filter(
+                term__in=batch,
+            ).annotate(position=Window(
+                RowNumber(),
+                partition_by=F("term"),
+                order_by=[F("weight").desc(), F("article_id").asc()],
+            )).filter(position__lte=postings_limit()).values_list(
+                "article_id", "term", "weight"
+            ):
+                scores[pk] += vector[term] * weight
+        return scores
+
+
+def posting_rows(pk, vector: dict, pruned=()) -> list[RelatedPosting]:
+    return [
+        RelatedPosting(article_id=pk, term=term, weight=weight)
+        for term, weight in vector.items()
+        if term not in pruned
+    ]
+
+
+def related_rows(pk, neighbours) -> list[RelatedArticle]:
+    return [
+        RelatedArticle(
+            article_id=pk,
+            related_id=related_id,
+            score=score,
+            rank=rank,
+        )
+        for rank, (related_id, score) in enumerate(neighbours)
+    ]
+
+
+def rebuild_related_articles(limit=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Recompute the neighbours of every published article."""
+
+    limit = limit or related_limit()
+    vectors = TfidfVectors.from_articles(
+        Article.objects.filter(is_published=True)
+    )
+    pks = sorted(vectors.vectors)
+
+    with transaction.atomic():
+        RelatedTerm.objects.all().delete()
+        RelatedTerm.objects.bulk_create(
+            [
+                RelatedTerm(
+                    term=term, idf=idf, pruned=term in vectors.pruned
+                )
+                for term, idf in vectors.idf.items()
+            ] + [RelatedTerm(term=UNSEEN, idf=vectors.unseen_idf)],
+            batch_size=chunk_size,
+        )
+        RelatedPosting.objects.all().delete()
+        RelatedArticle.objects.all().delete()
+        for start in range(0, len(pks), chunk_size):
+            postings = []
+            rows = []
+            for pk in pks[start:start + chunk_size]:
+                postings.extend(posting_rows(
+                    pk, vectors.vector(pk), vectors.pruned
+                ))
+                rows.extend(related_rows(pk, vectors.neighbours(pk, limit)))
+            RelatedPosting.objects.bulk_create(postings)
+            RelatedArticle.objects.bulk_create(rows)
+    return len(pks)
+
+
+def update_related_articles(article, limit=None) -> None:
+    """
+    Refresh the neighbours of one saved article and offer it to the
+    articles it is similar to, keeping their top-k lists.
+    """
+
+    limit = limit or related_limit()
+    with transaction.atomic():
+        referrers = set(RelatedArticle.objects.filter(
+            related_id=article.pk,
+        ).values_list("article_id", flat=True))
+        RelatedArticle.objects.filter(article_id=article.pk).delete()
+        RelatedArticle.objects.filter(related_id=article.pk).delete()
+        RelatedPosting.objects.filter(article_id=article.pk).delete()
+        if not article.is_published and not referrers:
+            return
+
+        rows = []
+        scores = {}
+        vectors = StoredVectors()
+        if article.is_published:
+            terms = article_terms(article.title, article.content)
+            vectors = StoredVectors(terms)
+            vector = vectors.vectorize(terms)
+            RelatedPosting.objects.bulk_create(
+                posting_rows(article.pk, vector, vectors.pruned)
+            )
+            scores = vectors.similarities(vector)
+            scores.pop(article.pk, None)
+            rows.extend(related_rows(
+                article.pk, ranked(scores.items(), limit)
+            ))
+
+        # Lists that held the article are recomputed in full.
+        stale = set()
+        for batch in batches(referrers):
+            stale.update(Article.objects.filter(
+                pk__in=batch, is_published=True,
+            ).values_list("pk", flat=True))
+        for pk in stale:
+            rows.extend(related_rows(pk, vectors.neighbours(pk, limit)))
+
+        # Other similar articles only need the new candidate merged in.
+        current = defaultdict(dict)
+        for batch in batches(set(scores) - stale):
+            for pk, related_id, score in RelatedArticle.objects.filter(
+                article_id__in=batch,
+            ).values_list("article_id", "related_id", "score"):
+                current[pk][related_id] = score
+
+        for pk, score in scores.items():
+            if pk in stale:
+                continue
+            top = ranked([*current[pk].items(), (article.pk, score)], limit)
+            if (article.pk, score) in top:
+                stale.add(pk)
+                rows.extend(related_rows(pk, top))
+
+        for batch in batches(stale):
+            RelatedArticle.objects.filter(article_id__in=batch).delete()
+        RelatedArticle.objects.bulk_create(rows)
@@ -0,0 +1,382 @@
+"""
+Semantic article search over locally computed embeddings.
+
+Embeddings: words (and their character trigrams, so word forms
+stay close) are hashed into a DIMENSIONS-wide vector with random
+signs, a sparse random projection of the bag of words, then
+L2-normalized. Nothing is trained and no model is downloaded.
+
+Index: vectors.f32 in SEARCH_INDEX_DIR is an append-only,
+memory-mapped file of fixed-size records
+
+    article id  uint64 (the latest record of an id wins)
+    codes       TABLES x uint16 random-hyperplane LSH codes
+    vector      DIMENSIONS x float32 (all zeros: removed)
+
+Every worker buckets the records by the leading bits of each code,
+using more bits as the index grows so buckets keep about
+BUCKET_SIZE articles. A query scores only the articles of its own
+bucket and of the neighbouring buckets across its least certain
+bits, so query time does not grow with the number of articles.
+"""
+import hashlib
+import math
+import mmap
+import os
+from array import array
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+from struct import Struct
+
+from django.conf import settings
+from django.db import transaction
+
+from catalog.models import Article
+from catalog.search.backends import (
+    DEFAULT_SEARCH_RESULTS_LIMIT,
+    order_by_ids,
+)
+from catalog.search.inverted import FileLock, analyze
+
+MAGIC = b"KHSV"
+VERSION = 1
+DIMENSIONS = 128
+TABLES = 4
+CODE_BITS = 16
+BUCKET_SIZE = 32
+PROBES = 2
+SUBWORD_WEIGHT = 0.5
+DEFAULT_MIN_SIMILARITY = 0.2
+
+HEADER = Struct("=4sIII")
+RECORD = Struct(f"=Q{TABLES}H{DIMENSIONS}f")
+RECORD_PREFIX = Struct(f"=Q{TABLES}H")
+VECTORS_NAME = "vectors.f32"
+LOCK_NAME = "semantic.lock"
+
+
+def _sign_bits(value: str, size: int) -> int:
+    digest = hashlib.blake2b(value.encode(), digest_size=size).digest()
+    return int.from_bytes(digest, "little")
+
+
+# Each hyperplane has +1/-1 components; it is kept as the list of
+# its positive dimensions: dot(v, plane) = 2 * sum(v[positive]) - sum(v).
+PLANES = [
+    [
+        [
+            dimension for dimension in range(DIMENSIONS)
+            if _sign_bits(f"plane:{table}:{bit}", DIMENSIONS // 8)
+            >> dimension & 1
+        ]
+        for bit in range(CODE_BITS)
+    ]
+    for table in range(TABLES)
+]
+
+
+def min_similarity() -> float:
+    return getattr(
+        settings, "SEMANTIC_MIN_SIMILARITY", DEFAULT_MIN_SIMILARITY
+    )
+
+
+def features(title: str, content: str) -> Counter:
+    """Weighted words of an article plus their character trigrams."""
+
+    words = analyze(title or "", content or "")
+    weighted = Counter(words)
+    for word, count in words.items():
+        padded = f"<{word}>"
+        for position in range(len(padded) - 2):
+            weighted["#" + padded[position:position + 3]] += (
+                count * SUBWORD_WEIGHT
+            )
+    return weighted
+
+
+@lru_cache(maxsize=65536)
+def feature_slots(feature: str) -> tuple[tuple[int, float], ...]:
+    """Two signed dimensions a feature is projected onto."""
+
+    bits = _sign_bits(feature, 8)
+    return tuple(
+        (
+            (bits >> (16 * slot)) % DIMENSIONS,
+            1.0 if bits >> (16 * slot + 15) & 1 else -1.0,
+        )
+        for slot in range(2)
+    )
+
+
+def embed(weighted: Counter) -> list[float] | None:
+    """Unit vector of weighted features, None if there are none."""
+
+    vector = [0.0] * DIMENSIONS
+    for feature, count in weighted.items():
+        weight = 1 + math.log(count) if count >= 1 else count
+        for dimension, sign in feature_slots(feature):
+            vector[dimension] += sign * weight
+    norm = math.sqrt(sum(value * value for value in vector))
+    if not norm:
+        return None
+    return [value / norm for value in vector]
+
+
+def projections(vector, table: int, bits: int = CODE_BITS) -> list[float]:
+    total = sum(vector)
+    return [
+        2 * sum(vector[dimension] for dimension in plane) - total
+        for plane in PLANES[table][:bits]
+    ]
+
+
+def lsh_codes(vector) -> list[int]:
+    """CODE_BITS-bit code per table, first hyperplane most significant."""
+
+    codes = []
+    for table in range(TABLES):
+        code = 0
+        for projection in projections(vector, table):
+            code = code << 1 | (projection >= 0)
+        codes.append(code)
+    return codes
+
+
+def bits_for(count: int) -> int:
+    """Leading code bits that keep buckets near BUCKET_SIZE articles."""
+
+    if count <= BUCKET_SIZE:
+        return 0
+    return min(CODE_BITS, int(math.log2(count / BUCKET_SIZE)))
+
+
+def pack_record(article_id: int, vector) -> bytes:
+    if vector is None:
+        return RECORD.pack(article_id, *[0] * TABLES, *[0.0] * DIMENSIONS)
+    return RECORD.pack(article_id, *lsh_codes(vector), *vector)
+
+
+def write_vectors(path, records) -> int:
+    """Write packed records to a new file and move it to path."""
+
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    total = 0
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, DIMENSIONS, TABLES))
+        for record in records:
+            file.write(record)
+            total += 1
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    return total
+
+
+class SemanticIndex:
+    """Per-worker LSH buckets over the shared vectors file."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = self.directory / VECTORS_NAME
+        self.lock_path = self.directory / LOCK_NAME
+        self._reset()
+
+    def _reset(self):
+        self.identity = None
+        self.buffer = None
+        self.loaded = 0
+        self.ids = array("Q")
+        self.codes = [array("H") for _ in range(TABLES)]
+        self.current = {}
+        self.bits = 0
+        self.buckets = [defaultdict(list) for _ in range(TABLES)]
+
+    def lock(self):
+        return FileLock(self.lock_path)
+
+    def _bucket(self, row: int) -> None:
+        shift = CODE_BITS - self.bits
+        for table in range(TABLES):
+            self.buckets[table][self.codes[table][row] >> shift].append(row)
+
+    def _rebucket(self) -> None:
+        self.bits = bits_for(len(self.current))
+        self.buckets = [defaultdict(list) for _ in range(TABLES)]
+        for row in self.current.values():
+            self._bucket(row)
+
+    def refresh(self) -> None:
+        """Map a replaced file and bucket records appended since."""
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return
+
+        if self.identity != stat.st_ino:
+            self._reset()
+            self.identity = stat.st_ino
+        count = (stat.st_size - HEADER.size) // RECORD.size
+        if count <= self.loaded:
+            return
+
+        with open(self.path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        first = self.loaded
+        for row in range(first, count):
+            article_id, *codes = RECORD_PREFIX.unpack_from(
+                self.buffer, HEADER.size + row * RECORD.size
+            )
+            self.ids.append(article_id)
+            for table, code in enumerate(codes):
+                self.codes[table].append(code)
+            self.current.pop(article_id, None)
+            if self._vector(row) is not None:
+                self.current[article_id] = row
+        self.loaded = count
+
+        if bits_for(len(self.current)) != self.bits:
+            self._rebucket()
+        else:
+            for row in range(first, count):
+                if self.current.get(self.ids[row]) == row:
+                    self._bucket(row)
+
+    def _vector(self, row: int):
+        """Vector of a record, None for a removal record."""
+
+        offset = HEADER.size + row * RECORD.size + RECORD_PREFIX.size
+        values = array("f", self.buffer[offset:offset + 4 * DIMENSIONS])
+        return values if any(values) else None
+
+    @property
+    def available(self) -> bool:
+        """Built by rebuild_semantic_index (build.sh runs it)."""
+
+        return self.path.exists()
+
+    def append(self, article_id: int, vector) -> None:
+        """
+        Append the latest vector of an article (None removes it).
+        An index that was never built is not maintained.
+        """
+
+        if not self.path.exists():
+            return
+        with self.lock(), open(self.path, "ab") as file:
+            file.write(pack_record(article_id, vector))
+
+    def search(self, query: str, limit: int) -> list[int]:
+        self.refresh()
+        vector = embed(features("", query))
+        if vector is None or not self.current:
+            return []
+
+        candidates = set()
+        for table in range(TABLES):
+            margins = projections(vector, table, self.bits)
+            code = 0
+            for margin in margins:
+                code = code << 1 | (margin >= 0)
+            probes = [code]
+            uncertain = sorted(
+                range(self.bits), key=lambda bit: abs(margins[bit])
+            )[:PROBES]
+            probes.extend(
+                code ^ (1 << (self.bits - 1 - bit)) for bit in uncertain
+            )
+            for probe in probes:
+                candidates.update(self.buckets[table].get(probe, ()))
+
+        threshold = min_similarity()
+        scores = {}
+        for row in candidates:
+            article_id = self.ids[row]
+            if self.current.get(article_id) != row:
+                continue
+            score = sum(map(float.__mul__, vector, self._vector(row)))
+            if score >= threshold:
+                scores[article_id] = score
+        return sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
+
+    def rebuild(self, articles) -> int:
+        """
+        Write the vectors of (article id, title, content) rows and
+        swap the file in; records appended meanwhile are kept.
+        """
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self.lock():
+            start = self.path.stat().st_size if self.path.exists() else 0
+        tmp_path = self.directory / f".rebuild.{os.getpid()}.f32"
+        total = write_vectors(
+            tmp_path,
+            (
+                pack_record(pk, embed(features(title, content)))
+                for pk, title, content in articles
+            ),
+        )
+        with self.lock():
+            if start and self.path.exists():
+                with open(self.path, "rb") as old, open(
+                    tmp_path, "ab"
+                ) as new:
+                    old.seek(max(start, HEADER.size))
+                    new.write(old.read())
+            os.replace(tmp_path, self.path)
+        return total
+
+
+_indexes = {}
+
+
+def get_semantic_index() -> SemanticIndex:
+    directory = str(settings.SEARCH_INDEX_DIR)
+    if directory not in _indexes:
+        _indexes[directory] = SemanticIndex(directory)
+    return _indexes[directory]
+
+
+def article_vector(article):
+    """Embedding of a published article, None otherwise."""
+
+    if not article.is_published:
+        return None
+    return embed(features(article.title, article.content))
+
+
+def update_semantic_index(article) -> None:
+    """Append the article's vector once the change is committed."""
+
+    pk, vector = article.pk, article_vector(article)
+    transaction.on_commit(lambda: get_semantic_index().append(pk, vector))
+
+
+def remove_from_semantic_index(article_id: int) -> None:
+    transaction.on_commit(
+        lambda: get_semantic_index().append(article_id, None)
+    )
+
+
+def rebuild_semantic_index() -> int:
+    """Embed every published article into a fresh vectors file."""
+
+    return get_semantic_index().rebuild(
+        Article.objects.filter(is_published=True).order_by(
+            "pk"
+        ).values_list("pk", "title", "content").iterator(chunk_size=2000)
+    )
+
+
+def semantic_search(queryset, query: str, limit: int | None = None):
+    """Narrow an Article queryset to its nearest articles, best first."""
+
+    limit = limit or getattr(
+        settings, "SEARCH_RESULTS_LIMIT", DEFAULT_SEARCH_RESULTS_LIMIT
+    )
+    return order_by_ids(queryset, get_semantic_index().search(query, limit))
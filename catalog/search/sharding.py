@@ -0,0 +1,200 @@
+"""
+Parallel rebuild of the article search index.
+
+Articles are split into shards of consecutive id ranges, indexed in
+a process pool. For the BM25 backend every shard is tokenized and
+written to its own segment; the shard segments are then merged and
+swapped in atomically while the old segment keeps serving searches.
+The Postgres backend indexes every shard into a shadow table, each
+in its own short transaction that locks no article and no row of the
+live table, then swaps the shadow table in. Other database backends
+are rebuilt in one transaction.
+"""
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+
+from django.db import connections, transaction
+from django.db.models import Count, Max, Min
+
+from catalog.models import Article
+from catalog.search.backends import PostgresSearchBackend
+from catalog.search.inverted import (
+    BM25SearchBackend,
+    analyze,
+    merge_segments,
+    write_segment,
+)
+
+DEFAULT_SHARD_SIZE = 5000
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def shard_ranges(shard_size: int) -> list[tuple[int, int]]:
+    """[first, last) article id ranges of about shard_size articles."""
+
+    bounds = Article.objects.aggregate(
+        first=Min("pk"),
+        last=Max("pk"),
+        total=Count("pk"),
+    )
+    if not bounds["total"]:
+        return []
+
+    shards = math.ceil(bounds["total"] / shard_size)
+    width = math.ceil((bounds["last"] - bounds["first"] + 1) / shards)
+    return [
+        (start, min(start + width, bounds["last"] + 1))
+        for start in range(bounds["first"], bounds["last"] + 1, width)
+    ]
+
+
+def index_shard(path, first: int, last: int) -> tuple[int, float]:
+    """Write the segment of articles first <= id < last to path."""
+
+    started = time.monotonic()
+    rows = Article.objects.filter(
+        pk__gte=first,
+        pk__lt=last,
+    ).order_by("pk").values_list("pk", "title", "content")
+    total = write_segment(
+        path,
+        (
+            (pk, analyze(title, content))
+            for pk, title, content in rows.iterator(chunk_size=2000)
+        ),
+    )
+    return total, time.monotonic() - started
+
+
+def run_in_worker(task, *args):
+    """Run in a child process, on its own database connections."""
+
+    try:
+        return task(*args)
+    finally:
+        connections.close_all()
+
+
+def run_shards(task, shards, workers: int, progress=None) -> None:
+    """
+    Call task(*shard) for every shard, in parallel when workers > 1.
+    task returns (articles indexed, seconds).
+    """
+
+    def report(done, indexed, seconds):
+        if progress is not None:
+            progress(done, len(shards), indexed, seconds)
+
+    if workers < 2 or len(shards) < 2:
+        for done, shard in enumerate(shards, start=1):
+            report(done, *task(*shard))
+        return
+
+    # Children must not share the parent's database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(shards)),
+        mp_context=multiprocessing.get_context("fork"),
+    ) as pool:
+        futures = [
+            pool.submit(run_in_worker, task, *shard) for shard in shards
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            report(done, *future.result())
+
+
+def build_shards(directory: Path, ranges, workers: int, progress=None):
+    """Write the segment of every shard; returns their paths."""
+
+    paths = [
+        directory / f"shard-{number:05d}.idx"
+        for number in range(len(ranges))
+    ]
+    run_shards(
+        index_shard,
+        [(path, first, last) for path, (first, last) in zip(paths, ranges)],
+        workers,
+        progress,
+    )
+    return paths
+
+
+def fill_table_shard(backend, first: int, last: int) -> tuple[int, float]:
+    """Index the articles first <= id < last into backend's shadow."""
+
+    started = time.monotonic()
+    total = backend.rebuild_shard(first, last)
+    return total, time.monotonic() - started
+
+
+def rebuild_table(backend, workers: int, shard_size: int, progress=None):
+    """Rebuild a Postgres index table through its shadow table."""
+
+    started = backend.start_rebuild()
+    totals = []
+
+    def count(done, shards, indexed, seconds):
+        totals.append(indexed)
+        if progress is not None:
+            progress(done, shards, indexed, seconds)
+
+    ranges = shard_ranges(shard_size)
+    run_shards(
+        partial(fill_table_shard, backend), ranges, workers, count
+    )
+    backend.finish_rebuild(started)
+    return sum(totals)
+
+
+def rebuild_index(
+    backend,
+    workers=None,
+    shard_size=DEFAULT_SHARD_SIZE,
+    progress=None,
+) -> int:
+    """
+    Rebuild the index of backend from every article.
+    progress(done shards, total shards, articles, seconds) is called
+    as each shard finishes. Returns the number of articles indexed.
+    """
+
+    workers = workers or default_workers()
+    if isinstance(backend, PostgresSearchBackend):
+        return rebuild_table(backend, workers, shard_size, progress)
+
+    if not isinstance(backend, BM25SearchBackend):
+        started = time.monotonic()
+        with transaction.atomic():
+            total = backend.rebuild(
+                Article.objects.only(
+                    "pk", "title", "content"
+                ).order_by("pk").iterator(chunk_size=2000)
+            )
+        if progress is not None:
+            progress(1, 1, total, time.monotonic() - started)
+        return total
+
+    index = backend.index
+
+    def write(path):
+        directory = Path(tempfile.mkdtemp(
+            prefix=".rebuild-", dir=index.directory
+        ))
+        try:
+            ranges = shard_ranges(shard_size)
+            paths = build_shards(directory, ranges, workers, progress)
+            return merge_segments(path, paths)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    return index.replace_segment(write)
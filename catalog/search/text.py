@@ -0,0 +1,15 @@
+import re
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """Lowercase text and collapse whitespace."""
+
+    return " ".join(text.lower().split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase word tokens."""
+
+    return TOKEN_RE.findall(text.lower())
@@ -0,0 +1,187 @@
+"""
+Typo-tolerant trigram search for knowledge bases, categories and
+employees.
+
+On PostgreSQL the pg_trgm extension and GIN trigram indexes do the
+work. Other databases use an in-process trigram index per model,
+updated from model signals and from the changes other processes
+publish through the cache.
+"""
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from catalog.search.backends import order_by_ids
+from catalog.search.memory import InProcessIndex
+
+TRIGRAM_FIELDS = {
+    "catalog.KnowledgeBase": ("title",),
+    "catalog.Category": ("topic",),
+    "catalog.Employee": ("first_name", "last_name"),
+}
+DEFAULT_SIMILARITY_THRESHOLD = 0.3
+
+WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+_indexes = {}
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigrams of every word, padded the way pg_trgm does it."""
+
+    grams = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(
+            padded[position:position + 3]
+            for position in range(len(padded) - 2)
+        )
+    return grams
+
+
+def similarity_threshold() -> float:
+    return getattr(
+        settings,
+        "TRIGRAM_SIMILARITY_THRESHOLD",
+        DEFAULT_SIMILARITY_THRESHOLD,
+    )
+
+
+def searchable_parts(values) -> list[str]:
+    """
+    Strings an object is matched against: every field, every word
+    of a multi-word field, and all fields joined together.
+    """
+
+    values = [value for value in values if value]
+    parts = list(values)
+    for value in values:
+        words = WORD_RE.findall(value)
+        if len(words) > 1:
+            parts.extend(words)
+    if len(values) > 1:
+        parts.append(" ".join(values))
+    return list(dict.fromkeys(parts))
+
+
+class TrigramIndex(InProcessIndex):
+    """In-process trigram index over some text fields of a model."""
+
+    def __init__(self, model, fields):
+        super().__init__()
+        self.model = model
+        self.fields = fields
+        self.generation_key = f"trigram:{model._meta.label_lower}"
+
+    def reset(self) -> None:
+        self.postings = defaultdict(set)
+        self.sizes = {}
+        self.keys = {}
+
+    def build(self) -> None:
+        for pk, *values in self.model.objects.values_list(
+            "pk", *self.fields
+        ).iterator():
+            self._add(pk, values)
+
+    def _add(self, pk, values) -> None:
+        entries = []
+        for number, part in enumerate(searchable_parts(values)):
+            grams = trigrams(part)
+            if not grams:
+                continue
+            key = (pk, number)
+            entries.append((key, grams))
+            self.sizes[key] = len(grams)
+            for gram in grams:
+                self.postings[gram].add(key)
+        self.keys[pk] = entries
+
+    def _remove(self, pk) -> None:
+        for key, grams in self.keys.pop(pk, ()):
+            del self.sizes[key]
+            for gram in grams:
+                self.postings[gram].discard(key)
+                if not self.postings[gram]:
+                    del self.postings[gram]
+
+    def apply(self, change) -> None:
+        pk, values = change
+        self._remove(pk)
+        if values is not None:
+            self._add(pk, values)
+
+    def update(self, instance) -> None:
+        self.publish((
+            instance.pk,
+            [getattr(instance, field) for field in self.fields],
+        ))
+
+    def remove(self, pk) -> None:
+        self.publish((pk, None))
+
+    def search(self, query: str, threshold: float | None = None):
+        """Return pks ordered by best trigram similarity."""
+
+        self.ensure_fresh()
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        if threshold is None:
+            threshold = similarity_threshold()
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        best = {}
+        for key, common in shared.items():
+            score = common / (len(query_grams) + self.sizes[key] - common)
+            if score >= threshold and score > best.get(key[0], 0):
+                best[key[0]] = score
+
+        return sorted(best, key=lambda pk: (-best[pk], pk))
+
+
+def get_trigram_index(model) -> TrigramIndex:
+    label = model._meta.label
+    if label not in _indexes:
+        _indexes[label] = TrigramIndex(model, TRIGRAM_FIELDS[label])
+    return _indexes[label]
+
+
+def reset_trigram_indexes() -> None:
+    """Forget loaded indexes; they are rebuilt on the next search."""
+
+    _indexes.clear()
+
+
+def trigram_search(queryset, query: str):
+    """Filter queryset by trigram similarity, best match first."""
+
+    fields = TRIGRAM_FIELDS[queryset.model._meta.label]
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__trigram_word_similar": query})
+        similarities = [
+            TrigramWordSimilarity(query, field) for field in fields
+        ]
+        return queryset.filter(condition).annotate(
+            similarity=(
+                Greatest(*similarities)
+                if len(similarities) > 1 else similarities[0]
+            )
+        ).order_by("-similarity", "pk")
+
+    return order_by_ids(
+        queryset,
+        get_trigram_index(queryset.model).search(query),
+    )
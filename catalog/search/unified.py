@@ -0,0 +1,191 @@
+"""
+One search box over knowledge bases, categories, articles and
+employees.
+
+Each section validates the query with its own list page search form
+and is cached on its own, keyed by a version that changes whenever
+its data does: term versions of the article result cache for
+articles, the number of the last change published by their trigram
+index for the rest. Sections that miss the cache run concurrently in
+a thread pool, so a search costs about as much as its slowest
+section.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+
+from catalog.forms import (
+    ArticleSearchForm,
+    CategorySearchForm,
+    EmployeeSearchForm,
+    KnowledgeBaseSearchForm,
+)
+from catalog.models import Article, Category, Employee, KnowledgeBase
+from catalog.search.backends import get_search_backend, order_by_ids
+from catalog.search.cache import normalize_query, result_key
+from catalog.search.trigram import get_trigram_index, trigram_search
+
+DEFAULT_LIMIT = 5
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 300
+
+
+def search_articles(query: str, limit: int) -> list[dict]:
+    ids = get_search_backend().search(query, limit)
+    return [
+        {
+            "id": pk,
+            "label": title,
+            "url": reverse("catalog:article-detail", args=[pk]),
+        }
+        for pk, title in order_by_ids(
+            Article.objects.all(), ids
+        ).values_list("pk", "title")
+    ]
+
+
+def trigram_section(model, label, url):
+    def search(query: str, limit: int) -> list[dict]:
+        return [
+            {
+                "id": item.pk,
+                "label": label(item),
+                "url": reverse(url, args=[item.pk]),
+            }
+            for item in trigram_search(model.objects.all(), query)[:limit]
+        ]
+    return search
+
+
+SECTIONS = {
+    "knowledge_bases": {
+        "title": "Knowledge bases",
+        "form": KnowledgeBaseSearchForm,
+        "field": "title",
+        "search": trigram_section(
+            KnowledgeBase,
+            lambda knowledge_base: knowledge_base.title,
+            "catalog:knowledge-base-detail",
+        ),
+        "model": KnowledgeBase,
+    },
+    "categories": {
+        "title": "Categories",
+        "form": CategorySearchForm,
+        "field": "topic",
+        "search": trigram_section(
+            Category,
+            lambda category: category.topic,
+            "catalog:category-detail",
+        ),
+        "model": Category,
+    },
+    "articles": {
+        "title": "Articles",
+        "form": ArticleSearchForm,
+        "field": "title",
+        "search": search_articles,
+        "model": None,
+    },
+    "employees": {
+        "title": "Employees",
+        "form": EmployeeSearchForm,
+        "field": "query",
+        "search": trigram_section(
+            Employee,
+            lambda employee: employee.full_name,
+            "catalog:employee-detail",
+        ),
+        "model": Employee,
+    },
+}
+
+
+def section_query(name: str, query: str) -> str:
+    """The query as cleaned by the section's own search form."""
+
+    section = SECTIONS[name]
+    form = section["form"]({section["field"]: query})
+    if not form.is_valid():
+        return ""
+    return form.cleaned_data.get(section["field"]) or ""
+
+
+def section_key(name: str, query: str, limit: int) -> str:
+    model = SECTIONS[name]["model"]
+    normalized = normalize_query(query)
+    if model is None:
+        version = result_key(normalized, {"section": name})
+    else:
+        version = cache.get(get_trigram_index(model).generation_key, 0)
+    payload = f"{name}:{limit}:{version}:{normalized}"
+    return "search:section:" + hashlib.md5(payload.encode()).hexdigest()
+
+
+def run_section(name: str, query: str, limit: int, key: str) -> list[dict]:
+    """Search one section and cache its hits under key."""
+
+    hits = SECTIONS[name]["search"](query, limit)
+    cache.set(
+        key,
+        hits,
+        getattr(settings, "SEARCH_SECTION_TIMEOUT", DEFAULT_TIMEOUT),
+    )
+    return hits
+
+
+def run_in_thread(function, *args):
+    """Run function and close the database connections of the thread."""
+
+    try:
+        return function(*args)
+    finally:
+        connections.close_all()
+
+
+def fan_out(tasks: dict, workers: int) -> dict:
+    """
+    Call every (function, *args) of tasks concurrently.
+    With fewer than two workers they run one after another.
+    """
+
+    if workers < 2 or len(tasks) < 2:
+        return {
+            name: function(*args) for name, (function, *args) in tasks.items()
+        }
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = {
+            name: pool.submit(run_in_thread, function, *args)
+            for name, (function, *args) in tasks.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def unified_search(query: str, limit: int = DEFAULT_LIMIT) -> dict:
+    """Top hits of every section, {name: [{id, label, url}, ...]}."""
+
+    queries = {name: section_query(name, query) for name in SECTIONS}
+    results = {name: [] for name in SECTIONS}
+    keys = {
+        name: section_key(name, section, limit)
+        for name, section in queries.items() if normalize_query(section)
+    }
+    cached = cache.get_many(keys.values())
+
+    tasks = {}
+    for name, key in keys.items():
+        if key in cached:
+            results[name] = cached[key]
+        else:
+            tasks[name] = (run_section, name, queries[name], limit, key)
+
+    results.update(fan_out(
+        tasks,
+        getattr(settings, "SEARCH_FANOUT_WORKERS", DEFAULT_WORKERS),
+    ))
+    return results
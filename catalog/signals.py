@@ -0,0 +1,449 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from catalog.models import (
+    Article,
+    Category,
+    Comment,
+    Employee,
+    KnowledgeBase,
+    Rating,
+)
+from catalog.search import get_search_backend
+from catalog.search.autocomplete import (
+    KINDS_BY_MODEL,
+    SOURCES,
+    prefix_index,
+)
+from catalog.search.cache import (
+    NO_TERMS,
+    article_terms,
+    invalidate_articles,
+    invalidate_terms,
+)
+from catalog.search.duplicates import update_duplicates
+from catalog.search.percolator import percolate_on_commit
+from catalog.search.related import update_related_articles
+from catalog.search.semantic import (
+    remove_from_semantic_index,
+    update_semantic_index,
+)
+from catalog.search.trigram import TRIGRAM_FIELDS, get_trigram_index
+from catalog.stats.counters import article_views
+from catalog.stats import authors, leaderboards, ratings, site, totals
+from catalog.stats.rollups import add_activity
+from catalog.stats.trending import add_trending, sync_trends
+
+
+# Sent after a bulk UPDATE of articles that bypassed save(), with
+# article_ids and was_published (those published before the UPDATE).
+# Every subsystem keeping state derived from articles receives it.
+articles_bulk_changed = Signal()
+
+
+def update_articles(queryset, **values) -> int:
+    """
+    Update articles in bulk and send articles_bulk_changed.
+    Returns the number of articles updated.
+    """
+
+    article_ids = list(queryset.values_list("pk", flat=True))
+    articles = Article.objects.filter(pk__in=article_ids)
+    was_published = set(
+        articles.filter(is_published=True).values_list("pk", flat=True)
+    )
+    updated = articles.update(**values)
+    articles_bulk_changed.send(
+        sender=Article,
+        article_ids=article_ids,
+        was_published=was_published,
+    )
+    return updated
+
+
+def touches(instance, update_fields, fields) -> bool:
+    """
+    Whether a save may have changed fields. update_fields alone cannot
+    tell (saves of existing rows list every field), so the saved values
+    are compared to the loaded ones when the instance has them.
+    """
+
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return False
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is None:
+        return True
+    return any(
+        attname not in loaded or loaded[attname] != getattr(instance, attname)
+        for attname in (
+            instance._meta.get_field(field).attname for field in fields
+        )
+    )
+
+
+@receiver(post_save, sender=Article)
+def index_article(sender, instance, **kwargs):
+    """Keep the search index in sync with saved articles."""
+
+    get_search_backend().index_article(instance)
+
+
+@receiver(post_delete, sender=Article)
+def unindex_article(sender, instance, **kwargs):
+    """Drop deleted articles from the search index."""
+
+    get_search_backend().remove_article(instance.pk)
+
+
+@receiver(post_save, sender=Article)
+def update_related(sender, instance, update_fields=None, **kwargs):
+    """Refresh related articles once the change is committed."""
+
+    if touches(instance, update_fields, ("title", "content", "is_published")):
+        transaction.on_commit(lambda: update_related_articles(instance))
+
+
+@receiver(post_save, sender=Article)
+def embed_article(sender, instance, update_fields=None, **kwargs):
+    """Keep the semantic index in sync with published articles."""
+
+    if touches(instance, update_fields, ("title", "content", "is_published")):
+        update_semantic_index(instance)
+
+
+@receiver(post_delete, sender=Article)
+def unembed_article(sender, instance, **kwargs):
+    remove_from_semantic_index(instance.pk)
+
+
+@receiver(post_save, sender=Article)
+def percolate_published_article(sender, instance, **kwargs):
+    """Notify saved searches when an article becomes published."""
+
+    if instance.is_published and not instance.loaded_value(
+        "is_published", False
+    ):
+        percolate_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Article)
+def flag_duplicates(sender, instance, update_fields=None, **kwargs):
+    """Re-check near-duplicates once the change is committed."""
+
+    if touches(instance, update_fields, ("content",)):
+        transaction.on_commit(lambda: update_duplicates(instance))
+
+
+@receiver(post_save, sender=KnowledgeBase)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Employee)
+def update_trigram_index(sender, instance, update_fields=None, **kwargs):
+    """Re-index searchable names once the change is committed."""
+
+    if touches(instance, update_fields, TRIGRAM_FIELDS[sender._meta.label]):
+        index = get_trigram_index(sender)
+        transaction.on_commit(lambda: index.update(instance))
+
+
+@receiver(post_delete, sender=KnowledgeBase)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Employee)
+def remove_from_trigram_index(sender, instance, **kwargs):
+    index = get_trigram_index(sender)
+    pk = instance.pk
+    transaction.on_commit(lambda: index.remove(pk))
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=KnowledgeBase)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Employee)
+def update_prefix_index(sender, instance, update_fields=None, **kwargs):
+    """Refresh autocomplete suggestions once the change is committed."""
+
+    source = SOURCES[KINDS_BY_MODEL[sender._meta.label]]
+    fields = [*source["fields"], *source["filter"]]
+    if touches(instance, update_fields, fields):
+        transaction.on_commit(lambda: prefix_index.update(instance))
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=KnowledgeBase)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Employee)
+def remove_from_prefix_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: prefix_index.remove(sender, pk))
+
+
+SEARCHED_FIELDS = ("title", "content")
+LISTED_FIELDS = ("category", "author", "reading_time", "is_published")
+
+
+@receiver(post_save, sender=Article)
+def invalidate_article_searches(sender, instance, created,
+                                update_fields=None, **kwargs):
+    """Expire cached searches the article matched before or after."""
+
+    listed = created or touches(instance, update_fields, LISTED_FIELDS)
+    if listed or touches(instance, update_fields, SEARCHED_FIELDS):
+        terms = article_terms(
+            instance.title,
+            instance.content,
+            instance.loaded_value("title"),
+            instance.loaded_value("content"),
+        )
+        invalidate_terms(terms | {NO_TERMS} if listed else terms)
+
+
+@receiver(post_delete, sender=Article)
+def invalidate_deleted_article_searches(sender, instance, **kwargs):
+    invalidate_terms(
+        article_terms(instance.title, instance.content) | {NO_TERMS}
+    )
+
+
+@receiver(pre_save, sender=Rating)
+def remember_rating(sender, instance, **kwargs):
+    instance._old_rating = Rating.objects.filter(
+        pk=instance.pk
+    ).values_list("article_id", "rating").first()
+
+
+@receiver(post_save, sender=Rating)
+def count_rating(sender, instance, **kwargs):
+    """Runs before the receivers below read the stored average."""
+
+    new = instance.article_id, instance.rating
+    ratings.rating_moved(instance._old_rating, new)
+    authors.rating_moved(instance._old_rating, new)
+
+
+@receiver(post_delete, sender=Rating)
+def uncount_rating(sender, instance, **kwargs):
+    old = instance.article_id, instance.rating
+    ratings.rating_moved(old, None)
+    authors.rating_moved(old, None)
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_searches(sender, instance, created, **kwargs):
+    """A category moved to another knowledge base changes KB facets."""
+
+    if not created and (
+        instance._old_knowledge_base_id != instance.knowledge_base_id
+    ):
+        invalidate_articles(instance.articles.all())
+
+
+@receiver(post_save, sender=Rating)
+def count_rating_activity(sender, instance, created, **kwargs):
+    """New ratings go to the hourly activity rollup; re-rates do not."""
+
+    if created:
+        counts = {instance.article_id: Counter(ratings=1)}
+        add_activity(counts)
+        add_trending(counts)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_activity(sender, instance, created, **kwargs):
+    if created:
+        counts = {instance.article_id: Counter(comments=1)}
+        add_activity(counts)
+        add_trending(counts)
+
+
+@receiver(post_save, sender=Article)
+def sync_article_trend(sender, instance, update_fields=None, **kwargs):
+    """Trending lists filter on the copied publish state and base."""
+
+    if touches(instance, update_fields, ("is_published", "category")):
+        sync_trends([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def sync_category_trends(sender, instance, created, **kwargs):
+    if not created:
+        sync_trends(instance.articles.all())
+
+
+@receiver(post_delete, sender=Article)
+def delete_view_shards(sender, instance, **kwargs):
+    article_views.shards().filter(object_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Article)
+def count_site_article(sender, instance, created, **kwargs):
+    site.article_saved(instance, created)
+
+
+@receiver(post_delete, sender=Article)
+def uncount_site_article(sender, instance, origin=None, **kwargs):
+    site.article_deleted(instance, origin)
+
+
+SITE_TOTALS = {
+    KnowledgeBase: "total_knowledge_bases",
+    Category: "total_categories",
+    Comment: "total_comments",
+    Employee: "total_employees",
+}
+
+
+@receiver(post_save, sender=KnowledgeBase)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Employee)
+def count_site_total(sender, instance, created, **kwargs):
+    if created:
+        site.adjust(**{SITE_TOTALS[sender]: 1})
+
+
+@receiver(post_delete, sender=KnowledgeBase)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Employee)
+def uncount_site_total(sender, instance, **kwargs):
+    site.adjust(**{SITE_TOTALS[sender]: -1})
+
+
+# views_count is a stored total: views reach the boards through
+# counters.views_changed, never through a save
+LEADERBOARD_FIELDS = ("is_published", "category_id", "author_id")
+
+
+@receiver(post_save, sender=Article)
+def update_article_leaderboards(sender, instance, created, **kwargs):
+    if created or any(
+        instance.loaded_value(field) != getattr(instance, field)
+        for field in LEADERBOARD_FIELDS
+    ):
+        leaderboards.article_changed(instance, {
+            "category_id": instance.loaded_value("category_id"),
+            "author_id": instance.loaded_value("author_id"),
+        })
+
+
+@receiver(post_delete, sender=Article)
+def remove_article_from_leaderboards(sender, instance, **kwargs):
+    leaderboards.article_changed(instance)
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def update_rating_leaderboards(sender, instance, **kwargs):
+    leaderboards.rating_changed(instance.article_id)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_knowledge_base(sender, instance, **kwargs):
+    instance._old_knowledge_base_id = Category.objects.filter(
+        pk=instance.pk
+    ).values_list("knowledge_base_id", flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def update_category_leaderboards(sender, instance, created, **kwargs):
+    """A category moving between bases changes both bases' boards."""
+
+    old = instance._old_knowledge_base_id
+    if created:
+        leaderboards.refresh(
+            "largest_categories", [instance.pk], [instance.knowledge_base_id]
+        )
+    elif old != instance.knowledge_base_id:
+        leaderboards.rebuild_leaderboards([old, instance.knowledge_base_id])
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_from_leaderboards(sender, instance, **kwargs):
+    leaderboards.refresh(
+        "largest_categories", [instance.pk], [instance.knowledge_base_id]
+    )
+
+
+@receiver(post_save, sender=Article)
+def count_category_article(sender, instance, created, **kwargs):
+    totals.article_saved(instance, created)
+
+
+@receiver(post_delete, sender=Article)
+def uncount_category_article(sender, instance, **kwargs):
+    totals.article_deleted(instance)
+
+
+@receiver(post_save, sender=Article)
+def count_author_article(sender, instance, created, **kwargs):
+    authors.article_saved(instance, created)
+
+
+@receiver(post_delete, sender=Article)
+def uncount_author_article(sender, instance, **kwargs):
+    authors.article_deleted(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_category_comment(sender, instance, created, **kwargs):
+    if created:
+        totals.comment_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_category_comment(sender, instance, **kwargs):
+    totals.comment_changed(instance, -1)
+
+
+@receiver(post_save, sender=Category)
+def count_knowledge_base_category(sender, instance, created, **kwargs):
+    old = instance._old_knowledge_base_id
+    if created:
+        KnowledgeBase.objects.filter(pk=instance.knowledge_base_id).update(
+            categories_count=F("categories_count") + 1
+        )
+    elif old != instance.knowledge_base_id:
+        totals.recount(knowledge_base_ids=[old, instance.knowledge_base_id])
+
+
+@receiver(post_delete, sender=Category)
+def uncount_knowledge_base_category(sender, instance, **kwargs):
+    KnowledgeBase.objects.filter(pk=instance.knowledge_base_id).update(
+        categories_count=F("categories_count") - 1
+    )
+
+
+@receiver(articles_bulk_changed)
+def refresh_bulk_changed_search(sender, article_ids, was_published,
+                                **kwargs):
+    """Search state derived from the articles, as their saves would."""
+
+    articles = list(Article.objects.filter(pk__in=article_ids))
+    invalidate_articles(Article.objects.filter(pk__in=article_ids))
+    percolate_on_commit(
+        article.pk for article in articles
+        if article.is_published and article.pk not in was_published
+    )
+    for article in articles:
+        update_semantic_index(article)
+        transaction.on_commit(
+            lambda article=article: update_related_articles(article)
+        )
+        transaction.on_commit(
+            lambda article=article: prefix_index.update(article)
+        )
+
+
+@receiver(articles_bulk_changed)
+def refresh_bulk_changed_stats(sender, article_ids, was_published,
+                               **kwargs):
+    """Stored counts, boards and trends of the articles."""
+
+    site.articles_published(article_ids, was_published)
+    totals.articles_changed(article_ids)
+    authors.articles_changed(article_ids)
+    leaderboards.articles_changed(article_ids)
+    sync_trends(article_ids)
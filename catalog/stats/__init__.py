@@ -0,0 +1,3 @@
+from catalog.stats.buffer import flush_views, record_view
+
+__all__ = ["flush_views", "record_view"]
@@ -0,0 +1,101 @@
+"""
+Stored author totals of employees.
+
+Employee keeps the number of its published articles and the sum and
+number of the ratings those articles received, so author lists read
+columns instead of querying per row. Signals add to them in place
+when an article is published, unpublished, deleted or given to
+another author, and when a rating of a published article changes.
+The admin publish actions recount the authors of the articles they
+update; recount_authors recounts everyone.
+"""
+from django.db.models import F
+
+from catalog.aggregates import SubqueryCount, SubquerySum
+from catalog.models import Article, Employee
+from catalog.stats.ratings import rating_changes
+
+
+def adjust(author_id, **deltas) -> None:
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas and author_id is not None:
+        Employee.objects.filter(pk=author_id).update(**{
+            field: F(field) + delta for field, delta in deltas.items()
+        })
+
+
+def article_moved(article, was_published: bool, old_author_id) -> None:
+    """Move an article's totals from its old author to its current one."""
+
+    if not was_published and not article.is_published:
+        return
+    rating_sum, rating_count = Article.objects.filter(
+        pk=article.pk
+    ).values_list("rating_sum", "rating_count").first() or (0, 0)
+    for published, author_id, sign in (
+        (was_published, old_author_id, -1),
+        (article.is_published, article.author_id, 1),
+    ):
+        if published:
+            adjust(
+                author_id,
+                published_articles_total=sign,
+                published_rating_sum=sign * rating_sum,
+                published_rating_count=sign * rating_count,
+            )
+
+
+def article_saved(article, created: bool) -> None:
+    if created:
+        article_moved(article, False, None)
+    elif (
+        article.loaded_value("is_published") != article.is_published
+        or article.loaded_value("author_id") != article.author_id
+    ):
+        article_moved(
+            article,
+            article.loaded_value("is_published", False),
+            article.loaded_value("author_id"),
+        )
+
+
+def article_deleted(article) -> None:
+    """Its ratings were deleted, and subtracted, before it."""
+
+    if article.is_published:
+        adjust(article.author_id, published_articles_total=-1)
+
+
+def rating_moved(old, new) -> None:
+    """old, new: (article id, value) of a rating before and after."""
+
+    for article_id, deltas in rating_changes(old, new).items():
+        author_id = Article.objects.filter(
+            pk=article_id, is_published=True,
+        ).values_list("author_id", flat=True).first()
+        adjust(
+            author_id,
+            published_rating_sum=deltas["rating_sum"],
+            published_rating_count=deltas["rating_count"],
+        )
+
+
+def recount_authors(employees=None, article_model=Article) -> None:
+    """Recount the author totals of a queryset of employees, or all."""
+
+    if employees is None:
+        employees = Employee.objects.all()
+    articles = article_model.objects.filter(is_published=True)
+    employees.update(
+        published_articles_total=SubqueryCount(articles, "author"),
+        published_rating_sum=SubquerySum(articles, "author", "rating_sum"),
+        published_rating_count=SubquerySum(
+            articles, "author", "rating_count"
+        ),
+    )
+
+
+def articles_changed(article_ids) -> None:
+    """Recount the authors of articles changed by a bulk update."""
+
+    recount_authors(Employee.objects.filter(articles__pk__in=article_ids))
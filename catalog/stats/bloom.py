@@ -0,0 +1,158 @@
+"""
+Repeat-view suppression with a rotating Bloom filter.
+
+A view is identified by the viewer's session (or IP address) and the
+article. Views are buffered with that key and checked when the view
+buffer is flushed, against one filter shared by every worker: the
+RepeatViewFilter row, locked by the flush until it commits, so a
+repeat is dropped whichever worker served the first view. The row
+holds two Bloom filters: views of the current VIEW_DEDUP_WINDOW
+seconds are added to the current one, and a view found in either is
+a repeat. When the window ends, or the current filter holds
+VIEW_DEDUP_CAPACITY views, the current filter becomes the previous
+one and the old previous one is discarded, so the row stays fixed in
+size and a repeat is dropped for one to two windows. Repeats of a
+view still in the same buffer are dropped when it is flushed.
+
+Filters are sized for VIEW_DEDUP_ERROR_RATE, the share of first views
+wrongly taken for repeats. A window of 0 disables suppression.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from catalog.models import RepeatViewFilter
+
+DEFAULT_WINDOW = 1800
+DEFAULT_CAPACITY = 100000
+DEFAULT_ERROR_RATE = 0.001
+ROW_ID = 1
+
+
+class BloomFilter:
+    """Set membership with false positives, in fixed memory."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        ))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [
+            (first + number * second) % self.size
+            for number in range(self.hashes)
+        ]
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] >> (position & 7) & 1
+            for position in self.positions(key)
+        )
+
+    def add(self, key: str) -> None:
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class RotatingBloomFilter:
+    """Keys seen in the current or the previous window."""
+
+    def __init__(self, window: float, capacity: int, error_rate: float):
+        self.window = window
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.previous = BloomFilter(capacity, error_rate)
+        self.current = BloomFilter(capacity, error_rate)
+        self.started = time.time()
+
+    def rotate(self) -> None:
+        self.previous = self.current
+        self.current = BloomFilter(self.capacity, self.error_rate)
+        self.started = time.time()
+
+    def seen(self, key: str) -> bool:
+        """Whether key was seen lately; it is remembered either way."""
+
+        with self.lock:
+            if (
+                time.time() - self.started >= self.window
+                or self.current.count >= self.capacity
+            ):
+                self.rotate()
+            if key in self.current or key in self.previous:
+                return True
+            self.current.add(key)
+            return False
+
+
+def dedup_config() -> tuple:
+    return (
+        getattr(settings, "VIEW_DEDUP_WINDOW", DEFAULT_WINDOW),
+        getattr(settings, "VIEW_DEDUP_CAPACITY", DEFAULT_CAPACITY),
+        getattr(settings, "VIEW_DEDUP_ERROR_RATE", DEFAULT_ERROR_RATE),
+    )
+
+
+def load_filter(config) -> RotatingBloomFilter:
+    """The shared filter, locked; a new one if its settings changed."""
+
+    dedup = RotatingBloomFilter(*config)
+    row = RepeatViewFilter.objects.select_for_update().filter(
+        pk=ROW_ID
+    ).first()
+    if row is not None and (row.window, row.capacity, row.error_rate) == (
+        config
+    ):
+        dedup.started = row.started
+        dedup.current.bits = bytearray(row.current)
+        dedup.current.count = row.current_count
+        dedup.previous.bits = bytearray(row.previous)
+    return dedup
+
+
+def save_filter(dedup: RotatingBloomFilter) -> None:
+    RepeatViewFilter.objects.update_or_create(pk=ROW_ID, defaults={
+        "window": dedup.window,
+        "capacity": dedup.capacity,
+        "error_rate": dedup.error_rate,
+        "started": dedup.started,
+        "current": bytes(dedup.current.bits),
+        "current_count": dedup.current.count,
+        "previous": bytes(dedup.previous.bits),
+    })
+
+
+def viewer_key(request) -> str:
+    return request.session.session_key or request.META.get(
+        "REMOTE_ADDR", ""
+    )
+
+
+def drop_repeats(views) -> list[int]:
+    """
+    Article ids of the views, (viewer key, article id) pairs, that
+    were not seen lately; all of them are remembered. Call inside a
+    transaction: the shared filter stays locked until it ends.
+    """
+
+    config = dedup_config()
+    if not config[0]:
+        return [article_id for _, article_id in views]
+    dedup = load_filter(config)
+    fresh = [
+        article_id for key, article_id in views
+        if not dedup.seen(f"{key}:{article_id}")
+    ]
+    save_filter(dedup)
+    return fresh
@@ -0,0 +1,195 @@
+"""
+Buffered article view counts.
+
+Article pages do not write to the database on every view. Views are
+added to an in-process buffer and written to the sharded article
+view counter in one UPDATE ... SET count = count + CASE ... statement
+per shard for all buffered articles, when the buffer is older than
+VIEW_COUNT_FLUSH_INTERVAL seconds or holds VIEW_COUNT_MAX_PENDING
+views. The latter bounds how many views a crashed worker may lose;
+the buffer is also flushed when the process exits. The age is
+enforced by a timer started with the first buffered view, so a quiet
+worker does not wait for further views to write its buffer.
+
+Views may carry a viewer hash; flushing adds those to the unique
+viewer sketches of the articles and their categories. Views may also
+carry a repeat key, the viewer's session; flushing drops those seen
+lately by any worker (see catalog/stats/bloom.py). Flushed views
+are also added to the hourly activity rollups and trending scores.
+
+A flush interval of 0 writes every view immediately.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from catalog.stats.bloom import drop_repeats
+from catalog.stats.counters import article_views
+from catalog.stats.rollups import add_activity
+from catalog.stats.trending import add_trending
+from catalog.stats.viewers import record_viewers
+
+DEFAULT_FLUSH_INTERVAL = 10
+DEFAULT_MAX_PENDING = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def flush_interval() -> float:
+    return getattr(
+        settings, "VIEW_COUNT_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL
+    )
+
+
+def max_pending() -> int:
+    return getattr(settings, "VIEW_COUNT_MAX_PENDING", DEFAULT_MAX_PENDING)
+
+
+class ViewBuffer:
+    """Views per article id waiting to be written."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.viewers = defaultdict(set)
+        self.keyed = []
+        self.total = 0
+        self.started = time.monotonic()
+        self.timer = None
+
+    def schedule(self) -> None:
+        """Flush in flush_interval() seconds; called with the lock held."""
+
+        if self.timer is not None or not flush_interval():
+            return
+        self.timer = threading.Timer(flush_interval(), self.flush_on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush_on_timer(self) -> None:
+        with self.lock:
+            self.timer = None
+        try:
+            self.flush()
+        except DatabaseError:
+            logger.exception("Buffered article views were kept.")
+        finally:
+            # The timer thread's own connection.
+            connections.close_all()
+
+    def add(
+        self,
+        article_id: int,
+        viewer: int | None = None,
+        repeat_key: str | None = None,
+    ) -> None:
+        """
+        Buffer a view and flush if due. A failed flush is logged, not
+        raised: counting must not fail the page, and the views stay
+        buffered for the next flush.
+        """
+
+        with self.lock:
+            if not self.pending and not self.keyed:
+                self.started = time.monotonic()
+                self.schedule()
+            if repeat_key is None:
+                self.pending[article_id] += 1
+            else:
+                self.keyed.append((repeat_key, article_id))
+            if viewer is not None:
+                self.viewers[article_id].add(viewer)
+            self.total += 1
+            due = (
+                time.monotonic() - self.started >= flush_interval()
+                or self.total >= max_pending()
+            )
+        if due:
+            try:
+                self.flush()
+            except DatabaseError:
+                logger.exception("Buffered article views were kept.")
+                with self.lock:
+                    self.started = time.monotonic()
+
+    def take(self) -> tuple[Counter, dict, list]:
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            pending, self.pending = self.pending, Counter()
+            viewers, self.viewers = self.viewers, defaultdict(set)
+            keyed, self.keyed = self.keyed, []
+            self.total = 0
+        return pending, viewers, keyed
+
+    def restore(self, pending: Counter, viewers: dict, keyed: list) -> None:
+        with self.lock:
+            self.pending.update(pending)
+            self.keyed.extend(keyed)
+            self.total += sum(pending.values()) + len(keyed)
+            for article_id, hashes in viewers.items():
+                self.viewers[article_id].update(hashes)
+            if self.pending or self.keyed:
+                self.schedule()
+
+    def flush(self) -> int:
+        """
+        Write buffered views, less repeats, to the view counts, unique
+        viewer sketches, hourly activity and trending scores; kept if
+        the write fails.
+        """
+
+        pending, viewers, keyed = self.take()
+        if not pending and not viewers and not keyed:
+            return 0
+        try:
+            with transaction.atomic():
+                counted = pending + Counter(drop_repeats(keyed))
+                article_views.add(counted)
+                record_viewers(viewers)
+                counts = {
+                    article_id: Counter(views=views)
+                    for article_id, views in counted.items()
+                }
+                add_activity(counts)
+                add_trending(counts)
+        except Exception:
+            self.restore(pending, viewers, keyed)
+            raise
+        return sum(counted.values())
+
+
+view_buffer = ViewBuffer()
+
+
+@atexit.register
+def flush_on_exit() -> None:
+    try:
+        view_buffer.flush()
+    except DatabaseError:
+        logger.exception("Buffered article views were lost.")
+
+
+def record_view(
+    article_id: int,
+    viewer: int | None = None,
+    repeat_key: str | None = None,
+) -> None:
+    """
+    Count a view of an article, by a viewer hash if known, unless the
+    repeat key has viewed it lately.
+    """
+
+    view_buffer.add(article_id, viewer, repeat_key)
+
+
+def flush_views() -> int:
+    """Write every buffered view, returning how many were written."""
+
+    return view_buffer.flush()
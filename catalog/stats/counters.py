@@ -0,0 +1,189 @@
+"""
+Batched and sharded counter writes.
+
+Counts are added in place (field = field + amount), so concurrent
+writers never overwrite each other, and many rows are updated by one
+statement.
+
+A ShardedCounter spreads the count of each object over COUNTER_SHARDS
+CounterShard rows and every write picks one at random, so concurrent
+writers to a popular object rarely wait on the same row lock.
+consolidate() periodically folds the shards into a column of the
+counted model (Article.views_count for article views): lists read
+that column, pages that need the exact value add the shards.
+"""
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+from catalog.models import Article, CounterShard
+from catalog.search.autocomplete import prefix_index
+from catalog.stats.leaderboards import views_changed
+
+DEFAULT_SHARDS = 8
+
+
+def increment_counts(rows, field: str, counts: dict, key="pk") -> int:
+    """
+    Add counts {key: amount} to field of a queryset in a single
+    UPDATE. Rows with the same amount share one WHEN clause.
+    """
+
+    by_amount = defaultdict(list)
+    for value, amount in counts.items():
+        if amount:
+            by_amount[amount].append(value)
+    if not by_amount:
+        return 0
+
+    return rows.filter(**{
+        f"{key}__in": [value for values in by_amount.values()
+                       for value in values],
+    }).update(**{
+        field: F(field) + Case(
+            *(
+                When(**{f"{key}__in": values}, then=Value(amount))
+                for amount, values in by_amount.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    })
+
+
+def shard_count() -> int:
+    return getattr(settings, "COUNTER_SHARDS", DEFAULT_SHARDS)
+
+
+class ShardedCounter:
+    """Counter per object of model, consolidated into model.field."""
+
+    def __init__(self, name: str, model, field: str, changed=None):
+        self.name = name
+        self.model = model
+        self.field = field
+        self.changed = changed
+
+    def shards(self):
+        return CounterShard.objects.filter(name=self.name)
+
+    def add(self, counts: dict) -> None:
+        """Add {object id: amount} to one random shard each."""
+
+        by_shard = defaultdict(dict)
+        for object_id, amount in counts.items():
+            if amount:
+                by_shard[random.randrange(shard_count())][object_id] = amount
+        if not by_shard:
+            return
+
+        with transaction.atomic():
+            CounterShard.objects.bulk_create(
+                [
+                    CounterShard(
+                        name=self.name, object_id=object_id, shard=shard
+                    )
+                    for shard, amounts in by_shard.items()
+                    for object_id in amounts
+                ],
+                ignore_conflicts=True,
+            )
+            for shard, amounts in by_shard.items():
+                increment_counts(
+                    self.shards().filter(shard=shard),
+                    "count",
+                    amounts,
+                    key="object_id",
+                )
+
+    def pending(self, object_id: int) -> int:
+        """Count not consolidated into the model yet."""
+
+        return self.shards().filter(object_id=object_id).aggregate(
+            total=Coalesce(Sum("count"), 0)
+        )["total"]
+
+    def pending_counts(self, object_ids) -> dict:
+        """pending() of many objects, {object id: count}."""
+
+        return dict(
+            self.shards().filter(object_id__in=object_ids).order_by().values(
+                "object_id"
+            ).annotate(total=Sum("count")).values_list("object_id", "total")
+        )
+
+    def annotate(self, queryset, name: str):
+        """Annotate a queryset of model with the exact count as name."""
+
+        pending = self.shards().filter(
+            object_id=OuterRef("pk"),
+        ).order_by().values("object_id").annotate(
+            total=Sum("count")
+        ).values("total")
+        return queryset.annotate(**{
+            name: F(self.field) + Coalesce(Subquery(pending), 0),
+        })
+
+    def get(self, object_id: int) -> int:
+        return self.annotate(
+            self.model.objects.filter(pk=object_id), "total"
+        ).values_list("total", flat=True).first() or 0
+
+    def consolidate(self) -> int:
+        """
+        Move the shard counts into model.field and call changed(object
+        ids). Shards are zeroed, not deleted, so writes waiting on
+        their locks still count. Returns the number of objects updated.
+        """
+
+        with transaction.atomic():
+            totals = defaultdict(int)
+            shard_ids = []
+            for pk, object_id, count in self.shards().select_for_update(
+            ).exclude(count=0).values_list("pk", "object_id", "count"):
+                totals[object_id] += count
+                shard_ids.append(pk)
+            increment_counts(self.model.objects.all(), self.field, totals)
+            CounterShard.objects.filter(pk__in=shard_ids).update(count=0)
+            if totals and self.changed is not None:
+                self.changed(list(totals))
+        return len(totals)
+
+
+def article_views_changed(article_ids) -> None:
+    """Refresh what ranks articles by their consolidated views."""
+
+    views_changed(article_ids)
+    transaction.on_commit(
+        lambda: prefix_index.refresh(Article, article_ids)
+    )
+
+
+article_views = ShardedCounter(
+    "article_views", Article, "views_count", changed=article_views_changed
+)
+
+COUNTERS = {
+    counter.name: counter for counter in (article_views,)
+}
+
+
+def consolidate_counters() -> dict:
+    """Consolidate every sharded counter, {name: objects updated}."""
+
+    return {
+        name: counter.consolidate() for name, counter in COUNTERS.items()
+    }
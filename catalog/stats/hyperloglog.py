@@ -0,0 +1,61 @@
+"""
+HyperLogLog sketches of distinct viewers.
+
+A sketch keeps REGISTERS one-byte registers (4 KB) whatever the
+number of viewers. A 64-bit viewer hash picks a register by its
+leading PRECISION bits; the register keeps the longest run of
+leading zeros seen in the remaining bits. The estimate is within
+about 1.6% (1.04 / sqrt(REGISTERS)) and adding a viewer twice
+changes nothing. The register-wise maximum of two sketches is the
+sketch of the union of their viewers, so a knowledge base count is
+a merge of its category sketches.
+"""
+import hashlib
+import math
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+HASH_BITS = 64
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def viewer_hash(viewer: str) -> int:
+    digest = hashlib.blake2b(viewer.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def empty_sketch() -> bytes:
+    return bytes(REGISTERS)
+
+
+def add(registers: bytearray, hashed: int) -> bool:
+    """Add a viewer hash, True if a register changed."""
+
+    index = hashed >> (HASH_BITS - PRECISION)
+    rest = hashed & ((1 << (HASH_BITS - PRECISION)) - 1)
+    rank = HASH_BITS - PRECISION - rest.bit_length() + 1
+    if registers[index] >= rank:
+        return False
+    registers[index] = rank
+    return True
+
+
+def merge(*sketches) -> bytes:
+    """Sketch of the union of the viewers of every sketch."""
+
+    merged = bytearray(REGISTERS)
+    for sketch in sketches:
+        merged = bytearray(map(max, merged, bytes(sketch)))
+    return bytes(merged)
+
+
+def estimate(registers) -> int:
+    """Estimated number of distinct viewers added to a sketch."""
+
+    registers = bytes(registers)
+    total = sum(2.0 ** -rank for rank in registers)
+    raw = ALPHA * REGISTERS * REGISTERS / total
+    zeros = registers.count(0)
+    if raw <= 2.5 * REGISTERS and zeros:
+        return round(REGISTERS * math.log(REGISTERS / zeros))
+    return round(raw)
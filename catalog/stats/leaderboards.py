@@ -0,0 +1,272 @@
+"""
+Precomputed leaderboards for the home page.
+
+Each board keeps its top LEADERBOARD_SIZE objects as LeaderboardEntry
+rows, site-wide and per knowledge base, so the leaders are read with
+one index lookup. When something that scores an object changes, only
+that object's score is recomputed and offered to the boards of its
+scopes: it is updated in place if it is on a board and did not drop,
+is added if the board has room or replaces the last entry if it beats
+it, and a board is rebuilt from its source query only when one of its
+entries drops or leaves. Offers lock the rows of their board, and an
+object is on a board at most once (a unique constraint). Boards are only written on that path and by
+the rebuild_leaderboards command (run on deploy, see build.sh), never
+when read: a board with no entries simply has no leaders.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+
+from catalog.aggregates import SubqueryCount
+from catalog.models import (
+    Article,
+    Category,
+    Employee,
+    KnowledgeBase,
+    LeaderboardEntry,
+)
+
+DEFAULT_SIZE = 10
+
+
+def leaderboard_size() -> int:
+    return getattr(settings, "LEADERBOARD_SIZE", DEFAULT_SIZE)
+
+
+def published(knowledge_base_id):
+    articles = Article.objects.filter(is_published=True)
+    if knowledge_base_id is not None:
+        articles = articles.filter(
+            category__knowledge_base_id=knowledge_base_id
+        )
+    return articles
+
+
+def most_viewed(knowledge_base_id):
+    return published(knowledge_base_id).annotate(
+        score=F("views_count"),
+    ).values_list("pk", "score")
+
+
+def top_rated(knowledge_base_id):
+    return published(knowledge_base_id).filter(
+        rating_count__gt=0,
+    ).annotate(
+        score=F("rating_average"),
+    ).values_list("pk", "score")
+
+
+def active_authors(knowledge_base_id):
+    return published(knowledge_base_id).order_by().values(
+        "author_id"
+    ).annotate(
+        score=Count("pk"),
+    ).values_list("author_id", "score")
+
+
+def largest_categories(knowledge_base_id):
+    categories = Category.objects.all()
+    if knowledge_base_id is not None:
+        categories = categories.filter(knowledge_base_id=knowledge_base_id)
+    return categories.annotate(
+        score=SubqueryCount(
+            Article.objects.filter(is_published=True), "category"
+        ),
+    ).values_list("pk", "score")
+
+
+# rows(knowledge base id): (object id, score) of every candidate,
+# key: the field the object id is.
+BOARDS = {
+    "most_viewed": {"model": Article, "rows": most_viewed, "key": "pk"},
+    "top_rated": {"model": Article, "rows": top_rated, "key": "pk"},
+    "active_authors": {
+        "model": Employee,
+        "rows": active_authors,
+        "key": "author_id",
+    },
+    "largest_categories": {
+        "model": Category,
+        "rows": largest_categories,
+        "key": "pk",
+    },
+}
+
+
+def entries(board: str, knowledge_base_id):
+    return LeaderboardEntry.objects.filter(
+        board=board, knowledge_base_id=knowledge_base_id
+    )
+
+
+def rebuild(board: str, knowledge_base_id) -> None:
+    """Refill a board from its source query."""
+
+    spec = BOARDS[board]
+    with transaction.atomic():
+        entries(board, knowledge_base_id).delete()
+        LeaderboardEntry.objects.bulk_create(
+            LeaderboardEntry(
+                board=board,
+                knowledge_base_id=knowledge_base_id,
+                object_id=object_id,
+                score=score,
+            )
+            for object_id, score in spec["rows"](knowledge_base_id).order_by(
+                "-score", spec["key"]
+            )[:leaderboard_size()]
+        )
+
+
+def offer(board: str, knowledge_base_id, object_ids) -> None:
+    """
+    Recompute the scores of objects and place them on a board. The
+    board's rows are locked first, so concurrent offers to the same
+    board are placed one after the other.
+    """
+
+    spec = BOARDS[board]
+    object_ids = {*object_ids} - {None}
+    if not object_ids:
+        return
+    with transaction.atomic():
+        current = {
+            entry.object_id: entry
+            for entry in entries(board, knowledge_base_id).select_for_update()
+        }
+        scores = dict(spec["rows"](knowledge_base_id).filter(**{
+            f"{spec['key']}__in": object_ids
+        }).order_by())
+        for object_id in object_ids & current.keys():
+            score = scores.get(object_id)
+            if score is None or score < current[object_id].score:
+                rebuild(board, knowledge_base_id)
+                return
+
+        candidates = {
+            object_id: entry.score for object_id, entry in current.items()
+        }
+        candidates.update(scores)
+        ranked = dict(sorted(
+            candidates.items(), key=lambda item: (-item[1], item[0])
+        )[:leaderboard_size()])
+        LeaderboardEntry.objects.filter(pk__in=[
+            entry.pk
+            for object_id, entry in current.items()
+            if object_id not in ranked
+        ]).delete()
+        for object_id, score in ranked.items():
+            entry = current.get(object_id)
+            if entry is None or entry.score != score:
+                LeaderboardEntry.objects.update_or_create(
+                    board=board,
+                    knowledge_base_id=knowledge_base_id,
+                    object_id=object_id,
+                    defaults={"score": score},
+                )
+
+
+def refresh(board: str, object_ids, knowledge_base_ids) -> None:
+    """Offer objects to the site-wide board and to those of the bases."""
+
+    for knowledge_base_id in [None, *({*knowledge_base_ids} - {None})]:
+        offer(board, knowledge_base_id, object_ids)
+
+
+def knowledge_bases_of(category_ids) -> set:
+    return set(Category.objects.filter(
+        pk__in=category_ids,
+    ).values_list("knowledge_base_id", flat=True))
+
+
+def article_changed(article, old=None) -> None:
+    """
+    Refresh the boards an article counts in. old is the article's
+    {"category_id", "author_id"} before the change, if any.
+    """
+
+    old = old or {}
+    categories = {article.category_id, old.get("category_id")} - {None}
+    knowledge_bases = knowledge_bases_of(categories)
+    refresh("most_viewed", [article.pk], knowledge_bases)
+    refresh("top_rated", [article.pk], knowledge_bases)
+    refresh(
+        "active_authors",
+        [article.author_id, old.get("author_id")],
+        knowledge_bases,
+    )
+    refresh("largest_categories", categories, knowledge_bases)
+
+
+def articles_changed(article_ids) -> None:
+    """
+    Refresh boards after a bulk update of articles, with one offer per
+    board and scope for all of them.
+    """
+
+    offers = defaultdict(set)
+    for article_id, author_id, category_id, knowledge_base_id in (
+        Article.objects.filter(pk__in=article_ids).values_list(
+            "pk", "author_id", "category_id", "category__knowledge_base_id"
+        )
+    ):
+        for scope in {None, knowledge_base_id}:
+            offers["most_viewed", scope].add(article_id)
+            offers["top_rated", scope].add(article_id)
+            offers["active_authors", scope].add(author_id)
+            offers["largest_categories", scope].add(category_id)
+    for (board, knowledge_base_id), object_ids in offers.items():
+        offer(board, knowledge_base_id, object_ids)
+
+
+def views_changed(article_ids) -> None:
+    offers = defaultdict(set)
+    for article_id, knowledge_base_id in Article.objects.filter(
+        pk__in=article_ids,
+    ).values_list("pk", "category__knowledge_base_id"):
+        for scope in {None, knowledge_base_id}:
+            offers[scope].add(article_id)
+    for knowledge_base_id, object_ids in offers.items():
+        offer("most_viewed", knowledge_base_id, object_ids)
+
+
+def rating_changed(article_id) -> None:
+    refresh(
+        "top_rated",
+        [article_id],
+        Article.objects.filter(pk=article_id).values_list(
+            "category__knowledge_base_id", flat=True
+        ),
+    )
+
+
+def rebuild_leaderboards(knowledge_base_ids=None) -> int:
+    """Rebuild every board, or the boards of some bases; returns count."""
+
+    if knowledge_base_ids is None:
+        scopes = [None, *KnowledgeBase.objects.values_list("pk", flat=True)]
+    else:
+        scopes = [*({*knowledge_base_ids} - {None})]
+    for knowledge_base_id in scopes:
+        for board in BOARDS:
+            rebuild(board, knowledge_base_id)
+    return len(scopes) * len(BOARDS)
+
+
+def leaders(board: str, knowledge_base=None, limit: int = 1) -> list:
+    """Top objects of a board, best first."""
+
+    knowledge_base_id = getattr(knowledge_base, "pk", knowledge_base)
+    ids = list(entries(board, knowledge_base_id).order_by(
+        "-score", "object_id"
+    ).values_list("object_id", flat=True)[:limit])
+    if not ids:
+        return []
+    objects = BOARDS[board]["model"].objects.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def leader(board: str, knowledge_base=None):
+    return next(iter(leaders(board, knowledge_base)), None)
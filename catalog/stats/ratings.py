@@ -0,0 +1,83 @@
+"""
+Stored rating aggregates of articles.
+
+Article keeps the sum and number of its ratings, their average and a
+count per rating value, so pages read an article's rating instead of
+averaging the Rating join. Saving or deleting a Rating adds to them in
+place with one UPDATE, in the transaction of the change: a re-rate
+subtracts the old value and adds the new one. Rating.objects.
+update_or_create locks the rating row before the old value is read,
+so concurrent re-rates of one article do not count a value twice.
+"""
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from catalog.aggregates import SubqueryCount, SubquerySum
+from catalog.models import Article, Rating
+
+VALUES = range(1, 6)
+
+
+def histogram_field(value: int) -> str:
+    return f"rating_{value}_count"
+
+
+def rating_changes(old, new):
+    """Per article deltas of a rating moving from old to new."""
+
+    changes = {}
+    for rating, sign in ((old, -1), (new, 1)):
+        if rating is None:
+            continue
+        article_id, value = rating
+        delta = changes.setdefault(article_id, {})
+        delta["rating_sum"] = delta.get("rating_sum", 0) + sign * value
+        delta["rating_count"] = delta.get("rating_count", 0) + sign
+        field = histogram_field(value)
+        delta[field] = delta.get(field, 0) + sign
+    return changes
+
+
+def add_ratings(article_id, **deltas) -> None:
+    """Add deltas to an article's rating totals and recompute the average."""
+
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    total = F("rating_sum") + deltas.get("rating_sum", 0)
+    count = F("rating_count") + deltas.get("rating_count", 0)
+    Article.objects.filter(pk=article_id).update(
+        rating_average=Coalesce(
+            Cast(total, FloatField()) / NullIf(count, 0), Value(0.0)
+        ),
+        **{field: F(field) + delta for field, delta in deltas.items()},
+    )
+
+
+def rating_moved(old, new) -> None:
+    """old, new: (article id, value) of a rating before and after."""
+
+    for article_id, deltas in rating_changes(old, new).items():
+        add_ratings(article_id, **deltas)
+
+
+def recount_ratings(articles=None, rating_model=Rating) -> None:
+    """Recount the rating totals of a queryset of articles, or all."""
+
+    if articles is None:
+        articles = Article.objects.all()
+    ratings = rating_model.objects.all()
+    articles.update(
+        rating_sum=SubquerySum(ratings, "article", "rating"),
+        rating_count=SubqueryCount(ratings, "article"),
+        **{
+            histogram_field(value): SubqueryCount(
+                ratings.filter(rating=value), "article"
+            )
+            for value in VALUES
+        },
+    )
+    articles.update(rating_average=Coalesce(
+        Cast(F("rating_sum"), FloatField()) / NullIf(F("rating_count"), 0),
+        Value(0.0),
+    ))
@@ -0,0 +1,180 @@
+"""
+Time-bucketed article activity for analytics.
+
+Views (when the view buffer is flushed), new ratings and new
+comments are added to the ArticleActivity row of the article and the
+current hour. As rows age they are compacted: hourly rows older than
+ACTIVITY_HOURLY_RETENTION_DAYS into daily rows, daily rows older than
+ACTIVITY_DAILY_RETENTION_DAYS into monthly rows, so the table keeps a
+bounded number of rows per article and charts read pre-aggregated
+rows instead of the raw tables.
+
+Buckets start at local time (TIME_ZONE) boundaries.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from catalog.models import Article, ArticleActivity
+from catalog.stats.counters import increment_counts
+
+FIELDS = ("views", "ratings", "comments")
+DEFAULT_HOURLY_RETENTION_DAYS = 7
+DEFAULT_DAILY_RETENTION_DAYS = 90
+COARSER = {
+    ArticleActivity.HOUR: ArticleActivity.DAY,
+    ArticleActivity.DAY: ArticleActivity.MONTH,
+}
+
+
+def retention(period: str) -> timedelta:
+    if period == ArticleActivity.HOUR:
+        days = getattr(
+            settings,
+            "ACTIVITY_HOURLY_RETENTION_DAYS",
+            DEFAULT_HOURLY_RETENTION_DAYS,
+        )
+    else:
+        days = getattr(
+            settings,
+            "ACTIVITY_DAILY_RETENTION_DAYS",
+            DEFAULT_DAILY_RETENTION_DAYS,
+        )
+    return timedelta(days=days)
+
+
+def bucket_start(when, period: str):
+    """Start of the hour, day or month containing when."""
+
+    start = timezone.localtime(when).replace(
+        minute=0, second=0, microsecond=0
+    )
+    if period != ArticleActivity.HOUR:
+        start = start.replace(hour=0)
+    if period == ArticleActivity.MONTH:
+        start = start.replace(day=1)
+    return start
+
+
+def add_to_buckets(period: str, counts: dict) -> None:
+    """Add {(article id, start): Counter of FIELDS} to period rows."""
+
+    counts = {key: amounts for key, amounts in counts.items() if amounts}
+    if not counts:
+        return
+    ArticleActivity.objects.bulk_create(
+        [
+            ArticleActivity(article_id=article_id, period=period, start=start)
+            for article_id, start in counts
+        ],
+        ignore_conflicts=True,
+    )
+
+    rows = {}
+    for pk, article_id, start in ArticleActivity.objects.filter(
+        period=period,
+        article_id__in={article_id for article_id, _ in counts},
+        start__in={start for _, start in counts},
+    ).values_list("pk", "article_id", "start"):
+        if (article_id, start) in counts:
+            rows[pk] = counts[article_id, start]
+    for field in FIELDS:
+        increment_counts(ArticleActivity.objects.all(), field, {
+            pk: amounts[field] for pk, amounts in rows.items()
+        })
+
+
+def add_activity(counts: dict, when=None) -> None:
+    """
+    Add {article id: Counter of FIELDS} to the hour of when (now).
+    Articles deleted meanwhile are skipped.
+    """
+
+    start = bucket_start(when or timezone.now(), ArticleActivity.HOUR)
+    existing = Article.objects.filter(
+        pk__in=list(counts)
+    ).values_list("pk", flat=True)
+    with transaction.atomic():
+        add_to_buckets(ArticleActivity.HOUR, {
+            (pk, start): counts[pk] for pk in existing
+        })
+
+
+def compact(period: str, now=None) -> int:
+    """
+    Merge rows of period older than its retention into the coarser
+    period. Returns the number of rows merged.
+    """
+
+    target = COARSER[period]
+    cutoff = bucket_start((now or timezone.now()) - retention(period), target)
+    with transaction.atomic():
+        rows = ArticleActivity.objects.select_for_update().filter(
+            period=period,
+            start__lt=cutoff,
+        )
+        merged = defaultdict(Counter)
+        total = 0
+        for article_id, start, *amounts in rows.values_list(
+            "article_id", "start", *FIELDS
+        ):
+            merged[article_id, bucket_start(start, target)].update(
+                dict(zip(FIELDS, amounts))
+            )
+            total += 1
+        add_to_buckets(target, merged)
+        rows.delete()
+    return total
+
+
+def compact_activity(now=None) -> dict:
+    """Compact hourly rows into days, then daily rows into months."""
+
+    return {
+        period: compact(period, now)
+        for period in (ArticleActivity.HOUR, ArticleActivity.DAY)
+    }
+
+
+def activity_series(articles, period: str, since=None) -> list[dict]:
+    """
+    Activity of an Article queryset per period bucket, oldest first:
+    [{"start", "views", "ratings", "comments"}, ...]. Rows already
+    compacted to a coarser period stay in their own bucket.
+    """
+
+    rows = ArticleActivity.objects.filter(article__in=articles)
+    if since is not None:
+        rows = rows.filter(start__gte=bucket_start(since, period))
+
+    series = defaultdict(Counter)
+    for start, *amounts in rows.values("start").annotate(
+        *(Sum(field) for field in FIELDS)
+    ).values_list("start", *(f"{field}__sum" for field in FIELDS)):
+        series[bucket_start(start, period)].update(
+            dict(zip(FIELDS, amounts))
+        )
+    return [
+        {"start": start, **{field: series[start][field] for field in FIELDS}}
+        for start in sorted(series)
+    ]
+
+
+def author_activity(employee, period=ArticleActivity.DAY, since=None):
+    return activity_series(
+        Article.objects.filter(author=employee), period, since
+    )
+
+
+def knowledge_base_activity(
+    knowledge_base, period=ArticleActivity.DAY, since=None
+):
+    return activity_series(
+        Article.objects.filter(category__knowledge_base=knowledge_base),
+        period,
+        since,
+    )
@@ -0,0 +1,173 @@
+"""
+Materialized site statistics.
+
+The totals shown on the home and knowledge base list pages live in
+the single SiteStatistics row. Signals add to its columns in place,
+in the transaction of every create, delete and publish change of the
+counted objects, so reading the totals is one primary key lookup.
+The row is (re)built from the full aggregates when it is missing and
+by the reconcile_site_statistics command.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from catalog.models import (
+    Article,
+    Category,
+    Comment,
+    Employee,
+    KnowledgeBase,
+    SiteStatistics,
+)
+
+ROW_ID = 1
+FIELDS = (
+    "total_knowledge_bases",
+    "total_categories",
+    "total_articles",
+    "total_comments",
+    "total_authors",
+    "total_employees",
+)
+
+
+def count_authors() -> int:
+    return Article.objects.filter(is_published=True).order_by().values(
+        "author"
+    ).distinct().count()
+
+
+def compute_site_statistics() -> dict[str, int]:
+    """
+    The totals from full-table counts; each is counted on its own
+    table, never over a join that would repeat rows.
+    """
+
+    published = Article.objects.filter(is_published=True)
+    return {
+        "total_knowledge_bases": KnowledgeBase.objects.count(),
+        "total_categories": Category.objects.count(),
+        "total_articles": published.count(),
+        "total_comments": Comment.objects.count(),
+        "total_authors": count_authors(),
+        "total_employees": Employee.objects.count(),
+    }
+
+
+def reconcile_site_statistics() -> dict[str, int]:
+    """Rewrite the row from the full aggregates."""
+
+    totals = compute_site_statistics()
+    SiteStatistics.objects.update_or_create(
+        pk=ROW_ID,
+        defaults={**totals, "reconciled_at": timezone.now()},
+    )
+    return totals
+
+
+def site_statistics() -> dict[str, int]:
+    row = SiteStatistics.objects.filter(pk=ROW_ID).values(*FIELDS).first()
+    if row is None:
+        return reconcile_site_statistics()
+    return row
+
+
+def adjust(**deltas) -> None:
+    """Add deltas to totals; a missing row is rebuilt when read."""
+
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        SiteStatistics.objects.filter(pk=ROW_ID).update(**{
+            field: F(field) + delta for field, delta in deltas.items()
+        })
+
+
+def other_published_authors(author_ids, article_pk) -> set:
+    """Those of author_ids with a published article besides article_pk."""
+
+    return set(Article.objects.filter(
+        author_id__in=author_ids,
+        is_published=True,
+    ).exclude(pk=article_pk).values_list("author_id", flat=True).distinct())
+
+
+def adjust_article(article, was_published: bool, old_author,
+                   is_published: bool) -> None:
+    """Count an article leaving its old state for its current one."""
+
+    if not was_published and not is_published:
+        return
+    others = other_published_authors(
+        {old_author, article.author_id}, article.pk
+    )
+    before = others | ({old_author} if was_published else set())
+    after = others | ({article.author_id} if is_published else set())
+    adjust(
+        total_articles=is_published - was_published,
+        total_authors=len(after) - len(before),
+    )
+
+
+def article_saved(article, created: bool) -> None:
+    if created:
+        adjust_article(article, False, None, article.is_published)
+    else:
+        adjust_article(
+            article,
+            article.loaded_value("is_published", False),
+            article.loaded_value("author_id", article.author_id),
+            article.is_published,
+        )
+
+
+def article_deleted(article, origin=None) -> None:
+    """
+    Cascades and queryset deletes remove the author's other articles
+    before any post_delete, so an author is uncounted once per delete
+    (origin, the object or queryset deleted), if none of their
+    published articles is left.
+    """
+
+    if not article.is_published:
+        return
+    adjust(total_articles=-1)
+    checked = getattr(origin, "_uncounted_authors", None)
+    if checked is None:
+        checked = set()
+        if origin is not None:
+            origin._uncounted_authors = checked
+    if article.author_id in checked:
+        return
+    checked.add(article.author_id)
+    if not Article.objects.filter(
+        author_id=article.author_id, is_published=True,
+    ).exists():
+        adjust(total_authors=-1)
+
+
+def articles_published(article_ids, was_published) -> None:
+    """
+    Count a bulk update of the publish state of article_ids, after
+    the UPDATE; was_published holds those published before it.
+    """
+
+    changed = {
+        pk: author_id
+        for pk, author_id, is_published in Article.objects.filter(
+            pk__in=article_ids,
+        ).values_list("pk", "author_id", "is_published")
+        if is_published != (pk in was_published)
+    }
+    if not changed:
+        return
+    gained = {pk for pk in changed if pk not in was_published}
+    others = set(Article.objects.filter(
+        author_id__in=set(changed.values()),
+        is_published=True,
+    ).exclude(pk__in=changed).values_list("author_id", flat=True).distinct())
+    before = others | {changed[pk] for pk in changed if pk not in gained}
+    after = others | {changed[pk] for pk in gained}
+    adjust(
+        total_articles=2 * len(gained) - len(changed),
+        total_authors=len(after) - len(before),
+    )
@@ -0,0 +1,188 @@
+"""
+Stored totals of categories and knowledge bases.
+
+Category and KnowledgeBase carry the number of published articles,
+of distinct authors of published articles and of comments on
+published articles (and a knowledge base its number of categories),
+so list pages read columns instead of counting over joins.
+
+Signals add to them in place, in the transaction of the change, when
+categories, articles and comments are created or deleted and when an
+article is published, unpublished or moved to another author or
+category. Deletions and bulk changes (the admin publish actions, a
+category moving to another knowledge base) recount the affected rows
+with correlated subqueries; recount_catalog_totals recounts everything.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import F
+
+from catalog.aggregates import SubqueryCount
+from catalog.models import Article, Category, Comment, KnowledgeBase
+
+
+def update_totals(categories, knowledge_bases, article_model=Article,
+                  comment_model=Comment) -> None:
+    """Recount the totals of querysets of categories and bases."""
+
+    articles = article_model.objects.filter(is_published=True)
+    comments = comment_model.objects.filter(article__is_published=True)
+    categories.update(
+        published_articles_count=SubqueryCount(articles, "category"),
+        authors_count=SubqueryCount(
+            articles, "category", "author", distinct=True
+        ),
+        comments_count=SubqueryCount(comments, "article__category"),
+    )
+    knowledge_bases.update(
+        categories_count=SubqueryCount(
+            categories.model.objects.all(), "knowledge_base"
+        ),
+        published_articles_count=SubqueryCount(
+            articles, "category__knowledge_base"
+        ),
+        authors_count=SubqueryCount(
+            articles, "category__knowledge_base", "author", distinct=True
+        ),
+        comments_count=SubqueryCount(
+            comments, "article__category__knowledge_base"
+        ),
+    )
+
+
+def recount(category_ids=(), knowledge_base_ids=()) -> None:
+    """Recount categories and their bases, and more bases."""
+
+    category_ids = set(category_ids) - {None}
+    knowledge_base_ids = (set(knowledge_base_ids) | set(
+        Category.objects.filter(pk__in=category_ids).values_list(
+            "knowledge_base_id", flat=True
+        )
+    )) - {None}
+    update_totals(
+        Category.objects.filter(pk__in=category_ids),
+        KnowledgeBase.objects.filter(pk__in=knowledge_base_ids),
+    )
+
+
+def articles_changed(article_ids) -> None:
+    """Recount the categories of articles changed by a bulk update."""
+
+    recount(Article.objects.filter(pk__in=article_ids).values_list(
+        "category_id", flat=True
+    ))
+
+
+def recount_catalog_totals() -> None:
+    update_totals(Category.objects.all(), KnowledgeBase.objects.all())
+
+
+def adjust(category_id, knowledge_base_id=None, **deltas) -> None:
+    """Add deltas to a category and its knowledge base."""
+
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or category_id is None:
+        return
+    if knowledge_base_id is None:
+        knowledge_base_id = Category.objects.filter(
+            pk=category_id
+        ).values_list("knowledge_base_id", flat=True).first()
+    expressions = {
+        field: F(field) + delta for field, delta in deltas.items()
+    }
+    Category.objects.filter(pk=category_id).update(**expressions)
+    KnowledgeBase.objects.filter(pk=knowledge_base_id).update(
+        **expressions
+    )
+
+
+def other_articles(article, author_id, category_id, knowledge_base_id):
+    """Other published articles of an author in a category and base."""
+
+    others = Article.objects.filter(
+        author_id=author_id, is_published=True,
+    ).exclude(pk=article.pk)
+    return (
+        others.filter(category_id=category_id).exists(),
+        others.filter(category__knowledge_base_id=knowledge_base_id).exists(),
+    )
+
+
+def add_deltas(model, totals: dict) -> None:
+    """Add {pk: {field: delta}} to rows of model, skipping zeros."""
+
+    for pk, deltas in totals.items():
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if deltas and pk is not None:
+            model.objects.filter(pk=pk).update(**{
+                field: F(field) + delta for field, delta in deltas.items()
+            })
+
+
+def article_moved(article, was_published: bool, old_category_id,
+                  old_author_id) -> None:
+    """
+    Count an article leaving (was_published, old category, old author)
+    for its current state. Leaving and entering are summed first, so
+    each row gets its net change once and a counter never dips below
+    its real value on the way.
+    """
+
+    if not was_published and not article.is_published:
+        return
+    comments = article.comments.count()
+    categories = defaultdict(Counter)
+    knowledge_bases = defaultdict(Counter)
+    for published, author_id, category_id, sign in (
+        (was_published, old_author_id, old_category_id, -1),
+        (article.is_published, article.author_id, article.category_id, 1),
+    ):
+        if not published:
+            continue
+        knowledge_base_id = Category.objects.filter(
+            pk=category_id
+        ).values_list("knowledge_base_id", flat=True).first()
+        in_category, in_knowledge_base = other_articles(
+            article, author_id, category_id, knowledge_base_id
+        )
+        for totals, pk, others in (
+            (categories, category_id, in_category),
+            (knowledge_bases, knowledge_base_id, in_knowledge_base),
+        ):
+            totals[pk]["published_articles_count"] += sign
+            totals[pk]["comments_count"] += sign * comments
+            totals[pk]["authors_count"] += sign * (not others)
+    add_deltas(Category, categories)
+    add_deltas(KnowledgeBase, knowledge_bases)
+
+
+def article_saved(article, created: bool) -> None:
+    if created:
+        article_moved(article, False, None, None)
+    elif any(
+        article.loaded_value(field) != getattr(article, field)
+        for field in ("is_published", "category_id", "author_id")
+    ):
+        article_moved(
+            article,
+            article.loaded_value("is_published", False),
+            article.loaded_value("category_id", article.category_id),
+            article.loaded_value("author_id", article.author_id),
+        )
+
+
+def article_deleted(article) -> None:
+    """
+    Recount rather than subtract: a bulk delete removes an author's
+    other articles before the first signal could see them.
+    """
+
+    if article.is_published:
+        recount([article.category_id])
+
+
+def comment_changed(comment, delta: int) -> None:
+    category_id = Article.objects.filter(
+        pk=comment.article_id, is_published=True,
+    ).values_list("category_id", flat=True).first()
+    adjust(category_id, comments_count=delta)
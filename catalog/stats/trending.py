@@ -0,0 +1,153 @@
+"""
+Trending articles.
+
+The trending score of an article is its activity with exponential
+time decay, sum(weight * exp(-rate * (now - t))) over its views,
+ratings and comments, with rate = ln 2 / TRENDING_HALF_LIFE_HOURS.
+
+Dividing every score by the same exp(-rate * (now - EPOCH)) does not
+change the ranking, so the stored score is
+
+    log(sum(weight * exp(rate * (t - EPOCH))))
+
+which never decays: an event only adds to its own article's score,
+in place (score = logaddexp(score, log(weight) + rate * (t - EPOCH))),
+and no periodic rescoring is needed. Logarithms keep the growing
+exponentials in float range. The current decayed score is
+exp(score - rate * (now - EPOCH)).
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from catalog.models import Article, ArticleTrend
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+DEFAULT_HALF_LIFE_HOURS = 24
+DEFAULT_WEIGHTS = {"views": 1, "ratings": 5, "comments": 3}
+DEFAULT_LIMIT = 10
+# exp() below this underflows to an error on some databases.
+MIN_EXPONENT = -700.0
+
+
+def decay_rate() -> float:
+    """Decay per second."""
+
+    hours = getattr(
+        settings, "TRENDING_HALF_LIFE_HOURS", DEFAULT_HALF_LIFE_HOURS
+    )
+    return math.log(2) / (hours * 3600)
+
+
+def weights() -> dict:
+    return {
+        **DEFAULT_WEIGHTS,
+        **getattr(settings, "TRENDING_WEIGHTS", {}),
+    }
+
+
+def log_weight(weight: float, when) -> float:
+    """Stored score of a single event of weight at when."""
+
+    return math.log(weight) + decay_rate() * (
+        when - EPOCH
+    ).total_seconds()
+
+
+def current_score(score, now=None) -> float:
+    """Decayed score at now of a stored score."""
+
+    if score is None:
+        return 0.0
+    now = now or timezone.now()
+    return math.exp(score - decay_rate() * (now - EPOCH).total_seconds())
+
+
+def add_trending(counts: dict, when=None) -> None:
+    """
+    Add {article id: Counter of views, ratings and comments} at when
+    (now) to the trending scores, in one UPDATE.
+    """
+
+    when = when or timezone.now()
+    event_weights = weights()
+    added = {}
+    for article_id, amounts in counts.items():
+        weight = sum(
+            event_weights.get(field, 0) * amount
+            for field, amount in amounts.items()
+        )
+        if weight > 0:
+            added[article_id] = log_weight(weight, when)
+    if not added:
+        return
+
+    ArticleTrend.objects.bulk_create(
+        [
+            ArticleTrend(
+                article_id=pk,
+                knowledge_base_id=knowledge_base_id,
+                is_published=is_published,
+            )
+            for pk, knowledge_base_id, is_published in Article.objects.filter(
+                pk__in=list(added),
+            ).values_list("pk", "category__knowledge_base_id", "is_published")
+        ],
+        ignore_conflicts=True,
+    )
+
+    event = Case(
+        *(When(pk=pk, then=Value(score)) for pk, score in added.items()),
+        output_field=FloatField(),
+    )
+    ArticleTrend.objects.filter(pk__in=list(added)).update(score=Case(
+        When(score__isnull=True, then=event),
+        default=Greatest(F("score"), event) + Ln(
+            1.0 + Exp(Greatest(
+                -Abs(F("score") - event),
+                Value(MIN_EXPONENT),
+            ))
+        ),
+        output_field=FloatField(),
+    ))
+
+
+def sync_trends(articles) -> None:
+    """Copy knowledge base and publish state of articles to their trends."""
+
+    source = Article.objects.filter(pk=OuterRef("article_id"))
+    ArticleTrend.objects.filter(article__in=articles).update(
+        is_published=Subquery(source.values("is_published")[:1]),
+        knowledge_base_id=Subquery(
+            source.values("category__knowledge_base_id")[:1]
+        ),
+    )
+
+
+def trending_articles(knowledge_base=None, limit=DEFAULT_LIMIT) -> list:
+    """Published articles with the highest trending score, best first."""
+
+    trends = ArticleTrend.objects.filter(
+        is_published=True,
+        score__isnull=False,
+    )
+    if knowledge_base is not None:
+        trends = trends.filter(knowledge_base=knowledge_base)
+    return [
+        trend.article
+        for trend in trends.select_related("article").order_by(
+            "-score"
+        )[:limit]
+    ]
@@ -0,0 +1,78 @@
+"""
+Unique viewers of articles, categories and knowledge bases.
+
+Buffered views carry the hash of their viewer; when the buffer is
+flushed, the hashes are added to the HyperLogLog sketch of every
+viewed article and of its category, each row locked and written
+once per flush.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from catalog.models import (
+    Article,
+    ArticleViewers,
+    CategoryViewers,
+)
+from catalog.stats import hyperloglog
+
+
+def employee_viewer(employee_id: int) -> int:
+    return hyperloglog.viewer_hash(f"employee:{employee_id}")
+
+
+def add_to_sketches(model, field: str, viewers: dict) -> None:
+    """Add viewer hashes {key: hashes} to the sketch rows of model."""
+
+    if not viewers:
+        return
+    model.objects.bulk_create(
+        [
+            model(**{
+                field: key,
+                "registers": hyperloglog.empty_sketch(),
+            })
+            for key in viewers
+        ],
+        ignore_conflicts=True,
+    )
+
+    changed = []
+    for sketch in model.objects.select_for_update().filter(
+        pk__in=list(viewers)
+    ):
+        registers = bytearray(sketch.registers)
+        updated = False
+        for hashed in viewers[sketch.pk]:
+            updated |= hyperloglog.add(registers, hashed)
+        if updated:
+            sketch.registers = bytes(registers)
+            sketch.estimate = hyperloglog.estimate(registers)
+            changed.append(sketch)
+    model.objects.bulk_update(changed, ["registers", "estimate"])
+
+
+def record_viewers(viewers: dict) -> None:
+    """Add {article id: viewer hashes} to article and category sketches."""
+
+    categories = defaultdict(set)
+    articles = {}
+    for pk, category_id in Article.objects.filter(
+        pk__in=list(viewers)
+    ).values_list("pk", "category_id"):
+        articles[pk] = viewers[pk]
+        categories[category_id].update(viewers[pk])
+
+    with transaction.atomic():
+        add_to_sketches(ArticleViewers, "article_id", articles)
+        add_to_sketches(CategoryViewers, "category_id", categories)
+
+
+def knowledge_base_viewers(knowledge_base) -> int:
+    """Distinct viewers of any article of a knowledge base."""
+
+    sketches = CategoryViewers.objects.filter(
+        category__knowledge_base=knowledge_base,
+    ).values_list("registers", flat=True)
+    return hyperloglog.estimate(hyperloglog.merge(*sketches))
@@ -12,3 +12,14 @@ def query_transform(request, **kwargs):
         else:
             updated.pop(key, 0)
     return updated.urlencode()
+
+
+@register.simple_tag()
+def query_toggle(request, key, value):
+    updated = request.GET.copy()
+    if updated.get(key) == str(value):
+        updated.pop(key, 0)
+    else:
+        updated[key] = value
+    updated.pop("page", 0)
+    return updated.urlencode()
@@ -222,6 +222,7 @@ class AdminArticleTests(TestCase):
             commentator=self.admin_user,
             commentary="Great city"
         )
+        self.art.refresh_from_db()
 
         self.admin = ArticleAdmin(Article, site)
 
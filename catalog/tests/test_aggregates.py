@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.aggregates import SubqueryAvg, SubqueryCount, SubquerySum
+from catalog.models import (
+    KnowledgeBase,
+    Category,
+    Article,
+    Comment,
+    Rating,
+)
+
+
+class SubqueryAggregateTests(TestCase):
+    """Test the correlated subquery aggregates."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.users = [
+            get_user_model().objects.create_user(
+                username=f"employee{number}",
+                password="test123",
+                position="Employee"
+            )
+            for number in range(3)
+        ]
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Cars", created_by=self.users[0]
+        )
+        self.category = Category.objects.create(
+            topic="Germany",
+            created_by=self.users[0],
+            knowledge_base=knowledge_base,
+        )
+        self.bmw, self.audi = [
+            Article.objects.create(
+                title=title,
+                author=self.users[0],
+                category=self.category,
+                content=f"This is a article about {title}.",
+                is_published=True,
+            )
+            for title in ("BMW", "AUDI")
+        ]
+        for user, value in zip(self.users, (5, 4, 3)):
+            Rating.objects.create(
+                article=self.bmw, employee=user, rating=value
+            )
+            Comment.objects.create(
+                article=self.bmw, commentator=user, commentary="Helpful!"
+            )
+
+    def test_annotations_do_not_multiply(self):
+        ratings = Rating.objects.all()
+        articles = Article.objects.annotate(
+            comments_total=SubqueryCount(Comment.objects.all(), "article"),
+            ratings_total=SubqueryCount(ratings, "article"),
+            average=SubqueryAvg(ratings, "article", "rating"),
+            total=SubquerySum(ratings, "article", "rating"),
+            raters=SubqueryCount(
+                ratings, "article", "employee", distinct=True
+            ),
+        ).order_by("title")
+        self.assertEqual(
+            list(articles.values_list(
+                "title", "comments_total", "ratings_total", "average",
+                "total", "raters",
+            )),
+            [("AUDI", 0, 0, None, 0, 0), ("BMW", 3, 3, 4.0, 12, 3)],
+        )
+
+    def test_through_a_path_and_filtered(self):
+        categories = Category.objects.annotate(
+            high_ratings=SubqueryCount(
+                Rating.objects.filter(rating__gte=4), "article__category"
+            ),
+        )
+        self.assertEqual(categories.get().high_ratings, 2)
+
+    def test_article_list_comment_counts(self):
+        self.client.force_login(self.users[0])
+        response = self.client.get(reverse("catalog:article-list"))
+        self.assertEqual(
+            {
+                article.title: article.comment_count
+                for article in response.context["article_list"]
+            },
+            {"BMW": 3, "AUDI": 0},
+        )
@@ -0,0 +1,114 @@
+import pickle
+import weakref
+
+from django.contrib.auth import get_user_model
+from django.db.models import Value
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.loaders import RequestMemoMiddleware
+from catalog.models import KnowledgeBase, Category, Article, Comment
+from catalog.stats.counters import article_views
+
+
+class BatchedPropertyTests(TestCase):
+    """Test the batched lazy loading of per-row values."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Cars", created_by=self.user
+        )
+        self.category = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=knowledge_base,
+        )
+        self.articles = [
+            Article.objects.create(
+                title=title,
+                author=self.user,
+                category=self.category,
+                content=f"This is a article about {title}.",
+                is_published=True,
+            )
+            for title in ("BMW", "AUDI", "Opel")
+        ]
+        for _ in range(2):
+            Comment.objects.create(
+                article=self.articles[0],
+                commentator=self.user,
+                commentary="Helpful!",
+            )
+
+    def test_one_query_for_all_siblings(self):
+        articles = list(Article.objects.order_by("pk"))
+        with self.assertNumQueries(1):
+            counts = [article.comment_count for article in articles]
+        self.assertEqual(counts, [2, 0, 0])
+
+        with self.assertNumQueries(0):
+            articles[1].comment_count
+
+    def test_siblings_are_not_kept_alive(self):
+        articles = list(Article.objects.order_by("pk"))
+        sibling = weakref.ref(articles[1])
+        first = articles[0]
+        del articles
+        self.assertIsNone(sibling())
+
+        copy = pickle.loads(pickle.dumps(first))
+        with self.assertNumQueries(1):
+            self.assertEqual(copy.comment_count, 2)
+
+    def test_instance_fetched_alone(self):
+        article = Article.objects.get(pk=self.articles[0].pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(article.comment_count, 2)
+        self.assertEqual(Article(title="New").comment_count, 0)
+
+    def test_annotation_is_not_loaded(self):
+        article = Article.objects.annotate(comment_count=Value(7)).first()
+        with self.assertNumQueries(0):
+            self.assertEqual(article.comment_count, 7)
+
+    def test_request_memo(self):
+        def get_response(request):
+            first = Article.objects.get(pk=self.articles[0].pk)
+            first.comment_count
+            again = list(Article.objects.all())
+            with self.assertNumQueries(1):
+                counts = {
+                    article.pk: article.comment_count for article in again
+                }
+            self.assertEqual(counts[first.pk], 2)
+            return counts
+
+        RequestMemoMiddleware(get_response)(None)
+
+        # Outside a request every fetch loads its own values.
+        with self.assertNumQueries(4):
+            for _ in range(2):
+                Article.objects.get(pk=self.articles[0].pk).comment_count
+
+    def test_views_total_adds_pending_shards(self):
+        article_views.add({self.articles[0].pk: 3})
+        totals = [
+            article.views_total
+            for article in Article.objects.order_by("pk")
+        ]
+        self.assertEqual(totals, [3, 0, 0])
+
+    def test_articles_by_category_page(self):
+        article_views.add({article.pk: 3 for article in self.articles})
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("catalog:c-articles", args=[self.category.pk])
+        )
+        self.assertContains(
+            response, '<span class="h6">3</span>', html=True
+        )
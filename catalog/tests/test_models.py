@@ -183,4 +183,5 @@ class ModelsTests(TestCase):
             rating=rating_2,
         )
 
+        employee.refresh_from_db()
         self.assertEqual(employee.author_rating, 4)
@@ -0,0 +1,1539 @@
+import tempfile
+import threading
+from collections import Counter
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog.models import (
+    KnowledgeBase,
+    Category,
+    Article,
+    RelatedPosting,
+    RelatedTerm,
+    SavedSearch,
+    SavedSearchMatch,
+)
+from catalog.search import get_search_backend
+from catalog.search.backends import SQLiteSearchBackend
+from catalog.search.autocomplete import PrefixIndex, prefix_index
+from catalog.search.cache import (
+    NO_TERMS,
+    VERSION_BUCKETS,
+    article_terms,
+    bucket,
+    cached_search,
+    normalize_query,
+    query_terms,
+    version_key,
+)
+from catalog.search.duplicates import (
+    find_duplicates,
+    minhash,
+    pack,
+    similarity,
+    unpack,
+)
+from catalog.search.facets import FACETS, facet_counts, filter_facets
+from catalog.search.inverted import (
+    BM25SearchBackend,
+    Segment,
+    merge_segments,
+    write_segment,
+)
+from catalog.search.percolator import matches, query_anchor
+from catalog.search.related import TfidfVectors, rebuild_related_articles
+from catalog.search.semantic import (
+    SemanticIndex,
+    embed,
+    features,
+    get_semantic_index,
+)
+from catalog.search.sharding import rebuild_index
+from catalog.search.trigram import (
+    TrigramIndex,
+    get_trigram_index,
+    reset_trigram_indexes,
+    trigrams,
+)
+from catalog.search.unified import fan_out, unified_search
+from catalog.signals import update_articles
+from catalog.stats.counters import article_views
+from catalog.views import SavedSearchListView
+
+ARTICLE_LIST_URL = reverse("catalog:article-list")
+KNOWLEDGE_BASE_LIST_URL = reverse("catalog:knowledge-list")
+CATEGORY_LIST_URL = reverse("catalog:category-list")
+EMPLOYEE_LIST_URL = reverse("catalog:employee-list")
+AUTOCOMPLETE_URL = reverse("catalog:autocomplete")
+SEARCH_URL = reverse("catalog:search")
+
+
+class SQLiteSearchBackendTests(TestCase):
+    """Test the SQLite FTS5 article search backend."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+
+        self.knowledge_base = KnowledgeBase.objects.create(
+            title="Cars",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=self.knowledge_base
+        )
+        self.bmw = Article.objects.create(
+            title="BMW",
+            author=self.user,
+            category=self.category,
+            content="Bavarian engines and rear wheel drive.",
+        )
+        self.audi = Article.objects.create(
+            title="AUDI",
+            author=self.user,
+            category=self.category,
+            content="Quattro drive. Not a BMW at all.",
+        )
+        self.backend = get_search_backend()
+
+    def test_configured_backend(self):
+        self.assertIsInstance(self.backend, SQLiteSearchBackend)
+
+    def test_search_title_ranked_above_content(self):
+        self.assertEqual(
+            self.backend.search("bmw"),
+            [self.bmw.pk, self.audi.pk]
+        )
+
+    def test_search_content_and_prefix(self):
+        self.assertEqual(self.backend.search("quat"), [self.audi.pk])
+        self.assertEqual(self.backend.search("rear drive"), [self.bmw.pk])
+
+    def test_search_ignores_punctuation(self):
+        self.assertEqual(self.backend.search('"(*'), [])
+
+    def test_index_follows_save_and_delete(self):
+        self.audi.content = "Electric crossover."
+        self.audi.save()
+        self.assertEqual(self.backend.search("quattro"), [])
+        self.assertEqual(self.backend.search("electric"), [self.audi.pk])
+
+        self.bmw.delete()
+        self.assertEqual(self.backend.search("bavarian"), [])
+
+    def test_rebuild(self):
+        self.backend.clear()
+        self.assertEqual(self.backend.search("bmw"), [])
+
+        total = self.backend.rebuild(Article.objects.all())
+        self.assertEqual(total, 2)
+        self.assertEqual(len(self.backend.search("bmw")), 2)
+
+    def test_article_list_uses_ranked_search(self):
+        response = self.client.get(ARTICLE_LIST_URL, {"title": "bmw"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context["article_list"]),
+            [self.bmw, self.audi]
+        )
+        self.assertEqual(response.context["total_articles"], 2)
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL only")
+@override_settings(
+    SEARCH_BACKEND="catalog.search.backends.PostgresSearchBackend"
+)
+class PostgresSearchBackendTests(TestCase):
+    """Test the shadow table rebuild of the PostgreSQL backend."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        category = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=KnowledgeBase.objects.create(
+                title="Cars",
+                created_by=self.user,
+            ),
+        )
+        self.bmw = Article.objects.create(
+            title="BMW",
+            author=self.user,
+            category=category,
+            content="Bavarian engines.",
+        )
+        self.audi = Article.objects.create(
+            title="AUDI",
+            author=self.user,
+            category=category,
+            content="Quattro drive.",
+        )
+        self.backend = get_search_backend()
+
+    def test_rebuild_swaps_in_shadow_table(self):
+        self.backend.clear()
+        output = StringIO()
+        call_command(
+            "rebuild_search_index",
+            "--workers", "1",
+            "--shard-size", "1",
+            stdout=output,
+        )
+
+        self.assertIn("Shard 2/2: 1 articles", output.getvalue())
+        self.assertIn("Indexed 2 articles", output.getvalue())
+        self.assertEqual(self.backend.search("quattro"), [self.audi.pk])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regclass(%s)", [self.backend.shadow_table]
+            )
+            self.assertIsNone(cursor.fetchone()[0])
+
+    def test_changes_during_rebuild_are_kept(self):
+        def progress(done, shards, articles, seconds):
+            if done == 1:
+                self.bmw.delete()
+                self.audi.content = "Electric crossover."
+                self.audi.save()
+
+        rebuild_index(
+            self.backend, workers=1, shard_size=1, progress=progress
+        )
+
+        self.assertEqual(self.backend.search("bavarian"), [])
+        self.assertEqual(self.backend.search("quattro"), [])
+        self.assertEqual(self.backend.search("electric"), [self.audi.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tesla = Article.objects.create(
+                title="Tesla",
+                author=self.user,
+                category=self.audi.category,
+                content="Electric drive.",
+            )
+        self.assertEqual(
+            sorted(self.backend.search("electric")),
+            [self.audi.pk, tesla.pk],
+        )
+
+
+class SegmentTests(TestCase):
+    """Test the memory-mapped segment format."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "segment.idx"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        write_segment(self.path, [
+            (3, Counter({"bmw": 2, "engine": 1})),
+            (70000, Counter({"bmw": 1})),
+            (70001, Counter({"audi": 4})),
+        ])
+        segment = Segment(self.path)
+
+        self.assertEqual(segment.doc_count, 3)
+        self.assertEqual(segment.total_length, 8)
+        self.assertEqual(list(segment.ids), [3, 70000, 70001])
+        self.assertEqual(list(segment.postings("bmw")), [(0, 2), (1, 1)])
+        self.assertEqual(list(segment.postings("audi")), [(2, 4)])
+        self.assertEqual(list(segment.postings("tesla")), [])
+        self.assertEqual(segment.doc_number(70001), 2)
+        self.assertIsNone(segment.doc_number(4))
+
+    def test_merge_matches_single_segment(self):
+        documents = [
+            (pk, Counter({"common": 1, f"rare{pk % 3}": pk % 5 + 1}))
+            for pk in range(1, 400)
+        ]
+        shard_paths = []
+        for number, start in enumerate(range(0, 399, 150)):
+            shard_path = Path(self.directory.name) / f"shard-{number}.idx"
+            write_segment(shard_path, documents[start:start + 150])
+            shard_paths.append(shard_path)
+        merged_path = Path(self.directory.name) / "merged.idx"
+
+        self.assertEqual(merge_segments(merged_path, shard_paths), 399)
+        write_segment(self.path, documents)
+        self.assertEqual(
+            merged_path.read_bytes(), self.path.read_bytes()
+        )
+
+    def test_merge_rejects_overlapping_ranges(self):
+        first = Path(self.directory.name) / "first.idx"
+        second = Path(self.directory.name) / "second.idx"
+        write_segment(first, [(5, Counter({"bmw": 1}))])
+        write_segment(second, [(3, Counter({"bmw": 1}))])
+
+        with self.assertRaises(ValueError):
+            merge_segments(self.path, [first, second])
+
+    def test_wide_deltas(self):
+        documents = [
+            (pk, Counter({"common": 1, f"rare{pk % 2}": 1}))
+            for pk in range(1, 600)
+        ]
+        documents.append((100000, Counter({"rare0": 1})))
+        write_segment(self.path, documents)
+        segment = Segment(self.path)
+
+        doc_numbers = [number for number, _ in segment.postings("common")]
+        self.assertEqual(doc_numbers, list(range(599)))
+        self.assertEqual(segment.doc_frequency("rare0"), 300)
+
+
+class BM25SearchBackendTests(TestCase):
+    """Test the inverted index search backend."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(
+            SEARCH_BACKEND="catalog.search.inverted.BM25SearchBackend",
+            SEARCH_INDEX_DIR=self.directory.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.knowledge_base = KnowledgeBase.objects.create(
+            title="Cars",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=self.knowledge_base
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bmw = self.create_article(
+                "BMW", "Bavarian engines and rear wheel drive."
+            )
+            self.audi = self.create_article(
+                "AUDI", "Quattro drive. Not a BMW at all."
+            )
+        self.backend = get_search_backend()
+
+    def create_article(self, title, content):
+        return Article.objects.create(
+            title=title,
+            author=self.user,
+            category=self.category,
+            content=content,
+        )
+
+    def test_incremental_updates_are_searchable(self):
+        self.assertIsInstance(self.backend, BM25SearchBackend)
+        self.assertEqual(
+            self.backend.search("bmw"),
+            [self.bmw.pk, self.audi.pk]
+        )
+        self.assertEqual(self.backend.search("quattro"), [self.audi.pk])
+
+    def test_rebuild_and_delta_on_top(self):
+        output = StringIO()
+        call_command("rebuild_search_index", stdout=output)
+        self.assertIn("Indexed 2 articles", output.getvalue())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.audi.content = "Electric crossover."
+            self.audi.save()
+            self.bmw.delete()
+
+        self.assertEqual(self.backend.search("quattro"), [])
+        self.assertEqual(self.backend.search("bavarian"), [])
+        self.assertEqual(self.backend.search("electric"), [self.audi.pk])
+
+    def test_sharded_rebuild(self):
+        other_worker = BM25SearchBackend(self.directory.name)
+        output = StringIO()
+        call_command(
+            "rebuild_search_index",
+            "--workers", "1",
+            "--shard-size", "1",
+            stdout=output,
+        )
+
+        self.assertIn("Shard 2/2: 1 articles", output.getvalue())
+        self.assertIn("Indexed 2 articles", output.getvalue())
+        self.assertEqual(
+            other_worker.search("bmw"), [self.bmw.pk, self.audi.pk]
+        )
+        self.assertEqual(
+            sorted(path.name for path in Path(self.directory.name).iterdir()),
+            ["delta.log", "index.lock", "segment.idx"],
+        )
+
+    def test_other_workers_see_updates(self):
+        other_worker = BM25SearchBackend(self.directory.name)
+        other_worker.search("bmw")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tesla = self.create_article("Tesla", "Electric drive.")
+
+        self.assertEqual(other_worker.search("electric"), [tesla.pk])
+
+    def test_rolled_back_save_is_not_indexed(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.create_article("Tesla", "Electric drive.")
+
+        self.assertEqual(self.backend.search("electric"), [])
+
+
+class TrigramSearchTests(TestCase):
+    """Test the in-process trigram index used outside PostgreSQL."""
+
+    def setUp(self):
+        reset_trigram_indexes()
+        self.addCleanup(reset_trigram_indexes)
+
+        self.user = get_user_model().objects.create_user(
+            username="jdoe",
+            password="test123",
+            first_name="Jonathan",
+            last_name="Doe",
+            position="Employee"
+        )
+        self.other = get_user_model().objects.create_user(
+            username="msmith",
+            password="test123",
+            first_name="Maria",
+            last_name="Smith",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+
+        self.onboarding = KnowledgeBase.objects.create(
+            title="Onboarding for new hires",
+            created_by=self.user,
+        )
+        self.security = KnowledgeBase.objects.create(
+            title="Security",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Kubernetes",
+            created_by=self.user,
+            knowledge_base=self.security,
+        )
+
+    def test_trigrams_are_padded_per_word(self):
+        self.assertEqual(
+            trigrams("Go!"),
+            {"  g", " go", "go "}
+        )
+
+    def test_typo_tolerant_knowledge_base_search(self):
+        response = self.client.get(
+            KNOWLEDGE_BASE_LIST_URL, {"title": "onbording"}
+        )
+        self.assertEqual(
+            list(response.context["knowledge_base_list"]),
+            [self.onboarding]
+        )
+
+    def test_typo_tolerant_category_search(self):
+        response = self.client.get(CATEGORY_LIST_URL, {"topic": "kubernets"})
+        self.assertEqual(
+            list(response.context["category_list"]),
+            [self.category]
+        )
+
+    def test_employee_search_ranks_best_match_first(self):
+        response = self.client.get(EMPLOYEE_LIST_URL, {"query": "jonathon"})
+        self.assertEqual(list(response.context["employee_list"]), [self.user])
+
+        response = self.client.get(EMPLOYEE_LIST_URL, {"query": "smth"})
+        self.assertEqual(
+            list(response.context["employee_list"]),
+            [self.other]
+        )
+
+    def test_index_follows_commits(self):
+        index = get_trigram_index(KnowledgeBase)
+        index.load()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.security.title = "Compliance"
+            self.security.save()
+        self.assertEqual(index.search("complience"), [self.security.pk])
+        self.assertEqual(index.search("security"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.onboarding.delete()
+        self.assertEqual(index.search("onboarding"), [])
+
+    def test_other_process_change_triggers_reload(self):
+        index = get_trigram_index(Category)
+        other_process = TrigramIndex(Category, ("topic",))
+        self.assertEqual(other_process.search("kubernetes"), [
+            self.category.pk
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.topic = "Terraform"
+            self.category.save()
+
+        self.assertEqual(index.search("terraform"), [self.category.pk])
+        self.assertEqual(other_process.search("terraform"), [
+            self.category.pk
+        ])
+
+
+class AutocompleteTests(TestCase):
+    """Test the prefix index behind the autocomplete endpoint."""
+
+    def setUp(self):
+        prefix_index.loaded = False
+        self.addCleanup(setattr, prefix_index, "loaded", False)
+
+        self.user = get_user_model().objects.create_user(
+            username="jdoe",
+            password="test123",
+            first_name="Jonathan",
+            last_name="Doe",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+        self.knowledge_base = KnowledgeBase.objects.create(
+            title="Docker basics",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Dockerfiles",
+            created_by=self.user,
+            knowledge_base=self.knowledge_base,
+        )
+        self.popular = Article.objects.create(
+            title="Docker networking",
+            author=self.user,
+            category=self.category,
+            content="Bridges.",
+            is_published=True,
+            views_count=50,
+        )
+        self.quiet = Article.objects.create(
+            title="Slim Docker images",
+            author=self.user,
+            category=self.category,
+            content="Layers.",
+            is_published=True,
+            views_count=5,
+        )
+        Article.objects.create(
+            title="Docker draft",
+            author=self.user,
+            category=self.category,
+            content="Draft.",
+        )
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(AUTOCOMPLETE_URL, {"q": "do"})
+        self.assertNotEqual(response.status_code, 200)
+
+    def test_suggestions_by_prefix(self):
+        response = self.client.get(AUTOCOMPLETE_URL, {"q": "DOC"})
+        data = response.json()
+
+        self.assertEqual(
+            [item["label"] for item in data["articles"]],
+            ["Docker networking", "Slim Docker images"]
+        )
+        self.assertEqual(
+            [item["label"] for item in data["knowledge_bases"]],
+            ["Docker basics"]
+        )
+        self.assertEqual(
+            [item["label"] for item in data["categories"]],
+            ["Dockerfiles"]
+        )
+        self.assertEqual(data["employees"], [])
+        self.assertEqual(
+            data["articles"][0]["url"],
+            reverse("catalog:article-detail", args=[self.popular.pk])
+        )
+
+    def test_full_label_prefix_and_limit(self):
+        data = self.client.get(
+            AUTOCOMPLETE_URL, {"q": "jonathan d", "limit": 1}
+        ).json()
+        self.assertEqual(
+            [item["label"] for item in data["employees"]],
+            ["Jonathan Doe"]
+        )
+
+        data = self.client.get(
+            AUTOCOMPLETE_URL, {"q": "docker", "limit": 1}
+        ).json()
+        self.assertEqual(len(data["articles"]), 1)
+
+    def test_incremental_updates(self):
+        self.assertEqual(len(prefix_index.suggest("slim")["articles"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiet.is_published = False
+            self.quiet.save()
+            self.category.topic = "Compose"
+            self.category.save()
+
+        self.assertEqual(prefix_index.suggest("slim")["articles"], [])
+        self.assertEqual(
+            prefix_index.suggest("comp")["categories"][0]["id"],
+            self.category.pk
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.popular.delete()
+        self.assertEqual(prefix_index.suggest("docker")["articles"], [])
+
+    def test_other_workers_apply_changes_without_reloading(self):
+        other_worker = PrefixIndex()
+        other_worker.suggest("slim")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.topic = "Compose"
+            self.category.save()
+            self.quiet.is_published = False
+            self.quiet.save()
+
+        with mock.patch.object(other_worker, "build") as build:
+            suggestions = other_worker.suggest("comp")
+            self.assertEqual(other_worker.suggest("slim")["articles"], [])
+        build.assert_not_called()
+        self.assertEqual(
+            suggestions["categories"][0]["id"], self.category.pk
+        )
+
+    def test_consolidated_views_reweigh_articles(self):
+        prefix_index.suggest("docker")
+        article_views.add({self.quiet.pk: 100})
+        with self.captureOnCommitCallbacks(execute=True):
+            article_views.consolidate()
+        self.assertEqual(
+            [item["id"] for item in prefix_index.suggest("docker")["articles"]],
+            [self.quiet.pk, self.popular.pk],
+        )
+
+    def test_short_prefix_keeps_heaviest_suggestions(self):
+        with mock.patch("catalog.search.autocomplete.TOP_LIMIT", 1):
+            self.assertEqual(
+                [item["id"] for item in prefix_index.suggest("d")["articles"]],
+                [self.popular.pk],
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.popular.is_published = False
+                self.popular.save()
+            self.assertEqual(
+                [item["id"] for item in prefix_index.suggest("d")["articles"]],
+                [self.quiet.pk],
+            )
+
+
+class FacetedSearchTests(TestCase):
+    """Test facet counts and filters of the article list."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.other = get_user_model().objects.create_user(
+            username="other",
+            password="test123",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+
+        self.cars = KnowledgeBase.objects.create(
+            title="Cars",
+            created_by=self.user,
+        )
+        self.germany = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=self.cars,
+        )
+        self.japan = Category.objects.create(
+            topic="Japan",
+            created_by=self.user,
+            knowledge_base=self.cars,
+        )
+        self.bmw = Article.objects.create(
+            title="BMW",
+            author=self.user,
+            category=self.germany,
+            content="Engines.",
+        )
+        self.audi = Article.objects.create(
+            title="AUDI",
+            author=self.other,
+            category=self.germany,
+            content="Quattro " * 400,
+        )
+        self.honda = Article.objects.create(
+            title="Honda",
+            author=self.user,
+            category=self.japan,
+            content="Engines.",
+        )
+        self.bmw.ratings.create(employee=self.other, rating=5)
+
+    def search(self, filters):
+        queryset = Article.objects.order_by("pk")
+        return (
+            list(filter_facets(queryset, filters).values_list(
+                "pk", flat=True
+            )),
+            facet_counts(queryset, filters),
+        )
+
+    def test_reading_time_buckets(self):
+        for article, minutes in (
+            (self.bmw, 4), (self.audi, 5), (self.honda, 45)
+        ):
+            Article.objects.filter(pk=article.pk).update(
+                reading_time=minutes
+            )
+        _, counts = self.search({})
+        self.assertEqual(counts["reading_time"], {"0": 1, "1": 1, "3": 1})
+        self.assertEqual(
+            self.search({"reading_time": "3"})[0], [self.honda.pk]
+        )
+
+    def test_rating_buckets(self):
+        self.audi.ratings.create(employee=self.user, rating=2)
+        self.audi.ratings.create(employee=self.other, rating=1)
+        _, counts = self.search({})
+        self.assertEqual(counts["rating"], {"5": 1, "1": 1, "0": 1})
+        self.assertEqual(self.search({"rating": "1"})[0], [self.audi.pk])
+
+    def test_counts_without_filters(self):
+        ids, counts = self.search({})
+
+        self.assertEqual(ids, [self.bmw.pk, self.audi.pk, self.honda.pk])
+        self.assertEqual(counts["category"][str(self.germany.pk)], 2)
+        self.assertEqual(counts["author"][str(self.user.pk)], 2)
+        self.assertEqual(counts["rating"], {"5": 1, "0": 2})
+        self.assertEqual(counts["reading_time"], {"0": 2, "1": 1})
+
+    def test_filters_keep_alternative_counts(self):
+        ids, counts = self.search(
+            {"category": str(self.germany.pk), "author": str(self.user.pk)},
+        )
+
+        self.assertEqual(ids, [self.bmw.pk])
+        self.assertEqual(counts["category"], {
+            str(self.germany.pk): 1,
+            str(self.japan.pk): 1,
+        })
+        self.assertEqual(counts["author"], {
+            str(self.user.pk): 1,
+            str(self.other.pk): 1,
+        })
+        self.assertEqual(counts["knowledge_base"], {str(self.cars.pk): 1})
+
+    def test_counts_each_facet_in_one_query(self):
+        with self.assertNumQueries(len(FACETS)):
+            facet_counts(Article.objects.all(), {"rating": "5"})
+
+    def test_article_list_facets(self):
+        response = self.client.get(
+            ARTICLE_LIST_URL, {"category": self.japan.pk}
+        )
+
+        self.assertEqual(list(response.context["article_list"]), [self.honda])
+        self.assertEqual(response.context["total_articles"], 1)
+        category_facet = next(
+            facet for facet in response.context["facets"]
+            if facet["name"] == "category"
+        )
+        self.assertEqual(
+            [(item["label"], item["count"], item["selected"])
+             for item in category_facet["values"]],
+            [("Germany", 2, False), ("Japan", 1, True)]
+        )
+        self.assertContains(response, "Not rated")
+
+    def test_invalid_filter_is_ignored(self):
+        response = self.client.get(ARTICLE_LIST_URL, {"rating": "9"})
+        self.assertEqual(response.context["total_articles"], 3)
+
+
+class SearchResultCacheTests(TestCase):
+    """Test caching and invalidation of article search results."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.knowledge_base = KnowledgeBase.objects.create(
+            title="Cars",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=self.knowledge_base
+        )
+        self.bmw = Article.objects.create(
+            title="BMW",
+            author=self.user,
+            category=self.category,
+            content="Bavarian engines.",
+        )
+        self.audi = Article.objects.create(
+            title="AUDI",
+            author=self.user,
+            category=self.category,
+            content="Quattro.",
+        )
+        self.calls = 0
+
+    def search(self, query, filters=None):
+        def compute():
+            self.calls += 1
+            return [self.calls], {}
+        return cached_search(query, filters or {}, compute)
+
+    def test_normalization(self):
+        self.assertEqual(
+            normalize_query("  BMW,  engines bmw "), "bmw engines"
+        )
+        self.assertEqual(
+            query_terms("bm engines"), {bucket("b"), bucket("engi")}
+        )
+        self.assertEqual(query_terms(""), {NO_TERMS})
+        self.assertEqual(
+            article_terms("BMW Bavarian"),
+            {bucket("b"), bucket("bmw"), bucket("bava")},
+        )
+
+    def test_versions_are_bucketed(self):
+        words = " ".join(
+            f"{first}{second}xx" for first in "abcdefghijklmnop"
+            for second in "abcdefghijklmnop"
+        )
+        terms = article_terms(words)
+        self.assertLessEqual(len(terms), VERSION_BUCKETS)
+        self.assertTrue(query_terms("abxx") <= terms)
+
+    def test_near_identical_queries_share_entry(self):
+        self.assertEqual(self.search("BMW engines"), ([1], {}))
+        self.assertEqual(self.search("engines   bmw!"), ([1], {}))
+        self.assertEqual(self.search("bmw", {"category": "1"}), ([2], {}))
+
+    def test_matching_article_change_invalidates(self):
+        self.search("bavarian")
+        self.search("quattro")
+
+        self.bmw.content = "Electric."
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bmw.save()
+
+        self.assertEqual(self.search("bavarian"), ([3], {}))
+        self.assertEqual(self.search("electric"), ([4], {}))
+        self.assertEqual(self.search("quattro"), ([2], {}))
+
+    def test_prefix_queries_are_invalidated(self):
+        self.search("qu")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.audi.delete()
+        self.assertEqual(self.search("qu"), ([2], {}))
+
+    def test_versions_bump_after_commit(self):
+        self.search("bavarian")
+        self.bmw.content = "Electric."
+        with self.captureOnCommitCallbacks(execute=False):
+            self.bmw.save()
+        self.assertEqual(self.search("bavarian"), ([1], {}))
+
+    def test_evicted_version_does_not_revive_entries(self):
+        self.search("bavarian")
+        cache.delete(version_key(bucket("bava")))
+        self.assertEqual(self.search("bavarian"), ([2], {}))
+
+    def test_unsearched_changes_keep_entries(self):
+        self.search("bmw")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bmw.ratings.create(employee=self.user, rating=4)
+            Article.objects.get(pk=self.bmw.pk).save()
+            self.category.topic = "Bavaria"
+            self.category.save()
+        self.assertEqual(self.search("bmw"), ([1], {}))
+
+    def test_title_edit_keeps_unfiltered_searches(self):
+        self.search("")
+        self.bmw.title = "BMW M3"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bmw.save()
+        self.assertEqual(self.search(""), ([1], {}))
+        self.assertEqual(self.search("bmw"), ([2], {}))
+
+    def test_publish_invalidates(self):
+        self.search("")
+        self.client.force_login(get_user_model().objects.create_superuser(
+            username="admin",
+            password="test123",
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("admin:catalog_article_changelist"), {
+                "action": "publish_articles",
+                "_selected_action": [self.audi.pk],
+            })
+        self.assertEqual(self.search(""), ([2], {}))
+
+    def test_article_list_pages_share_cached_result(self):
+        self.client.force_login(self.user)
+        self.client.get(ARTICLE_LIST_URL, {"title": "bmw"})
+
+        # The ranked ids and facet counts come from the cache; only
+        # the articles of the page and the facet labels are queried.
+        with self.assertNumQueries(6):
+            response = self.client.get(
+                ARTICLE_LIST_URL, {"title": " BMW ", "page": 1}
+            )
+        self.assertEqual(list(response.context["article_list"]), [self.bmw])
+        self.assertEqual(response.context["total_articles"], 1)
+
+    def test_lists_without_terms_cache_only_counts(self):
+        self.client.force_login(self.user)
+        self.client.get(ARTICLE_LIST_URL, {"rating": "0"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bmw.ratings.create(employee=self.user, rating=5)
+
+        response = self.client.get(ARTICLE_LIST_URL, {"rating": "0"})
+        self.assertEqual(list(response.context["article_list"]), [self.audi])
+        self.assertEqual(response.context["total_articles"], 1)
+        rating = next(
+            facet for facet in response.context["facets"]
+            if facet["name"] == "rating"
+        )
+        self.assertEqual(
+            {value["value"]: value["count"] for value in rating["values"]},
+            {"0": 2},
+        )
+
+
+class RelatedArticlesTests(TestCase):
+    """Test precomputed related articles."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Infrastructure",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Containers",
+            created_by=self.user,
+            knowledge_base=knowledge_base
+        )
+        self.docker = self.create("Docker", "Docker images and containers.")
+        self.compose = self.create("Compose", "Running docker containers.")
+        self.images = self.create("Images", "Building docker images.")
+        self.python = self.create("Python", "Python virtual environments.")
+
+    def create(self, title, content, is_published=True):
+        return Article.objects.create(
+            title=title,
+            author=self.user,
+            category=self.category,
+            content=content,
+            is_published=is_published,
+        )
+
+    def related(self, article):
+        return list(article.related_links.values_list("related", flat=True))
+
+    def test_cosine_similarity(self):
+        vectors = TfidfVectors([
+            (1, Counter({"docker": 2, "images": 1})),
+            (2, Counter({"docker": 2, "images": 1})),
+            (3, Counter({"python": 1})),
+        ])
+        self.assertAlmostEqual(vectors.similarities(vectors.vectors[1])[2], 1)
+        self.assertEqual(vectors.neighbours(1, 5), [
+            (2, vectors.similarities(vectors.vectors[1])[2]),
+        ])
+
+    @override_settings(RELATED_MAX_DF=0.5, RELATED_POSTINGS_LIMIT=1)
+    def test_common_terms_are_pruned_and_postings_capped(self):
+        vectors = TfidfVectors([
+            (1, Counter({"docker": 1, "images": 2})),
+            (2, Counter({"docker": 1, "images": 1})),
+            (3, Counter({"docker": 1, "python": 1})),
+            (4, Counter({"python": 1})),
+        ])
+        self.assertEqual(vectors.pruned, {"docker"})
+        self.assertNotIn("docker", vectors.postings)
+        self.assertEqual(
+            [pk for pk, _ in vectors.postings["images"]], [1]
+        )
+
+    def test_saves_batch_their_lookups(self):
+        rebuild_related_articles()
+        with mock.patch(
+            "catalog.search.related.IN_BATCH_SIZE", 1
+        ), self.captureOnCommitCallbacks(execute=True):
+            venv = self.create("Virtualenv", "Python virtual environments.")
+
+        self.assertEqual(self.related(venv), [self.python.pk])
+        self.assertEqual(self.related(self.python), [venv.pk])
+
+    def test_rebuild_stores_ranked_neighbours(self):
+        out = StringIO()
+        call_command("build_related_articles", "--limit", "2", stdout=out)
+
+        self.assertIn(
+            "Stored related articles for 4 articles.", out.getvalue()
+        )
+        self.assertEqual(
+            set(self.related(self.docker)), {self.compose.pk, self.images.pk}
+        )
+        self.assertEqual(self.related(self.python), [])
+        self.assertEqual(
+            list(self.docker.related_links.values_list("rank", flat=True)),
+            [0, 1],
+        )
+
+    def test_saved_article_updates_neighbours(self):
+        rebuild_related_articles()
+        with self.captureOnCommitCallbacks(execute=True):
+            venv = self.create("Virtualenv", "Python virtual environments.")
+
+        self.assertEqual(self.related(venv), [self.python.pk])
+        self.assertEqual(self.related(self.python), [venv.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venv.is_published = False
+            venv.save()
+
+        self.assertEqual(self.related(venv), [])
+        self.assertEqual(self.related(self.python), [])
+
+    def test_saves_use_the_stored_idf(self):
+        rebuild_related_articles()
+        idf = set(RelatedTerm.objects.values_list("term", "idf"))
+        with self.captureOnCommitCallbacks(execute=True):
+            venv = self.create("Virtualenv", "Python virtual environments.")
+
+        self.assertEqual(set(RelatedTerm.objects.values_list(
+            "term", "idf"
+        )), idf)
+        self.assertEqual(
+            set(venv.related_postings.values_list("term", flat=True)),
+            {"virtualenv", "python", "virtual", "environments"},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venv.is_published = False
+            venv.save()
+        self.assertFalse(RelatedPosting.objects.filter(article=venv))
+
+    def test_bulk_publish_updates_neighbours(self):
+        venv = self.create(
+            "Virtualenv", "Python virtual environments.", is_published=False
+        )
+        rebuild_related_articles()
+        with self.captureOnCommitCallbacks(execute=True):
+            update_articles(
+                Article.objects.filter(pk=venv.pk), is_published=True
+            )
+
+        self.assertEqual(self.related(venv), [self.python.pk])
+        self.assertEqual(self.related(self.python), [venv.pk])
+
+    def test_unchanged_text_is_not_refreshed(self):
+        with mock.patch(
+            "catalog.signals.update_related_articles"
+        ) as update, self.captureOnCommitCallbacks(execute=True):
+            self.docker.views_count += 1
+            self.docker.save()
+            Article.objects.get(pk=self.python.pk).save()
+        update.assert_not_called()
+
+        with mock.patch(
+            "catalog.signals.update_related_articles"
+        ) as update, self.captureOnCommitCallbacks(execute=True):
+            self.docker.content = "Docker volumes."
+            self.docker.save()
+        update.assert_called_once_with(self.docker)
+
+    def test_detail_page_lists_related_articles(self):
+        rebuild_related_articles()
+        response = self.client.get(
+            reverse("catalog:article-detail", args=[self.images.pk])
+        )
+
+        self.assertEqual(
+            list(response.context["related_articles"])[0], self.docker
+        )
+        self.assertContains(response, "Related articles")
+
+
+class DuplicateDetectionTests(TestCase):
+    """Test MinHash/LSH near-duplicate detection."""
+
+    TEXT = (
+        "Docker images are built from a Dockerfile that lists every "
+        "layer of the image, starting from a base image and adding "
+        "packages, configuration and the application code itself."
+    )
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            username="admin",
+            password="test123",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Infrastructure",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Containers",
+            created_by=self.user,
+            knowledge_base=knowledge_base
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.original = self.create("Docker images", self.TEXT)
+
+    def create(self, title, content):
+        return Article.objects.create(
+            title=title,
+            author=self.user,
+            category=self.category,
+            content=content,
+        )
+
+    def test_signature_estimates_similarity(self):
+        signature = minhash(self.TEXT)
+
+        self.assertEqual(len(pack(signature)), 4 * len(signature))
+        self.assertEqual(unpack(pack(signature)), signature)
+        self.assertEqual(similarity(signature, minhash(self.TEXT)), 1)
+        self.assertLess(
+            similarity(signature, minhash("Python virtual environments")),
+            0.2,
+        )
+        self.assertIsNone(minhash("  "))
+
+    def test_saved_variant_is_flagged_both_ways(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            variant = self.create(
+                "Docker images again",
+                self.TEXT.replace("itself", "too"),
+            )
+            other = self.create("Python", "Python virtual environments.")
+
+        self.assertEqual(
+            list(variant.duplicate_links.values_list("duplicate", flat=True)),
+            [self.original.pk],
+        )
+        self.assertEqual(
+            list(self.original.duplicate_links.values_list(
+                "duplicate", flat=True
+            )),
+            [variant.pk],
+        )
+        self.assertFalse(other.duplicate_links.exists())
+        self.assertEqual(
+            [pk for pk, _ in find_duplicates(minhash(self.TEXT))],
+            [self.original.pk, variant.pk],
+        )
+
+        response = self.client.get(
+            reverse("admin:catalog_article_change", args=[variant.pk])
+        )
+        self.assertContains(response, "Possible duplicates")
+        self.assertContains(response, "Docker images</a>")
+
+    def test_create_form_warns_before_saving_duplicate(self):
+        data = {
+            "title": "Copy",
+            "author": self.user.id,
+            "category": self.category.id,
+            "content": self.TEXT,
+        }
+        response = self.client.post(reverse("catalog:article-create"), data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context["duplicates"], [(self.original, 100)]
+        )
+        self.assertFalse(Article.objects.filter(title="Copy").exists())
+
+        response = self.client.post(
+            reverse("catalog:article-create"),
+            {**data, "confirm_duplicates": "1"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Article.objects.filter(title="Copy").exists())
+
+
+@override_settings(SEARCH_FANOUT_WORKERS=1)
+class UnifiedSearchTests(TestCase):
+    """Test the search over every kind of object."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        reset_trigram_indexes()
+        self.addCleanup(reset_trigram_indexes)
+
+        self.user = get_user_model().objects.create_user(
+            username="dockerman",
+            password="test123",
+            first_name="Docker",
+            last_name="Smith",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+        self.knowledge_base = KnowledgeBase.objects.create(
+            title="Docker",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Docker compose",
+            created_by=self.user,
+            knowledge_base=self.knowledge_base
+        )
+        self.article = Article.objects.create(
+            title="Docker volumes",
+            author=self.user,
+            category=self.category,
+            content="Persisting data.",
+        )
+
+    def test_grouped_hits(self):
+        results = unified_search("docker")
+
+        self.assertEqual(
+            [hit["id"] for hit in results["knowledge_bases"]],
+            [self.knowledge_base.pk],
+        )
+        self.assertEqual(
+            [hit["id"] for hit in results["categories"]], [self.category.pk]
+        )
+        self.assertEqual(
+            [hit["label"] for hit in results["articles"]], ["Docker volumes"]
+        )
+        self.assertEqual(
+            [hit["label"] for hit in results["employees"]], ["Docker Smith"]
+        )
+
+    def test_sections_are_cached_separately(self):
+        unified_search("docker")
+        with self.assertNumQueries(0):
+            unified_search("Docker")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            KnowledgeBase.objects.create(
+                title="Docker swarm",
+                created_by=self.user,
+            )
+        with self.assertNumQueries(1):
+            results = unified_search("docker")
+        self.assertEqual(len(results["knowledge_bases"]), 2)
+
+    def test_fan_out_runs_tasks_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def task(value):
+            barrier.wait()
+            return value
+
+        self.assertEqual(
+            fan_out({"a": (task, 1), "b": (task, 2)}, workers=2),
+            {"a": 1, "b": 2},
+        )
+
+    def test_search_page(self):
+        response = self.client.get(SEARCH_URL, {"q": "docker"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "catalog/search.html")
+        self.assertEqual(
+            [section["title"] for section in response.context["sections"]],
+            ["Knowledge bases", "Categories", "Articles", "Employees"],
+        )
+        self.assertContains(response, "Docker volumes")
+
+
+class SemanticSearchTests(TestCase):
+    """Test embeddings and the LSH index of semantic search."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(
+            SEARCH_INDEX_DIR=self.directory.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Infrastructure",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Containers",
+            created_by=self.user,
+            knowledge_base=knowledge_base
+        )
+        self.docker = self.create(
+            "Docker containers", "Running containerized services."
+        )
+        self.python = self.create(
+            "Python packaging", "Publishing wheels to the package index."
+        )
+        call_command("rebuild_semantic_index", stdout=StringIO())
+
+    def create(self, title, content, is_published=True):
+        return Article.objects.create(
+            title=title,
+            author=self.user,
+            category=self.category,
+            content=content,
+            is_published=is_published,
+        )
+
+    def similarity(self, first, second):
+        return sum(
+            a * b for a, b in zip(
+                embed(features("", first)), embed(features("", second))
+            )
+        )
+
+    def test_word_forms_stay_close(self):
+        self.assertGreater(
+            self.similarity("container", "containers"),
+            self.similarity("container", "packaging"),
+        )
+        self.assertIsNone(embed(features("", "the and of")))
+
+    def test_search_finds_nearest_articles(self):
+        index = get_semantic_index()
+
+        self.assertEqual(index.search("container", 10), [self.docker.pk])
+        self.assertEqual(index.search("packages", 10), [self.python.pk])
+
+    def test_index_follows_publishing(self):
+        other_worker = SemanticIndex(self.directory.name)
+        self.assertEqual(other_worker.search("kubernetes", 10), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = self.create(
+                "Kubernetes", "Kubernetes clusters.", is_published=False
+            )
+        self.assertEqual(other_worker.search("kubernetes", 10), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.is_published = True
+            draft.save()
+        self.assertEqual(other_worker.search("kubernetes", 10), [draft.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.delete()
+        self.assertEqual(other_worker.search("kubernetes", 10), [])
+
+    def test_buckets_grow_with_the_index(self):
+        index = SemanticIndex(self.directory.name)
+        for number in range(300):
+            index.append(
+                1000 + number,
+                embed(features("", f"topic{number} common words")),
+            )
+        index.refresh()
+
+        self.assertGreater(index.bits, 0)
+        self.assertEqual(
+            index.search("topic123 common words", 1), [1123]
+        )
+
+    def test_semantic_mode_waits_for_the_index(self):
+        with override_settings(SEARCH_INDEX_DIR=self.directory.name + "/new"):
+            response = self.client.get(
+                ARTICLE_LIST_URL,
+                {"title": "containerized", "mode": "semantic"},
+            )
+        self.assertNotContains(response, 'value="semantic"')
+        self.assertEqual(
+            list(response.context["article_list"]), [self.docker]
+        )
+
+        response = self.client.get(ARTICLE_LIST_URL)
+        self.assertContains(response, 'value="semantic"')
+
+    def test_article_list_semantic_mode(self):
+        response = self.client.get(
+            ARTICLE_LIST_URL, {"title": "containerized", "mode": "semantic"}
+        )
+
+        self.assertEqual(
+            list(response.context["article_list"]), [self.docker]
+        )
+
+
+class SavedSearchTests(TestCase):
+    """Test saved searches and the percolator."""
+
+    def setUp(self):
+        self.author = get_user_model().objects.create_superuser(
+            username="author",
+            password="test123",
+            position="Author"
+        )
+        self.reader = get_user_model().objects.create_user(
+            username="reader",
+            password="test123",
+            position="Employee"
+        )
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Infrastructure",
+            created_by=self.author,
+        )
+        self.category = Category.objects.create(
+            topic="Containers",
+            created_by=self.author,
+            knowledge_base=knowledge_base
+        )
+        self.docker = SavedSearch.objects.create(
+            employee=self.reader, query="Docker  volumes"
+        )
+        self.kubernetes = SavedSearch.objects.create(
+            employee=self.reader, query="kube"
+        )
+
+    def create(self, title, content, is_published=False):
+        return Article.objects.create(
+            title=title,
+            author=self.author,
+            category=self.category,
+            content=content,
+            is_published=is_published,
+        )
+
+    def matched(self):
+        return set(SavedSearchMatch.objects.values_list(
+            "saved_search__query", "article__title"
+        ))
+
+    def test_query_anchor_and_matching(self):
+        self.assertEqual(self.docker.query, "docker volumes")
+        self.assertEqual(self.docker.anchor, "volu")
+        self.assertEqual(query_anchor("a kube"), "kube")
+        self.assertTrue(matches("dock vol", ["docker", "volumes"]))
+        self.assertFalse(matches("docker swarm", ["docker", "volumes"]))
+
+    def test_publish_on_save_matches_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            article = self.create("Docker", "Named volumes and mounts.")
+        self.assertEqual(self.matched(), set())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.is_published = True
+            article.save()
+        self.assertEqual(self.matched(), {("docker volumes", "Docker")})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.content = "Kubernetes volumes."
+            article.save()
+        self.assertEqual(len(self.matched()), 1)
+
+    def test_admin_publish_matches_only_new(self):
+        self.client.force_login(self.author)
+        article = self.create("Kubernetes", "Pods and services.")
+        self.create("Docker", "Volumes.", is_published=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("admin:catalog_article_changelist"), {
+                "action": "publish_articles",
+                "_selected_action": list(
+                    Article.objects.values_list("pk", flat=True)
+                ),
+            })
+        self.assertEqual(self.matched(), {("kube", "Kubernetes")})
+        self.assertEqual(
+            SavedSearchMatch.objects.get().article, article
+        )
+
+    def test_saved_search_pages(self):
+        self.client.force_login(self.reader)
+        response = self.client.post(
+            reverse("catalog:saved-search-create"), {"query": "Terraform"}
+        )
+        self.assertRedirects(response, reverse("catalog:saved-search-list"))
+        self.assertTrue(
+            self.reader.saved_searches.filter(query="terraform").exists()
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create("Terraform", "Modules.", is_published=True)
+        response = self.client.get(reverse("catalog:saved-search-list"))
+        self.assertContains(response, "1 new")
+        self.assertFalse(SavedSearchMatch.objects.filter(seen=False).exists())
+
+    def test_matches_beyond_the_page_stay_unseen(self):
+        self.client.force_login(self.reader)
+        with mock.patch.object(SavedSearchListView, "recent_matches", 1):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create("Kubernetes", "Pods.", is_published=True)
+                self.create("Kubernetes", "Services.", is_published=True)
+            response = self.client.get(
+                reverse("catalog:saved-search-list")
+            )
+        self.assertEqual(len(response.context["matches"]), 1)
+        self.assertEqual(
+            SavedSearchMatch.objects.filter(seen=False).count(), 1
+        )
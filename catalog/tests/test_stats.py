@@ -0,0 +1,1313 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import (
+    DatabaseError,
+    IntegrityError,
+    connections,
+    transaction,
+)
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog.models import (
+    KnowledgeBase,
+    Category,
+    Article,
+    ArticleActivity,
+    ArticleTrend,
+    ArticleViewers,
+    Comment,
+    LeaderboardEntry,
+    Rating,
+    SiteStatistics,
+    CategoryViewers,
+)
+from catalog.stats import flush_views, hyperloglog, record_view
+from catalog.stats.authors import recount_authors
+from catalog.stats.bloom import BloomFilter, RotatingBloomFilter
+from catalog.stats.buffer import ViewBuffer, view_buffer
+from catalog.stats.counters import article_views
+from catalog.stats.rollups import (
+    activity_series,
+    add_activity,
+    bucket_start,
+    compact_activity,
+    knowledge_base_activity,
+)
+from catalog.stats.leaderboards import (
+    BOARDS,
+    articles_changed,
+    leader,
+    leaders,
+    rebuild_leaderboards,
+)
+from catalog.stats.site import (
+    compute_site_statistics,
+    reconcile_site_statistics,
+    site_statistics,
+)
+from catalog.stats.ratings import recount_ratings
+from catalog.stats.totals import recount_catalog_totals
+from catalog.stats.trending import (
+    add_trending,
+    current_score,
+    trending_articles,
+)
+from catalog.stats.viewers import employee_viewer, knowledge_base_viewers
+
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=60, VIEW_DEDUP_WINDOW=0)
+class ViewBufferTests(TestCase):
+    """Test the buffered article view counter."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Cars",
+            created_by=self.user,
+        )
+        self.category = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=knowledge_base
+        )
+        self.bmw = Article.objects.create(
+            title="BMW",
+            author=self.user,
+            category=self.category,
+            content="This is a article about BMW.",
+            is_published=True,
+            views_count=3,
+        )
+        self.audi = Article.objects.create(
+            title="AUDI",
+            author=self.user,
+            category=self.category,
+            content="This is a article about AUDI.",
+            is_published=True,
+        )
+        view_buffer.take()
+        self.addCleanup(view_buffer.take)
+
+    def views(self, article):
+        return article_views.get(article.pk)
+
+    def test_views_are_buffered_until_flushed(self):
+        for _ in range(3):
+            self.client.get(
+                reverse("catalog:article-detail", args=[self.bmw.pk])
+            )
+        with self.assertNumQueries(0):
+            record_view(self.audi.pk)
+        self.assertEqual(self.views(self.bmw), 3)
+
+        self.assertEqual(flush_views(), 4)
+        self.assertEqual(self.views(self.bmw), 6)
+        self.assertEqual(self.views(self.audi), 1)
+        self.assertEqual(flush_views(), 0)
+
+    @override_settings(VIEW_COUNT_MAX_PENDING=2)
+    def test_flush_when_too_many_views_are_pending(self):
+        record_view(self.bmw.pk)
+        self.assertEqual(self.views(self.bmw), 3)
+        record_view(self.audi.pk)
+        self.assertEqual(self.views(self.bmw), 4)
+        self.assertEqual(self.views(self.audi), 1)
+
+    def test_timer_flushes_without_later_views(self):
+        with mock.patch("threading.Timer") as timer:
+            record_view(self.bmw.pk)
+            record_view(self.audi.pk)
+        timer.assert_called_once_with(60, view_buffer.flush_on_timer)
+        self.assertEqual(self.views(self.bmw), 3)
+
+        with mock.patch.object(connections, "close_all"):
+            view_buffer.flush_on_timer()
+        self.assertEqual(self.views(self.bmw), 4)
+        self.assertEqual(self.views(self.audi), 1)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_zero_interval_writes_immediately(self):
+        self.client.get(reverse("catalog:article-detail", args=[self.bmw.pk]))
+        self.assertEqual(self.views(self.bmw), 4)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_failed_flush_keeps_views_and_serves_page(self):
+        with mock.patch.object(
+            article_views, "add", side_effect=DatabaseError("locked")
+        ), self.assertLogs("catalog.stats.buffer", "ERROR"):
+            response = self.client.get(
+                reverse("catalog:article-detail", args=[self.bmw.pk])
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.views(self.bmw), 3)
+
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(self.views(self.bmw), 4)
+
+
+class HyperLogLogTests(TestCase):
+    """Test the unique viewer sketches."""
+
+    def sketch(self, viewers):
+        registers = bytearray(hyperloglog.empty_sketch())
+        for viewer in viewers:
+            hyperloglog.add(registers, hyperloglog.viewer_hash(viewer))
+        return bytes(registers)
+
+    def test_estimate_is_close(self):
+        self.assertEqual(hyperloglog.estimate(self.sketch([])), 0)
+        self.assertEqual(hyperloglog.estimate(self.sketch(["a", "a"])), 1)
+        for total in (1000, 20000):
+            estimate = hyperloglog.estimate(
+                self.sketch(str(number) for number in range(total))
+            )
+            self.assertAlmostEqual(estimate / total, 1, delta=0.05)
+
+    def test_merge_is_union(self):
+        first = self.sketch(str(number) for number in range(3000))
+        second = self.sketch(str(number) for number in range(2000, 5000))
+        self.assertEqual(
+            hyperloglog.merge(first, second),
+            self.sketch(str(number) for number in range(5000)),
+        )
+
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+class UniqueViewersTests(TestCase):
+    """Test unique viewer counts of articles, categories and bases."""
+
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user(
+                username=f"employee{number}",
+                password="test123",
+                position="Employee"
+            )
+            for number in range(3)
+        ]
+        self.knowledge_base = KnowledgeBase.objects.create(
+            title="Cars",
+            created_by=self.users[0],
+        )
+        self.germany, self.japan = (
+            Category.objects.create(
+                topic=topic,
+                created_by=self.users[0],
+                knowledge_base=self.knowledge_base
+            )
+            for topic in ("Germany", "Japan")
+        )
+        self.bmw, self.toyota = (
+            Article.objects.create(
+                title=title,
+                author=self.users[0],
+                category=category,
+                content=f"This is a article about {title}.",
+                is_published=True,
+            )
+            for title, category in (
+                ("BMW", self.germany), ("Toyota", self.japan)
+            )
+        )
+
+    def view(self, user, article):
+        self.client.force_login(user)
+        self.client.get(reverse("catalog:article-detail", args=[article.pk]))
+
+    def test_repeat_views_count_once(self):
+        for user in self.users:
+            self.view(user, self.bmw)
+            self.view(user, self.bmw)
+        self.view(self.users[0], self.toyota)
+
+        self.bmw.refresh_from_db()
+        self.assertEqual(article_views.get(self.bmw.pk), 3)
+        self.assertEqual(self.bmw.viewers.estimate, 3)
+        self.assertEqual(
+            CategoryViewers.objects.get(category=self.japan).estimate, 1
+        )
+        self.assertEqual(knowledge_base_viewers(self.knowledge_base), 3)
+
+        response = self.client.get(
+            reverse("catalog:knowledge-base-detail", args=[
+                self.knowledge_base.pk
+            ])
+        )
+        self.assertEqual(response.context["unique_viewers"], 3)
+
+    def test_redirect_after_comment_is_not_a_view(self):
+        self.client.force_login(self.users[1])
+        url = reverse("catalog:article-detail", args=[self.bmw.pk])
+        response = self.client.post(url, {
+            "submit_comment": "1",
+            "commentary": "Helpful!",
+        }, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.client.get(url)
+
+        self.bmw.refresh_from_db()
+        self.assertEqual(article_views.get(self.bmw.pk), 1)
+        self.assertEqual(self.bmw.viewers.estimate, 1)
+
+    def test_viewers_of_deleted_article_are_dropped(self):
+        with override_settings(VIEW_COUNT_FLUSH_INTERVAL=60):
+            record_view(self.bmw.pk, employee_viewer(self.users[0].pk))
+            self.bmw.delete()
+            flush_views()
+        self.assertFalse(ArticleViewers.objects.exists())
+
+
+@override_settings(
+    VIEW_COUNT_FLUSH_INTERVAL=0,
+    ACTIVITY_HOURLY_RETENTION_DAYS=2,
+    ACTIVITY_DAILY_RETENTION_DAYS=10,
+)
+class ActivityRollupTests(TestCase):
+    """Test the hourly, daily and monthly article activity rollups."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.client.force_login(self.user)
+        self.knowledge_base = KnowledgeBase.objects.create(
+            title="Cars",
+            created_by=self.user,
+        )
+        category = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=self.knowledge_base
+        )
+        self.bmw = Article.objects.create(
+            title="BMW",
+            author=self.user,
+            category=category,
+            content="This is a article about BMW.",
+            is_published=True,
+        )
+
+    def at(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def rows(self):
+        return list(ArticleActivity.objects.values_list(
+            "period", "start", "views", "ratings", "comments"
+        ))
+
+    def test_views_ratings_and_comments_are_counted(self):
+        url = reverse("catalog:article-detail", args=[self.bmw.pk])
+        self.client.get(url)
+        self.client.post(url, {"submit_rating": "1", "rating": "4"})
+        self.client.post(url, {"submit_rating": "1", "rating": "5"})
+        self.client.post(url, {
+            "submit_comment": "1", "commentary": "Helpful!"
+        })
+
+        hour = bucket_start(timezone.now(), ArticleActivity.HOUR)
+        self.assertEqual(
+            self.rows(), [(ArticleActivity.HOUR, hour, 1, 1, 1)]
+        )
+        self.assertEqual(
+            knowledge_base_activity(self.knowledge_base)[0]["ratings"], 1
+        )
+
+    def test_compaction(self):
+        for when, views in (
+            (self.at(2026, 1, 5, 9), 1),
+            (self.at(2026, 1, 5, 17), 2),
+            (self.at(2026, 1, 20, 9), 3),
+            (self.at(2026, 3, 1, 10), 4),
+            (self.at(2026, 3, 2, 10), 5),
+        ):
+            add_activity({self.bmw.pk: Counter(views=views)}, when)
+
+        self.assertEqual(
+            compact_activity(now=self.at(2026, 3, 2, 12)),
+            {"hour": 3, "day": 2},
+        )
+        self.assertEqual(self.rows(), [
+            ("month", self.at(2026, 1, 1), 6, 0, 0),
+            ("hour", self.at(2026, 3, 1, 10), 4, 0, 0),
+            ("hour", self.at(2026, 3, 2, 10), 5, 0, 0),
+        ])
+        self.assertEqual(
+            [
+                (point["start"], point["views"])
+                for point in activity_series(
+                    Article.objects.all(), ArticleActivity.MONTH
+                )
+            ],
+            [(self.at(2026, 1, 1), 6), (self.at(2026, 3, 1), 9)],
+        )
+
+    def test_command(self):
+        add_activity({self.bmw.pk: Counter(views=1)}, self.at(2020, 1, 1))
+        call_command("compact_article_activity", stdout=StringIO())
+        self.assertEqual(
+            self.rows(), [("month", self.at(2020, 1, 1), 1, 0, 0)]
+        )
+
+
+@override_settings(
+    TRENDING_HALF_LIFE_HOURS=24,
+    TRENDING_WEIGHTS={"views": 1, "ratings": 5, "comments": 3},
+)
+class TrendingTests(TestCase):
+    """Test the time-decayed trending scores."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        self.cars, self.bikes = (
+            KnowledgeBase.objects.create(title=title, created_by=self.user)
+            for title in ("Cars", "Bikes")
+        )
+        self.germany = Category.objects.create(
+            topic="Germany", created_by=self.user, knowledge_base=self.cars
+        )
+        self.japan = Category.objects.create(
+            topic="Japan", created_by=self.user, knowledge_base=self.bikes
+        )
+        self.bmw, self.audi, self.honda = (
+            Article.objects.create(
+                title=title,
+                author=self.user,
+                category=category,
+                content=f"This is a article about {title}.",
+                is_published=True,
+            )
+            for title, category in (
+                ("BMW", self.germany),
+                ("AUDI", self.germany),
+                ("Honda", self.japan),
+            )
+        )
+        self.now = timezone.now()
+
+    def hours_ago(self, hours):
+        return self.now - timedelta(hours=hours)
+
+    def score(self, article):
+        return current_score(
+            ArticleTrend.objects.get(article=article).score, self.now
+        )
+
+    def test_scores_decay_by_half_life(self):
+        add_trending({self.bmw.pk: Counter(views=4)}, self.hours_ago(48))
+        add_trending({self.bmw.pk: Counter(comments=1)}, self.hours_ago(24))
+        add_trending({
+            self.bmw.pk: Counter(ratings=1),
+            self.audi.pk: Counter(views=2),
+        }, self.now)
+        self.assertAlmostEqual(self.score(self.bmw), 1 + 1.5 + 5)
+        self.assertAlmostEqual(self.score(self.audi), 2)
+
+    def test_recent_activity_outranks_old_activity(self):
+        add_trending({self.bmw.pk: Counter(views=100)}, self.hours_ago(240))
+        add_trending({self.audi.pk: Counter(views=1)}, self.now)
+        add_trending({self.honda.pk: Counter(comments=1)}, self.now)
+
+        self.assertEqual(
+            trending_articles(), [self.honda, self.audi, self.bmw]
+        )
+        self.assertEqual(
+            trending_articles(self.cars, limit=1), [self.audi]
+        )
+
+    def test_publish_state_and_knowledge_base_follow_article(self):
+        add_trending({
+            self.bmw.pk: Counter(views=1),
+            self.honda.pk: Counter(views=2),
+        })
+        self.honda.is_published = False
+        self.honda.save()
+        self.assertEqual(trending_articles(), [self.bmw])
+
+        self.germany.knowledge_base = self.bikes
+        self.germany.save()
+        self.assertEqual(trending_articles(self.bikes), [self.bmw])
+        self.assertEqual(trending_articles(self.cars), [])
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_views_and_comments_feed_scores(self):
+        self.client.force_login(self.user)
+        url = reverse("catalog:article-detail", args=[self.audi.pk])
+        self.client.get(url)
+        self.client.post(url, {
+            "submit_comment": "1", "commentary": "Helpful!"
+        })
+        self.assertAlmostEqual(self.score(self.audi), 4, places=3)
+
+        response = self.client.get(reverse("catalog:home"))
+        self.assertEqual(
+            response.context["top_stats"]["trending_articles"], [self.audi]
+        )
+
+
+@override_settings(COUNTER_SHARDS=4)
+class ShardedCounterTests(TestCase):
+    """Test the sharded counter rows."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="employee",
+            password="test123",
+            position="Employee"
+        )
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Cars",
+            created_by=self.user,
+        )
+        category = Category.objects.create(
+            topic="Germany",
+            created_by=self.user,
+            knowledge_base=knowledge_base
+        )
+        self.bmw, self.audi = (
+            Article.objects.create(
+                title=title,
+                author=self.user,
+                category=category,
+                content=f"This is a article about {title}.",
+                is_published=True,
+                views_count=10,
+            )
+            for title in ("BMW", "AUDI")
+        )
+
+    def test_writes_spread_over_shards(self):
+        for _ in range(40):
+            article_views.add({self.bmw.pk: 1, self.audi.pk: 2})
+
+        shards = article_views.shards().filter(object_id=self.bmw.pk)
+        self.assertGreater(shards.count(), 1)
+        self.assertLessEqual(shards.count(), 4)
+        self.assertEqual(article_views.get(self.bmw.pk), 50)
+        self.assertEqual(article_views.pending(self.audi.pk), 80)
+        self.assertEqual(
+            dict(article_views.annotate(
+                Article.objects.all(), "views_total"
+            ).values_list("title", "views_total")),
+            {"BMW": 50, "AUDI": 90},
+        )
+
+    def test_saving_stale_article_keeps_views(self):
+        stale = Article.objects.get(pk=self.bmw.pk)
+        article_views.add({self.bmw.pk: 3})
+        article_views.consolidate()
+        stale.title = "BMW M3"
+        stale.save()
+
+        self.bmw.refresh_from_db()
+        self.assertEqual(self.bmw.views_count, 13)
+        self.assertEqual(self.bmw.title, "BMW M3")
+
+    def test_consolidate(self):
+        article_views.add({self.bmw.pk: 3})
+        call_command("consolidate_counters", stdout=StringIO())
+
+        self.bmw.refresh_from_db()
+        self.assertEqual(self.bmw.views_count, 13)
+        self.assertEqual(article_views.pending(self.bmw.pk), 0)
+        self.assertEqual(article_views.get(self.bmw.pk), 13)
+
+        article_views.add({self.bmw.pk: 2})
+        self.assertEqual(article_views.get(self.bmw.pk), 15)
+
+    def test_shards_of_deleted_article_are_deleted(self):
+        article_views.add({self.bmw.pk: 3})
+        self.bmw.delete()
+        self.assertFalse(article_views.shards().exists())
+
+
+class BloomFilterTests(TestCase):
+    """Test repeat-view suppression."""
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        for number in range(2000):
+            bloom.add(f"seen:{number}")
+        self.assertTrue(all(
+            f"seen:{number}" in bloom for number in range(2000)
+        ))
+        false_positives = sum(
+            f"new:{number}" in bloom for number in range(10000)
+        )
+        self.assertLess(false_positives, 200)
+
+    def test_rotation_forgets_after_two_windows(self):
+        dedup = RotatingBloomFilter(window=60, capacity=100, error_rate=0.01)
+        self.assertFalse(dedup.seen("session:1"))
+        self.assertTrue(dedup.seen("session:1"))
+
+        dedup.started -= 60
+        self.assertTrue(dedup.seen("session:1"))
+        dedup.started -= 60
+        self.assertFalse(dedup.seen("session:1"))
+
+    def test_rotation_when_full(self):
+        dedup = RotatingBloomFilter(window=60, capacity=10, error_rate=0.01)
+        for number in range(25):
+            dedup.seen(str(number))
+        self.assertLessEqual(dedup.current.count, 10)
+        self.assertFalse(dedup.seen("0"))
+
+    def create_article(self, title):
+        user = get_user_model().objects.create_user(
+            username=f"employee-{title}",
+            password="test123",
+            position="Employee"
+        )
+        knowledge_base = KnowledgeBase.objects.create(
+            title=f"Cars {title}", created_by=user
+        )
+        return Article.objects.create(
+            title=title,
+            author=user,
+            category=Category.objects.create(
+                topic="Germany",
+                created_by=user,
+                knowledge_base=knowledge_base,
+            ),
+            content=f"This is a article about {title}.",
+            is_published=True,
+        )
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0, VIEW_DEDUP_WINDOW=60)
+    def test_repeat_views_are_not_counted(self):
+        article = self.create_article("BMW")
+        url = reverse("catalog:article-detail", args=[article.pk])
+        for client in (self.client, self.client_class()):
+            client.force_login(article.author)
+            client.get(url)
+            client.get(url)
+        self.assertEqual(article_views.get(article.pk), 2)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600, VIEW_DEDUP_WINDOW=60)
+    def test_repeats_on_another_worker_are_not_counted(self):
+        bmw, audi = self.create_article("BMW"), self.create_article("AUDI")
+        workers = (ViewBuffer(), ViewBuffer())
+        for worker in workers:
+            worker.add(bmw.pk, repeat_key="session")
+            worker.add(bmw.pk, repeat_key="session")
+            worker.add(audi.pk, repeat_key="other")
+        self.assertEqual([worker.flush() for worker in workers], [2, 0])
+        self.assertEqual(article_views.get(bmw.pk), 1)
+
+        # A filter sized for other settings starts over.
+        with override_settings(VIEW_DEDUP_CAPACITY=50):
+            workers[0].add(bmw.pk, repeat_key="session")
+            self.assertEqual(workers[0].flush(), 1)
+
+
+class SiteStatisticsTests(TestCase):
+    """Test the materialized site statistics row."""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            username="admin",
+            password="test123",
+            position="Admin"
+        )
+        self.writer = get_user_model().objects.create_user(
+            username="writer",
+            password="test123",
+            position="Employee"
+        )
+        reconcile_site_statistics()
+        self.knowledge_base = KnowledgeBase.objects.create(
+            title="Cars", created_by=self.admin
+        )
+        self.category = Category.objects.create(
+            topic="Germany",
+            created_by=self.admin,
+            knowledge_base=self.knowledge_base,
+        )
+
+    def create(self, title, author, is_published=True):
+        return Article.objects.create(
+            title=title,
+            author=author,
+            category=self.category,
+            content=f"This is a article about {title}.",
+            is_published=is_published,
+        )
+
+    def assertInSync(self, **expected):
+        stored = site_statistics()
+        self.assertEqual(stored, compute_site_statistics())
+        for field, value in expected.items():
+            self.assertEqual(stored[field], value)
+
+    def test_totals_follow_changes(self):
+        bmw = self.create("BMW", self.writer)
+        audi = self.create("AUDI", self.writer, is_published=False)
+        Comment.objects.create(
+            article=bmw, commentator=self.admin, commentary="Helpful!"
+        )
+        self.assertInSync(
+            total_knowledge_bases=1,
+            total_categories=1,
+            total_articles=1,
+            total_comments=1,
+            total_authors=1,
+            total_employees=2,
+        )
+
+        audi.is_published = True
+        audi.save()
+        self.assertInSync(total_articles=2, total_authors=1)
+
+        bmw.author = self.admin
+        bmw.save()
+        self.assertInSync(total_authors=2)
+
+        audi.delete()
+        self.assertInSync(total_articles=1, total_authors=1)
+
+        self.category.delete()
+        self.assertInSync(
+            total_categories=0, total_articles=0, total_comments=0
+        )
+
+        self.writer.delete()
+        self.assertInSync(total_employees=1)
+
+    def test_admin_publish_actions(self):
+        articles = [
+            self.create("BMW", self.writer, is_published=False),
+            self.create("AUDI", self.writer, is_published=False),
+            self.create("Opel", self.admin),
+        ]
+        self.client.force_login(self.admin)
+        for action, authors in (
+            ("publish_articles", 2),
+            ("unpublish_articles", 0),
+        ):
+            self.client.post(reverse("admin:catalog_article_changelist"), {
+                "action": action,
+                "_selected_action": [article.pk for article in articles],
+            })
+            self.assertInSync(total_authors=authors)
+
+    def test_cascade_delete(self):
+        self.create("BMW", self.writer)
+        self.create("AUDI", self.writer)
+        self.create("Opel", self.admin)
+        with mock.patch(
+            "catalog.stats.site.count_authors"
+        ) as count_authors:
+            self.category.delete()
+        count_authors.assert_not_called()
+        self.assertInSync(total_articles=0, total_authors=0)
+
+    def test_author_with_articles_left_stays_counted(self):
+        japan = Category.objects.create(
+            topic="Japan",
+            created_by=self.admin,
+            knowledge_base=self.knowledge_base,
+        )
+        self.create("BMW", self.writer)
+        self.create("AUDI", self.writer)
+        Article.objects.create(
+            title="Honda",
+            author=self.writer,
+            category=japan,
+            content="This is a article about Honda.",
+            is_published=True,
+        )
+        self.category.delete()
+        self.assertInSync(total_articles=1, total_authors=1)
+
+    def test_queryset_delete(self):
+        self.create("BMW", self.writer)
+        self.create("AUDI", self.writer)
+        self.create("Opel", self.admin)
+        Article.objects.filter(author=self.writer).delete()
+        self.assertInSync(total_articles=1, total_authors=1)
+
+    def test_counts_do_not_repeat_join_rows(self):
+        for topic in ("Japan", "France"):
+            Category.objects.create(
+                topic=topic,
+                created_by=self.admin,
+                knowledge_base=self.knowledge_base,
+            )
+        bmw = self.create("BMW", self.writer)
+        for _ in range(3):
+            Comment.objects.create(
+                article=bmw, commentator=self.admin, commentary="Helpful!"
+            )
+        self.assertEqual(compute_site_statistics(), {
+            "total_knowledge_bases": 1,
+            "total_categories": 3,
+            "total_articles": 1,
+            "total_comments": 3,
+            "total_authors": 1,
+            "total_employees": 2,
+        })
+        self.assertInSync()
+
+    def test_home_reads_one_row(self):
+        self.create("BMW", self.writer)
+        site_statistics()
+        with self.assertNumQueries(1):
+            self.assertEqual(site_statistics()["total_articles"], 1)
+
+    def test_reconcile_command(self):
+        SiteStatistics.objects.update(total_articles=7)
+        out = StringIO()
+        call_command("reconcile_site_statistics", stdout=out)
+        self.assertIn("total_articles: 7 -> 0", out.getvalue())
+        self.assertInSync(total_articles=0)
+
+
+@override_settings(LEADERBOARD_SIZE=2)
+class LeaderboardTests(TestCase):
+    """Test the incrementally maintained leaderboards."""
+
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user(
+                username=f"employee{number}",
+                password="test123",
+                position="Employee"
+            )
+            for number in range(3)
+        ]
+        self.cars, self.bikes = (
+            KnowledgeBase.objects.create(
+                title=title, created_by=self.users[0]
+            )
+            for title in ("Cars", "Bikes")
+        )
+        self.germany, self.japan = (
+            Category.objects.create(
+                topic=topic,
+                created_by=self.users[0],
+                knowledge_base=knowledge_base,
+            )
+            for topic, knowledge_base in (
+                ("Germany", self.cars), ("Japan", self.bikes)
+            )
+        )
+        self.bmw = self.create("BMW", self.germany, self.users[0], 30)
+        self.audi = self.create("AUDI", self.germany, self.users[0], 20)
+        self.honda = self.create("Honda", self.japan, self.users[1], 10)
+
+    def create(self, title, category, author, views, is_published=True):
+        return Article.objects.create(
+            title=title,
+            author=author,
+            category=category,
+            content=f"This is a article about {title}.",
+            is_published=is_published,
+            views_count=views,
+        )
+
+    def assertMatchesSource(self):
+        """Every board equals a rebuild from its source query."""
+
+        def boards():
+            return set(LeaderboardEntry.objects.values_list(
+                "board", "knowledge_base", "object_id", "score"
+            ))
+
+        maintained = boards()
+        rebuild_leaderboards()
+        self.assertEqual(maintained, boards())
+
+    def test_boards_follow_changes(self):
+        self.assertEqual(
+            leaders("most_viewed", limit=3), [self.bmw, self.audi]
+        )
+        self.assertEqual(leaders("most_viewed", self.bikes), [self.honda])
+
+        article_views.add({self.honda.pk: 30})
+        article_views.consolidate()
+        self.assertEqual(leaders("most_viewed"), [self.honda])
+
+        self.bmw.is_published = False
+        self.bmw.save()
+        self.assertEqual(
+            leaders("most_viewed", limit=2), [self.honda, self.audi]
+        )
+        self.assertEqual(leader("active_authors"), self.users[0])
+        self.assertMatchesSource()
+
+        self.create("Yamaha", self.japan, self.users[1], 1)
+        self.audi.delete()
+        self.assertEqual(leader("active_authors"), self.users[1])
+        self.assertEqual(leader("largest_categories"), self.japan)
+        self.assertMatchesSource()
+
+    def test_ratings(self):
+        Rating.objects.create(
+            article=self.honda, employee=self.users[0], rating=5
+        )
+        rating = Rating.objects.create(
+            article=self.bmw, employee=self.users[1], rating=4
+        )
+        self.assertEqual(leader("top_rated"), self.honda)
+        self.assertEqual(leader("top_rated", self.cars), self.bmw)
+
+        rating.rating = 1
+        rating.save()
+        Rating.objects.create(
+            article=self.audi, employee=self.users[1], rating=3
+        )
+        self.assertEqual(
+            leaders("top_rated", self.cars, limit=2), [self.audi, self.bmw]
+        )
+        self.assertMatchesSource()
+
+    def test_category_moved_to_another_base(self):
+        self.germany.knowledge_base = self.bikes
+        self.germany.save()
+        self.assertEqual(leaders("most_viewed", self.cars), [])
+        self.assertEqual(
+            leaders("most_viewed", self.bikes, limit=2),
+            [self.bmw, self.audi],
+        )
+        self.assertMatchesSource()
+
+    def test_bulk_changes_are_offered_per_board(self):
+        for number in range(5):
+            self.create(f"Model {number}", self.japan, self.users[2], number)
+        article_ids = Article.objects.values_list("pk", flat=True)
+        # Per board and scope: the locked board and the scores, in a
+        # savepoint; no writes as every board is already up to date
+        with self.assertNumQueries(1 + len(BOARDS) * 3 * 4):
+            articles_changed(article_ids)
+        self.assertMatchesSource()
+
+    def test_object_is_on_a_board_once(self):
+        for knowledge_base in (None, self.cars):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                LeaderboardEntry.objects.create(
+                    board="most_viewed",
+                    knowledge_base=knowledge_base,
+                    object_id=self.bmw.pk,
+                    score=0,
+                )
+
+    def test_consolidated_views_reach_boards(self):
+        article_views.add({self.honda.pk: 100})
+        article_views.consolidate()
+        self.assertEqual(leader("most_viewed"), self.honda)
+
+    def test_home_page_lookups(self):
+        for board in BOARDS:
+            leader(board)
+        self.client.force_login(self.users[0])
+        response = self.client.get(reverse("catalog:home"))
+        self.assertEqual(
+            response.context["top_stats"]["most_viewed_article"], self.bmw
+        )
+
+    def test_empty_board_is_not_rebuilt_when_read(self):
+        LeaderboardEntry.objects.all().delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(leaders("most_viewed"), [])
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+    def test_command(self):
+        LeaderboardEntry.objects.all().delete()
+        call_command("rebuild_leaderboards", stdout=StringIO())
+        self.assertEqual(leader("largest_categories"), self.germany)
+
+
+class CatalogTotalsTests(TestCase):
+    """Test the stored totals of categories and knowledge bases."""
+
+    FIELDS = (
+        "categories_count",
+        "published_articles_count",
+        "authors_count",
+        "comments_count",
+    )
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            username="admin",
+            password="test123",
+            position="Admin"
+        )
+        self.writer = get_user_model().objects.create_user(
+            username="writer",
+            password="test123",
+            position="Employee"
+        )
+        self.cars = KnowledgeBase.objects.create(
+            title="Cars", created_by=self.admin
+        )
+        self.bikes = KnowledgeBase.objects.create(
+            title="Bikes", created_by=self.admin
+        )
+        self.germany = Category.objects.create(
+            topic="Germany", created_by=self.admin, knowledge_base=self.cars,
+        )
+        self.japan = Category.objects.create(
+            topic="Japan", created_by=self.admin, knowledge_base=self.cars,
+        )
+
+    def create(self, title, author, category, is_published=True):
+        return Article.objects.create(
+            title=title,
+            author=author,
+            category=category,
+            content=f"This is a article about {title}.",
+            is_published=is_published,
+        )
+
+    def stored(self):
+        return {
+            (model.__name__, row["pk"]): row
+            for model in (Category, KnowledgeBase)
+            for row in model.objects.values("pk", *model.stored_totals)
+        }
+
+    def assertInSync(self):
+        stored = self.stored()
+        recount_catalog_totals()
+        self.assertEqual(stored, self.stored())
+
+    def test_totals_follow_changes(self):
+        bmw = self.create("BMW", self.writer, self.germany)
+        audi = self.create("AUDI", self.writer, self.germany)
+        toyota = self.create("Toyota", self.admin, self.japan, False)
+        Comment.objects.create(
+            article=bmw, commentator=self.admin, commentary="Helpful!"
+        )
+        Comment.objects.create(
+            article=toyota, commentator=self.writer, commentary="Draft?"
+        )
+        self.assertInSync()
+        self.cars.refresh_from_db()
+        self.assertEqual(
+            [getattr(self.cars, field) for field in self.FIELDS],
+            [2, 2, 1, 1],
+        )
+
+        toyota.is_published = True
+        toyota.save()
+        self.assertInSync()
+
+        bmw.category = self.japan
+        bmw.author = self.admin
+        bmw.save()
+        self.assertInSync()
+
+        audi.delete()
+        self.assertInSync()
+
+        self.japan.knowledge_base = self.bikes
+        self.japan.save()
+        self.assertInSync()
+        self.bikes.refresh_from_db()
+        self.assertEqual(self.bikes.published_articles_count, 2)
+
+        self.writer.delete()
+        self.assertInSync()
+
+        self.japan.delete()
+        self.assertInSync()
+        self.bikes.refresh_from_db()
+        self.assertEqual(
+            [getattr(self.bikes, field) for field in self.FIELDS],
+            [0, 0, 0, 0],
+        )
+
+    def test_unchanged_article_save_leaves_totals(self):
+        bmw = self.create("BMW", self.writer, self.germany)
+        Category.objects.update(published_articles_count=0, authors_count=0)
+        KnowledgeBase.objects.update(published_articles_count=0)
+        bmw.title = "BMW M3"
+        bmw.save()
+        self.germany.refresh_from_db()
+        self.assertEqual(
+            (self.germany.published_articles_count,
+             self.germany.authors_count),
+            (0, 0),
+        )
+
+    def test_move_within_base_nets_out(self):
+        bmw = self.create("BMW", self.writer, self.germany)
+        bmw.category = self.japan
+        bmw.save()
+        self.assertInSync()
+        self.cars.refresh_from_db()
+        self.assertEqual(
+            (self.cars.published_articles_count, self.cars.authors_count),
+            (1, 1),
+        )
+
+    def test_admin_publish_actions(self):
+        articles = [
+            self.create("BMW", self.writer, self.germany, False),
+            self.create("AUDI", self.writer, self.japan, False),
+            self.create("Opel", self.admin, self.germany),
+        ]
+        self.client.force_login(self.admin)
+        for action, published in (
+            ("publish_articles", 3),
+            ("unpublish_articles", 0),
+        ):
+            self.client.post(reverse("admin:catalog_article_changelist"), {
+                "action": action,
+                "_selected_action": [article.pk for article in articles],
+            })
+            self.assertInSync()
+            self.cars.refresh_from_db()
+            self.assertEqual(self.cars.published_articles_count, published)
+
+    def test_list_pages_read_stored_totals(self):
+        self.create("BMW", self.writer, self.germany)
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse("catalog:kb-categories", args=[self.cars.pk])
+        )
+        self.assertEqual(
+            response.context["categories"][0].published_articles_count, 1
+        )
+
+    def test_recount_command(self):
+        self.create("BMW", self.writer, self.germany)
+        Category.objects.update(published_articles_count=7)
+        call_command("recount_catalog_totals", stdout=StringIO())
+        self.germany.refresh_from_db()
+        self.assertEqual(self.germany.published_articles_count, 1)
+
+
+class ArticleRatingTests(TestCase):
+    """Test the stored rating totals of articles."""
+
+    def setUp(self):
+        self.writer = get_user_model().objects.create_user(
+            username="writer",
+            password="test123",
+            position="Employee"
+        )
+        self.readers = [
+            get_user_model().objects.create_user(
+                username=f"reader{number}",
+                password="test123",
+                position="Employee"
+            )
+            for number in range(3)
+        ]
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Cars", created_by=self.writer
+        )
+        category = Category.objects.create(
+            topic="Germany",
+            created_by=self.writer,
+            knowledge_base=knowledge_base,
+        )
+        self.bmw, self.audi = [
+            Article.objects.create(
+                title=title,
+                author=self.writer,
+                category=category,
+                content=f"This is a article about {title}.",
+                is_published=True,
+            )
+            for title in ("BMW", "AUDI")
+        ]
+
+    def rate(self, reader, value):
+        self.client.force_login(reader)
+        self.client.post(
+            reverse("catalog:article-detail", args=[self.bmw.pk]),
+            {"rating": value, "submit_rating": ""},
+        )
+
+    def assertInSync(self):
+        stored = list(Article.objects.values().order_by("pk"))
+        recount_ratings()
+        self.assertEqual(
+            stored, list(Article.objects.values().order_by("pk"))
+        )
+
+    def test_rates_and_re_rates(self):
+        self.rate(self.readers[0], 5)
+        self.rate(self.readers[1], 2)
+        self.rate(self.readers[0], 3)
+        self.assertInSync()
+        self.bmw.refresh_from_db()
+        self.assertEqual(
+            (self.bmw.rating_sum, self.bmw.rating_count), (5, 2)
+        )
+        self.assertEqual(self.bmw.rating_average, 2.5)
+        self.assertEqual(
+            self.bmw.rating_histogram, {1: 0, 2: 1, 3: 1, 4: 0, 5: 0}
+        )
+
+        response = self.client.get(
+            reverse("catalog:article-detail", args=[self.bmw.pk])
+        )
+        self.assertEqual(
+            response.context["rating_info"],
+            {"average_rating": 2.5, "rating_count": 2},
+        )
+
+    def test_moved_and_deleted_ratings(self):
+        rating = Rating.objects.create(
+            article=self.bmw, employee=self.readers[0], rating=4
+        )
+        Rating.objects.create(
+            article=self.bmw, employee=self.readers[1], rating=1
+        )
+        rating.article = self.audi
+        rating.save()
+        self.assertInSync()
+        self.audi.refresh_from_db()
+        self.assertEqual(self.audi.rating_average, 4)
+
+        Rating.objects.all().delete()
+        self.assertInSync()
+        self.bmw.refresh_from_db()
+        self.assertEqual(
+            (self.bmw.rating_count, self.bmw.rating_average), (0, 0)
+        )
+
+    def test_saving_stale_article_keeps_totals(self):
+        Rating.objects.create(
+            article=self.bmw, employee=self.readers[0], rating=4
+        )
+        self.bmw.title = "BMW M3"
+        self.bmw.save()
+        self.assertInSync()
+        self.bmw.refresh_from_db()
+        self.assertEqual(self.bmw.rating_count, 1)
+
+
+class AuthorTotalsTests(TestCase):
+    """Test the stored author totals of employees."""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            username="admin",
+            password="test123",
+            position="Admin"
+        )
+        self.writer = get_user_model().objects.create_user(
+            username="writer",
+            password="test123",
+            position="Employee"
+        )
+        knowledge_base = KnowledgeBase.objects.create(
+            title="Cars", created_by=self.admin
+        )
+        self.category = Category.objects.create(
+            topic="Germany",
+            created_by=self.admin,
+            knowledge_base=knowledge_base,
+        )
+
+    def create(self, title, author, is_published=True):
+        return Article.objects.create(
+            title=title,
+            author=author,
+            category=self.category,
+            content=f"This is a article about {title}.",
+            is_published=is_published,
+        )
+
+    def assertInSync(self):
+        fields = get_user_model().stored_totals
+        stored = list(get_user_model().objects.values("pk", *fields))
+        recount_authors()
+        self.assertEqual(
+            stored, list(get_user_model().objects.values("pk", *fields))
+        )
+
+    def test_totals_follow_changes(self):
+        bmw = self.create("BMW", self.writer)
+        audi = self.create("AUDI", self.writer, is_published=False)
+        Rating.objects.create(article=bmw, employee=self.admin, rating=5)
+        Rating.objects.create(article=audi, employee=self.admin, rating=1)
+        self.assertInSync()
+        self.writer.refresh_from_db()
+        self.assertEqual(
+            (self.writer.published_articles_count, self.writer.author_rating),
+            (1, 5),
+        )
+
+        audi.is_published = True
+        audi.save()
+        rating = Rating.objects.get(article=bmw)
+        rating.rating = 4
+        rating.save()
+        Rating.objects.create(article=bmw, employee=self.writer, rating=3)
+        self.assertInSync()
+
+        bmw.author = self.admin
+        bmw.save()
+        self.assertInSync()
+
+        bmw.delete()
+        self.assertInSync()
+        self.admin.refresh_from_db()
+        self.assertEqual(
+            (self.admin.published_articles_count, self.admin.author_rating),
+            (0, 0),
+        )
+
+    def test_admin_publish_actions(self):
+        articles = [
+            self.create("BMW", self.writer, is_published=False),
+            self.create("Opel", self.admin),
+        ]
+        Rating.objects.create(
+            article=articles[0], employee=self.admin, rating=2
+        )
+        self.client.force_login(self.admin)
+        for action in ("publish_articles", "unpublish_articles"):
+            self.client.post(reverse("admin:catalog_article_changelist"), {
+                "action": action,
+                "_selected_action": [article.pk for article in articles],
+            })
+            self.assertInSync()
+
+    def test_author_pages_query_count_is_constant(self):
+        for number in range(4):
+            author = get_user_model().objects.create_user(
+                username=f"author{number}",
+                password="test123",
+                position="Employee"
+            )
+            self.create(f"Car {number}", author)
+        self.client.force_login(self.admin)
+        url = reverse("catalog:employee-list") + "?filter=authors"
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertContains(response, "author0")
+
+    def test_with_author_stats(self):
+        article = self.create("BMW", self.writer)
+        Rating.objects.create(article=article, employee=self.admin, rating=5)
+        Rating.objects.create(
+            article=article, employee=self.writer, rating=2
+        )
+        writer = get_user_model().objects.with_author_stats().authors().get()
+        self.assertEqual(writer.author_average, 3.5)
+        self.assertEqual(writer.author_rating, 3.5)
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
@@ -449,6 +450,9 @@ class PrivateArticleTest(TestCase):
     """Test the article views with login."""
 
     def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
         self.user = get_user_model().objects.create_user(
             username="employee",
             password="test123",
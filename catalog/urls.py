@@ -4,6 +4,11 @@ from django.contrib.auth import views as auth_views
 
 from catalog.views import (
     HomeView,
+    AutocompleteView,
+    UnifiedSearchView,
+    SavedSearchListView,
+    SavedSearchCreateView,
+    SavedSearchDeleteView,
     KnowledgeBaseListView,
     KnowledgeBaseDetailsView,
     CategoryListView,
@@ -33,6 +38,31 @@ from catalog.views import (
 
 urlpatterns = [
     path("", HomeView.as_view(), name="home"),
+    path(
+        "autocomplete/",
+        AutocompleteView.as_view(),
+        name="autocomplete"
+    ),
+    path(
+        "search/",
+        UnifiedSearchView.as_view(),
+        name="search"
+    ),
+    path(
+        "saved_searches/",
+        SavedSearchListView.as_view(),
+        name="saved-search-list"
+    ),
+    path(
+        "saved_searches/create/",
+        SavedSearchCreateView.as_view(),
+        name="saved-search-create"
+    ),
+    path(
+        "saved_searches/<int:pk>/delete/",
+        SavedSearchDeleteView.as_view(),
+        name="saved-search-delete"
+    ),
     path(
         "knowledge_list",
         KnowledgeBaseListView.as_view(),
@@ -4,17 +4,21 @@ from itertools import islice
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count, Q, Avg, F, Prefetch
+from django.db.models import Count, Prefetch
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy, reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.views import generic, View
 
+from catalog.aggregates import SubqueryCount
 from catalog.forms import (
     KnowledgeBaseSearchForm,
     CategorySearchForm,
     ArticleSearchForm,
+    SiteSearchForm,
+    SavedSearchForm,
     RatingForm,
     CommentForm,
     EmployeeSearchForm,
@@ -30,8 +34,31 @@ from catalog.models import (
     Category,
     Employee,
     Rating,
-    Comment
+    Comment,
+    SavedSearch,
+    SavedSearchMatch,
 )
+from catalog.search import get_search_backend, order_by_ids
+from catalog.search.autocomplete import TOP_LIMIT, prefix_index
+from catalog.search.cache import (
+    ALL_ARTICLES,
+    cached_search,
+    normalize_query,
+)
+from catalog.search.duplicates import find_duplicates, minhash
+from catalog.search.facets import (
+    facet_counts,
+    facet_display,
+    filter_facets,
+)
+from catalog.search.semantic import semantic_search
+from catalog.search.trigram import trigram_search
+from catalog.search.unified import SECTIONS, unified_search
+from catalog.stats import record_view
+from catalog.stats.bloom import viewer_key
+from catalog.stats.counters import article_views
+from catalog.stats.trending import trending_articles
+from catalog.stats.viewers import employee_viewer, knowledge_base_viewers
 from catalog.utils import (
     get_top_statistics,
     get_site_statistics
@@ -55,6 +82,50 @@ class HomeView(LoginRequiredMixin, generic.TemplateView):
         return context
 
 
+class AutocompleteView(LoginRequiredMixin, View):
+    """
+    JSON suggestions for a prefix: top article titles,
+    knowledge base titles, category topics and employee names.
+    """
+
+    max_limit = TOP_LIMIT
+
+    def get(self, request):
+        try:
+            limit = int(request.GET.get("limit", 5))
+        except ValueError:
+            limit = 5
+        limit = min(max(limit, 1), self.max_limit)
+
+        return JsonResponse(
+            prefix_index.suggest(request.GET.get("q", ""), limit)
+        )
+
+
+class UnifiedSearchView(LoginRequiredMixin, generic.TemplateView):
+    """Top hits of knowledge bases, categories, articles and employees."""
+
+    template_name = "catalog/search.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = SiteSearchForm(self.request.GET or None)
+        query = form.cleaned_data.get("q", "") if form.is_valid() else ""
+
+        results = unified_search(query) if query else {}
+        context["search_form"] = form
+        context["query"] = query
+        context["sections"] = [
+            {
+                "name": name,
+                "title": section["title"],
+                "hits": results.get(name, []),
+            }
+            for name, section in SECTIONS.items()
+        ]
+        return context
+
+
 def get_second_half_stats(stats_dict, skip=3):
     """General statistics about employees, comments, authors"""
     return dict(islice(stats_dict.items(), skip, None))
@@ -82,16 +153,9 @@ class KnowledgeBaseListView(
         if self.search_form.is_valid():
             title = self.search_form.cleaned_data.get("title")
             if title:
-                queryset = queryset.filter(title__icontains=title)
-
-        return queryset.annotate(
-            categories_count=Count("categories", distinct=True),
-            articles_count=Count(
-                "categories__articles",
-                filter=Q(categories__articles__is_published=True),
-                distinct=True
-            )
-        ).order_by("title")
+                return trigram_search(queryset, title)
+
+        return queryset.order_by("title")
 
     def get_queryset(self):
         return self.filtered_queryset
@@ -142,21 +206,17 @@ class KnowledgeBaseDetailsView(
         knowledge_base = self.object_with_prefetch
 
         context["categories"] = knowledge_base.categories.annotate(
-            total_articles=Count("articles"),
-            articles_count=Count(
-                "articles",
-                filter=Q(articles__is_published=True),
-            ),
-            recent_articles_count=Count(
-                "articles",
-                filter=Q(
-                    articles__is_published=True,
-                    articles__created_at__gte=timezone.now() - timedelta(
-                        days=7
-                    )
+            total_articles=SubqueryCount(Article.objects.all(), "category"),
+            recent_articles_count=SubqueryCount(
+                Article.objects.filter(
+                    is_published=True,
+                    created_at__gte=timezone.now() - timedelta(days=7),
                 ),
-            )
+                "category",
+            ),
         ).order_by("topic")
+        context["unique_viewers"] = knowledge_base_viewers(knowledge_base)
+        context["trending_articles"] = trending_articles(knowledge_base)
         return context
 
 
@@ -257,22 +317,6 @@ class CategoriesByKnowledgeBaseView(
         )
         return Category.objects.filter(
             knowledge_base=self.knowledge_base_by_kb
-        ).annotate(
-            authors_count=Count(
-                "articles__author",
-                filter=Q(articles__is_published=True),
-                distinct=True
-            ),
-            articles_count=Count(
-                "articles",
-                filter=Q(articles__is_published=True),
-                distinct=True
-            ),
-            comments_count=Count(
-                "articles__comments",
-                filter=Q(articles__is_published=True),
-                distinct=True
-            ),
         )
 
     def get_context_data(self, **kwargs):
@@ -303,16 +347,9 @@ class CategoryListView(
         if self.search_form.is_valid():
             topic = self.search_form.cleaned_data.get("topic")
             if topic:
-                queryset = queryset.filter(topic__icontains=topic)
-
-        return queryset.annotate(
-            articles_count=Count("articles", distinct=True),
-            authors_count=Count(
-                "articles__author",
-                filter=Q(articles__is_published=True),
-                distinct=True
-            )
-        ).order_by("topic")
+                return trigram_search(queryset, topic)
+
+        return queryset.order_by("topic")
 
     def get_queryset(self):
         return self.filtered_queryset
@@ -338,7 +375,9 @@ class CategoryDetailsView(
 
     def get_object(self, queryset=None):
         self.cat = get_object_or_404(
-            Category.objects.select_related("created_by").prefetch_related(
+            Category.objects.select_related(
+                "created_by", "viewers"
+            ).prefetch_related(
                 "articles__author"
             ),
             pk=self.kwargs["pk"],
@@ -475,7 +514,7 @@ class AuthorsByCategoryView(
 
     def get_queryset(self):
         self.cat = get_object_or_404(Category, pk=self.kwargs["pk"])
-        return Employee.objects.filter(
+        return Employee.objects.with_author_stats().filter(
             articles__category=self.cat,
             articles__is_published=True,
         ).distinct()
@@ -539,30 +578,91 @@ class ArticleListView(
 
     @cached_property
     def filtered_queryset(self):
-        queryset = (
-            Article.objects
-            .select_related("author", "category")
-            .annotate(
-                avg_rating=Avg("ratings__rating"),
-                comments_count=Count("comments")
-            )
-        )
+        """Matching articles in result order (search rank or newest)."""
+
+        queryset = Article.objects.all()
 
         if self.search_form.is_valid():
             title = self.search_form.cleaned_data.get("title")
+            if title and self.semantic:
+                return semantic_search(queryset, title)
             if title:
-                queryset = queryset.filter(title__icontains=title)
+                return get_search_backend().filter_queryset(
+                    queryset, title
+                )
 
         return queryset.order_by("-created_at")
 
+    @cached_property
+    def semantic(self) -> bool:
+        return self.search_form.semantic()
+
+    @cached_property
+    def search_query(self) -> str:
+        if not self.search_form.is_valid():
+            return ""
+        return self.search_form.cleaned_data.get("title") or ""
+
+    @cached_property
+    def search_result(self) -> dict:
+        """
+        Facet counts of the matching articles and, for a search, their
+        ranked ids (at most SEARCH_RESULTS_LIMIT), cached per
+        normalized query and filters; pages share the entry. Lists
+        without search terms cache only the counts.
+        """
+
+        filters = self.search_form.facet_filters()
+
+        def compute():
+            result = {
+                "counts": facet_counts(self.filtered_queryset, filters),
+            }
+            if self.search_query:
+                result["ids"] = list(filter_facets(
+                    self.filtered_queryset, filters
+                ).values_list("pk", flat=True)[
+                    :get_search_backend().limit
+                ])
+            return result
+
+        if self.semantic:
+            return cached_search(
+                self.search_query,
+                {**filters, "mode": "semantic"},
+                compute,
+                terms={ALL_ARTICLES},
+            )
+        return cached_search(self.search_query, filters, compute)
+
     def get_queryset(self):
-        return self.filtered_queryset
+        """
+        Ranked ids of the matching articles; pages slice them. Without
+        search terms pages are read newest first with LIMIT/OFFSET.
+        """
+
+        if self.search_query:
+            return self.search_result["ids"]
+        return filter_facets(
+            self.filtered_queryset, self.search_form.facet_filters()
+        ).values_list("pk", flat=True)
 
     def get_context_data(self, **kwargs):
         """For use 'count' ones  + search form in template context"""
         context = super().get_context_data(**kwargs)
+        page = context["page_obj"]
+        page.object_list = list(order_by_ids(
+            article_views.annotate(Article.objects.all(), "views_total"),
+            list(page.object_list),
+        ).select_related("author", "category").annotate(
+            comment_count=SubqueryCount(Comment.objects.all(), "article")
+        ))
+        context["object_list"] = context["article_list"] = page.object_list
         context["search_form"] = self.search_form
-        context["total_articles"] = context["page_obj"].paginator.count
+        context["facets"] = facet_display(
+            self.search_result["counts"], self.search_form.facet_filters()
+        )
+        context["total_articles"] = page.paginator.count
         return context
 
 
@@ -577,22 +677,31 @@ class ArticleDetailsView(
 
     def get_queryset(self):
         return (
-            Article.objects.select_related(
-                "author", "category", "category__knowledge_base"
+            article_views.annotate(
+                Article.objects.all(), "views_total"
+            ).select_related(
+                "author", "category", "category__knowledge_base", "viewers"
             ).prefetch_related(
                 "ratings", "comments__commentator"
-            ).annotate(
-                average_rating=Avg("ratings__rating"),
-                rating_count=Count("ratings"),
-                comments_total=Count("comments"))
+            ).annotate(comments_total=SubqueryCount(
+                Comment.objects.all(), "article"
+            ))
         )
 
-    def get_object(self, queryset=None):
-        obj = super().get_object(queryset)
-        Article.objects.filter(
-            pk=obj.pk
-        ).update(views_count=F("views_count") + 1)
-        return obj
+    def get(self, request, *args, **kwargs):
+        """
+        Count the view, unless it is the redirect back from a comment
+        or rating of the same article or a repeat view.
+        """
+        response = super().get(request, *args, **kwargs)
+        article_id = self.object.pk
+        if request.session.pop("posted_article", None) != article_id:
+            record_view(
+                article_id,
+                employee_viewer(request.user.pk),
+                viewer_key(request),
+            )
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -607,11 +716,15 @@ class ArticleDetailsView(
         context["comment_form"] = CommentForm()
         context["rating_form"] = RatingForm()
         context["rating_info"] = {
-            "average_rating": round(article.average_rating or 0, 1),
+            "average_rating": round(article.rating_average, 1),
             "rating_count": article.rating_count
         }
         context["user_rating"] = user_rating
         context["comments_total"] = article.comments_total
+        context["related_articles"] = Article.objects.filter(
+            linked_from__article=article,
+            is_published=True,
+        ).order_by("linked_from__rank").only("pk", "title")
 
         return context
 
@@ -645,6 +758,7 @@ class ArticleDetailsView(
             else:
                 messages.error(request, "Rating could not be submitted.")
 
+        request.session["posted_article"] = article.pk
         return redirect("catalog:article-detail", pk=article.pk)
 
 
@@ -698,6 +812,27 @@ class ArticleCreateView(
         return form
 
     def form_valid(self, form):
+        """
+        Warn about likely near-duplicates before saving;
+        submitting the form again saves the article anyway.
+        """
+
+        if "confirm_duplicates" not in self.request.POST:
+            duplicates = find_duplicates(
+                minhash(form.cleaned_data["content"])
+            )
+            if duplicates:
+                articles = Article.objects.only("pk", "title").in_bulk(
+                    [pk for pk, _ in duplicates]
+                )
+                return self.render_to_response(self.get_context_data(
+                    form=form,
+                    duplicates=[
+                        (articles[pk], round(score * 100))
+                        for pk, score in duplicates if pk in articles
+                    ],
+                ))
+
         form.instance.created_by = self.request.user
         return super().form_valid(form)
 
@@ -743,6 +878,69 @@ class CommentaryDeleteView(
         return comment.commentator == self.request.user
 
 
+class SavedSearchListView(LoginRequiredMixin, generic.ListView):
+    """Saved searches of the employee and articles they matched."""
+
+    template_name = "catalog/saved_search_list.html"
+    context_object_name = "saved_searches"
+    recent_matches = 20
+
+    def get_queryset(self):
+        return self.request.user.saved_searches.annotate(
+            unseen_count=SubqueryCount(
+                SavedSearchMatch.objects.filter(seen=False), "saved_search"
+            ),
+        )
+
+    def get_context_data(self, **kwargs):
+        """Recent matches are marked seen once shown; older stay unseen."""
+
+        context = super().get_context_data(**kwargs)
+        context["saved_searches"] = list(context["saved_searches"])
+        context["matches"] = list(SavedSearchMatch.objects.filter(
+            saved_search__employee=self.request.user,
+        ).select_related("saved_search", "article")[:self.recent_matches])
+        SavedSearchMatch.objects.filter(pk__in=[
+            match.pk for match in context["matches"] if not match.seen
+        ]).update(seen=True)
+        return context
+
+
+class SavedSearchCreateView(LoginRequiredMixin, View):
+    """Subscribe the employee to an article query."""
+
+    def post(self, request):
+        form = SavedSearchForm(request.POST)
+        if form.is_valid():
+            SavedSearch.objects.get_or_create(
+                employee=request.user,
+                query=normalize_query(form.cleaned_data["query"]),
+            )
+            messages.success(
+                request,
+                "You will be told about new articles matching "
+                f"\"{form.cleaned_data['query']}\".",
+            )
+        else:
+            messages.error(request, form.errors["query"][0])
+        return redirect("catalog:saved-search-list")
+
+
+class SavedSearchDeleteView(
+    LoginRequiredMixin,
+    UserPassesTestMixin,
+    generic.DeleteView
+):
+    """Saved search can be deleted by its owner."""
+
+    model = SavedSearch
+    template_name = "catalog/saved_search_confirm_delete.html"
+    success_url = reverse_lazy("catalog:saved-search-list")
+
+    def test_func(self):
+        return self.get_object().employee == self.request.user
+
+
 class EmployeesListView(
     LoginRequiredMixin,
     generic.ListView
@@ -758,27 +956,18 @@ class EmployeesListView(
     paginate_by = 3
 
     def get_queryset(self):
-        queryset = Employee.objects.annotate(
-            published_articles_total=Count(
-                "articles", filter=Q(
-                    articles__is_published=True,
-                )
-            )
-        )
+        queryset = Employee.objects.with_author_stats()
 
         filter_type = self.request.GET.get("filter")
 
         if filter_type == "authors":
-            queryset = queryset.filter(published_articles_total__gt=0)
+            queryset = queryset.authors()
 
         form = EmployeeSearchForm(self.request.GET)
         if form.is_valid():
             query = form.cleaned_data.get("query")
             if query:
-                queryset = queryset.filter(
-                    Q(first_name__icontains=query) |
-                    Q(last_name__icontains=query)
-                )
+                return trigram_search(queryset, query)
         return queryset.order_by("last_name", "first_name")
 
     def get_context_data(self, **kwargs):
@@ -805,14 +994,16 @@ class EmployeeDetailsView(
     def get_queryset(self):
         return (
             Employee.objects
+            .with_author_stats()
             .prefetch_related(
                 Prefetch(
                     "articles",
-                    queryset=Article.objects.select_related(
+                    queryset=Article.objects.filter(
+                        is_published=True
+                    ).select_related(
                         "category", "category__knowledge_base"
-                    ).annotate(
-                        avg_rating=Avg("ratings__rating")
-                    )
+                    ).order_by("-created_at"),
+                    to_attr="published_articles",
                 )
             )
         )
@@ -821,21 +1012,12 @@ class EmployeeDetailsView(
         context = super().get_context_data(**kwargs)
         employer = self.object
 
-        published_articles = [
-            article for article in employer.articles.all()
-            if article.is_published
-        ]
-
-        context["articles"] = sorted(
-            published_articles, key=lambda a: a.created_at, reverse=True
+        context["articles"] = employer.published_articles
+        context["articles_count"] = employer.published_articles_count
+        context["average_rating"] = (
+            employer.author_rating
+            if employer.published_articles_count else None
         )
-        context["articles_count"] = len(published_articles)
-        context["average_rating"] = round(
-            sum(
-                a.avg_rating or 0 for a in published_articles
-            ) / len(published_articles),
-            1
-        ) if published_articles else None
 
         return context
 
@@ -50,6 +50,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "catalog.loaders.RequestMemoMiddleware",
 ]
 
 ROOT_URLCONF = "knowledge_hub.urls"
@@ -119,6 +120,49 @@ STATICFILES_DIRS = [
 
 ASSETS_ROOT = "/static/assets"
 
+# Article search
+# Directory of the memory-mapped index used by BM25SearchBackend
+
+SEARCH_INDEX_DIR = BASE_DIR / "search_index"
+
+# Article view counts
+# catalog/stats/buffer.py: seconds between batched writes and the most
+# buffered views a worker may lose if it dies
+
+VIEW_COUNT_FLUSH_INTERVAL = 10
+VIEW_COUNT_MAX_PENDING = 1000
+
+# Repeat views
+# catalog/stats/bloom.py: seconds a view of an article by the same
+# session is not counted again, views remembered per window and the
+# share of first views that may be taken for repeats. Repeats are
+# dropped when view buffers flush, against one filter shared by all
+# workers
+
+VIEW_DEDUP_WINDOW = 1800
+VIEW_DEDUP_CAPACITY = 100000
+VIEW_DEDUP_ERROR_RATE = 0.001
+
+# Sharded counters
+# catalog/stats/counters.py: rows each counted object is spread over;
+# consolidate_counters folds them into the model columns
+
+COUNTER_SHARDS = 8
+
+# Article activity rollups
+# catalog/stats/rollups.py: days hourly and daily rows are kept before
+# compact_article_activity merges them into days and months
+
+ACTIVITY_HOURLY_RETENTION_DAYS = 7
+ACTIVITY_DAILY_RETENTION_DAYS = 90
+
+# Trending articles
+# catalog/stats/trending.py: hours for an event's weight to halve and
+# the weight of each kind of event
+
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WEIGHTS = {"views": 1, "ratings": 5, "comments": 3}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
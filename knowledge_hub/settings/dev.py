@@ -16,3 +16,14 @@ DATABASES = {
         "NAME": BASE_DIR / "db.sqlite3",
     }
 }
+
+
+# Article search
+# catalog/search/backends.py
+
+SEARCH_BACKEND = "catalog.search.backends.SQLiteSearchBackend"
+
+# Article view counts
+# Written on every view, so pages and tests show them at once
+
+VIEW_COUNT_FLUSH_INTERVAL = 0
@@ -25,3 +25,29 @@ DATABASES = {
         "PORT": int(os.environ["POSTGRES_DB_PORT"]),
     }
 }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Cached searches, their term versions and the generations of the
+# in-process indexes (catalog/search) must be seen by every worker,
+# so the cache is kept in the database. build.sh creates the table.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "knowledge_hub_cache",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    }
+}
+
+
+INSTALLED_APPS += [
+    "django.contrib.postgres",
+]
+
+
+# Article search
+# catalog/search/backends.py
+
+SEARCH_BACKEND = "catalog.search.backends.PostgresSearchBackend"
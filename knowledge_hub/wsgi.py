@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "knowledge_hub.settings")
 
 application = get_wsgi_application()
+
+# Build the in-process suggestion index now rather than in the first
+# request each worker serves.
+from catalog.search.autocomplete import warm_up  # noqa: E402
+
+warm_up()